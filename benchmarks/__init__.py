@@ -0,0 +1 @@
+# package marker for offline benchmarks (run from the repo root: python -m benchmarks.<name>)
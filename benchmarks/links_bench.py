@@ -0,0 +1,75 @@
+# Compare link discovery on listing pages: one soup.select() scan per selector
+# (old scrapers) vs a single pass with utils.links.discover_links()
+#
+#   python -m benchmarks.links_bench [--repeat 50] [--sites france24 bbc]
+#
+# Pages are read from benchmarks/fixtures/<site>/listing.html and parsed once;
+# only link discovery is timed. Both engines must return the same URL set.
+import argparse
+import importlib
+import time
+from benchmarks.parse_compare import load_pages
+from utils.frontier import canonicalize
+from utils.links import discover_links
+from utils.parse import parse_html
+
+# Sites whose scraper declares a LINK_MATCHER, with the listing URL it is applied to
+LISTING_URLS = {
+    'france24': 'https://m.france24.com/en/',
+    'mediacongo': 'https://www.mediacongo.net/',
+    'bbc': 'https://www.bbc.com/news',
+    'radio_okapi': 'https://www.radiookapi.net/actualite',
+}
+
+
+def per_selector(soup, matcher, page_url):
+    """Ancien schéma: un parcours complet du document par sélecteur, puis dédoublonnage"""
+    links = []
+    seen = set()
+    for selector in matcher.selectors or ['a[href]']:
+        for a in soup.select(selector):
+            href = a.get('href')
+            if not href:
+                continue
+            if matcher.pattern is not None and not matcher.pattern.search(href):
+                continue
+            url = canonicalize(matcher.resolve(href, page_url), matcher.rules)
+            title = a.get_text(strip=True)
+            if not url or not title or len(title) < matcher.min_title or not matcher.accept(url):
+                continue
+            if url not in seen:
+                seen.add(url)
+                links.append({'title': title, 'url': url})
+    return links
+
+
+def timed(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - started) / repeat, result
+
+
+def main(sites, repeat):
+    print(f"{'site':<12} {'anchors':>8} {'links':>6} {'per-selector':>13} {'one-pass':>9} {'speedup':>8}  same")
+    for site in sites:
+        pages = load_pages(site, 'listing.html')
+        if not pages:
+            print(f"{site:<12} (no listing fixture)")
+            continue
+        matcher = importlib.import_module(f'sites.{site}').LINK_MATCHER
+        soup = parse_html(pages[0][1])
+        page_url = LISTING_URLS[site]
+        old_time, old = timed(lambda: per_selector(soup, matcher, page_url), repeat)
+        new_time, new = timed(lambda: discover_links(soup, matcher, page_url), repeat)
+        same = {l['url'] for l in old} == {l['url'] for l in new}
+        print(f"{site:<12} {len(soup.find_all('a')):>8} {len(new):>6} {old_time * 1000:>11.2f}ms "
+              f"{new_time * 1000:>7.2f}ms {old_time / new_time:>7.1f}x  {'yes' if same else 'NO'}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark link discovery on listing fixtures')
+    parser.add_argument('--sites', nargs='+', default=list(LISTING_URLS), choices=list(LISTING_URLS))
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+    main(args.sites, args.repeat)
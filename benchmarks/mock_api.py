@@ -0,0 +1,215 @@
+# Local stand-in for the Symfony ingestion API (single and bulk endpoints)
+#
+#   python -m benchmarks.mock_api [--port 8001] [--latency 0.02] [--jitter 0.01] [--capacity 8]
+#                                 [--error-rate 0.01] [--throttle-rate 0.02] [--retry-after 1]
+#   API_URL=http://127.0.0.1:8001/api/articles python main.py
+#
+# Every POST sleeps `latency` (+ up to `jitter`) seconds, stretched in
+# proportion when more than `capacity` requests are in flight, like a backend
+# queueing work. A request is then answered 429 (with Retry-After) with
+# probability throttle_rate, 500 with probability error_rate, or accepted.
+# A path ending in /bulk takes {"articles": [...]} and answers one status per
+# article; otherwise one article per request. URLs already stored get a 409,
+# payloads without title or url a 422. Gzip request bodies are accepted.
+# GET /__stats returns the counters as JSON (?reset=1 clears them and the
+# stored URLs).
+import argparse
+import gzip
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+COUNTERS = ('requests', 'articles', 'created', 'duplicates', 'invalid', 'throttled', 'errors', 'bytes_in')
+
+
+class MockApiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        if parts.path != '/__stats':
+            self._send(404, {'error': 'not found'})
+            return
+        self._send(200, self.server.snapshot('reset' in parse_qs(parts.query)))
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        in_flight = server.enter(len(body))
+        try:
+            server.wait(in_flight)
+            outcome = server.outcome()
+            if outcome == 'throttled':
+                self._send(429, {'error': 'too many requests'}, {'Retry-After': f'{server.retry_after:g}'})
+                return
+            if outcome == 'error':
+                self._send(500, {'error': 'internal server error'})
+                return
+            try:
+                if self.headers.get('Content-Encoding') == 'gzip':
+                    body = gzip.decompress(body)
+                data = json.loads(body or b'null')
+            except (OSError, ValueError):
+                server.count('invalid')
+                self._send(400, {'error': 'invalid JSON body'})
+                return
+            if urlsplit(self.path).path.rstrip('/').endswith('/bulk'):
+                articles = data.get('articles') if isinstance(data, dict) else None
+                if not isinstance(articles, list):
+                    self._send(400, {'error': 'expected {"articles": [...]}'})
+                    return
+                self._send(200, {'results': [server.store(article) for article in articles]})
+            else:
+                result = server.store(data)
+                self._send(result['status'], result)
+        finally:
+            server.leave()
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, address, latency=0.02, jitter=0.0, capacity=0, error_rate=0.0,
+                 throttle_rate=0.0, retry_after=1.0, seed=None):
+        super().__init__(address, MockApiHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._urls = set()
+        self._in_flight = 0
+        self._reset()
+
+    def _reset(self):
+        self._stats = dict.fromkeys(COUNTERS, 0)
+        self._stats['max_in_flight'] = 0
+        self._urls.clear()
+
+    def enter(self, size):
+        with self._lock:
+            self._in_flight += 1
+            self._stats['requests'] += 1
+            self._stats['bytes_in'] += size
+            self._stats['max_in_flight'] = max(self._stats['max_in_flight'], self._in_flight)
+            return self._in_flight
+
+    def leave(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def wait(self, in_flight):
+        with self._lock:
+            delay = self.latency + self._random.uniform(0, self.jitter)
+        # Au-delà de `capacity` requêtes simultanées, le backend fait la queue
+        if self.capacity and in_flight > self.capacity:
+            delay *= in_flight / self.capacity
+        time.sleep(delay)
+
+    def outcome(self):
+        with self._lock:
+            roll = self._random.random()
+            if roll < self.throttle_rate:
+                self._stats['throttled'] += 1
+                return 'throttled'
+            if roll < self.throttle_rate + self.error_rate:
+                self._stats['errors'] += 1
+                return 'error'
+        return 'ok'
+
+    def count(self, field, n=1):
+        with self._lock:
+            self._stats[field] += n
+
+    def store(self, article):
+        """Statut d'un article: 201 créé, 409 déjà connu, 422 incomplet"""
+        article = article if isinstance(article, dict) else {}
+        url = article.get('url')
+        with self._lock:
+            self._stats['articles'] += 1
+            if not url or not article.get('title'):
+                self._stats['invalid'] += 1
+                return {'url': url, 'status': 422, 'error': 'title and url are required'}
+            if url in self._urls:
+                self._stats['duplicates'] += 1
+                return {'url': url, 'status': 409, 'error': 'already exists'}
+            self._urls.add(url)
+            self._stats['created'] += 1
+        return {'url': url, 'status': 201}
+
+    def snapshot(self, reset=False):
+        with self._lock:
+            stats = dict(self._stats)
+            if reset:
+                self._reset()
+        return stats
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+
+def main(args):
+    server = MockApiServer((args.host, args.port), latency=args.latency, jitter=args.jitter,
+                           capacity=args.capacity, error_rate=args.error_rate,
+                           throttle_rate=args.throttle_rate, retry_after=args.retry_after, seed=args.seed)
+    # Première ligne lue par benchmarks.save_bench pour connaître le port choisi
+    print(server.url, flush=True)
+    print(f"Mock ingestion API: {server.url}/api/articles and {server.url}/api/articles/bulk", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def add_arguments(parser):
+    parser.add_argument('--latency', type=float, default=0.02, help='seconds per request')
+    parser.add_argument('--jitter', type=float, default=0.01, help='extra random latency, seconds')
+    parser.add_argument('--capacity', type=int, default=8,
+                        help='requests served at full speed at once (0 = unlimited)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of requests answered 500')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='share of requests answered 429')
+    parser.add_argument('--retry-after', type=float, default=1.0, help='Retry-After of the 429s, seconds')
+    parser.add_argument('--seed', type=int, default=42)
+
+
+def server_arguments(args):
+    """Options de ligne de commande reproduisant `args` pour un serveur lancé en sous-processus"""
+    return [
+        '--latency', str(args.latency), '--jitter', str(args.jitter), '--capacity', str(args.capacity),
+        '--error-rate', str(args.error_rate), '--throttle-rate', str(args.throttle_rate),
+        '--retry-after', str(args.retry_after), '--seed', str(args.seed),
+    ]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local stand-in for the ingestion API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001, help='0 picks a free port')
+    add_arguments(parser)
+    main(parser.parse_args())
@@ -0,0 +1,78 @@
+# Near-duplicate index lookup cost with a large persistent index
+#
+#   python -m benchmarks.neardup_bench [--entries 100000] [--lookups 2000] [--distances 3 5]
+#
+# Fills a throw-away NearDupIndex with random signatures, then times find()
+# for unrelated signatures (misses) and for stored signatures with a few bits
+# flipped (near-duplicates, all of which must be found). SimHash itself is
+# timed on the article fixtures.
+import argparse
+import os
+import random
+import re
+import tempfile
+import time
+from benchmarks.parse_compare import load_pages, SITES
+from utils.neardup import NearDupIndex, simhash
+
+_TAGS = re.compile(r'<(script|style)[^>]*>.*?</\1>|<[^>]+>', re.S)
+
+
+def fixture_texts():
+    return [_TAGS.sub(' ', html) for site in SITES for _, html in load_pages(site)]
+
+
+def bench_index(entries, lookups, max_distance, rng):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'neardup.sqlite3')
+        index = NearDupIndex(path, max_distance=max_distance, ttl_days=0, max_entries=0)
+        stored = [rng.getrandbits(64) for _ in range(entries)]
+        started = time.perf_counter()
+        for i in range(0, entries, 5000):
+            index.add((f'https://example.invalid/{j}', stored[j], 'bench')
+                      for j in range(i, min(entries, i + 5000)))
+        fill = time.perf_counter() - started
+
+        misses = [rng.getrandbits(64) for _ in range(lookups)]
+        started = time.perf_counter()
+        false_hits = sum(1 for fingerprint in misses if index.find(fingerprint))
+        miss_time = (time.perf_counter() - started) / lookups
+
+        found = 0
+        started = time.perf_counter()
+        for _ in range(lookups):
+            fingerprint = rng.choice(stored)
+            for bit in rng.sample(range(64), max_distance):
+                fingerprint ^= 1 << bit
+            found += index.find(fingerprint) is not None
+        hit_time = (time.perf_counter() - started) / lookups
+        size = os.path.getsize(path) + sum(
+            os.path.getsize(path + suffix) for suffix in ('-wal',) if os.path.exists(path + suffix))
+        index.close()
+    return fill, miss_time, false_hits, hit_time, found, size
+
+
+def main(entries, lookups, distances):
+    texts = fixture_texts()
+    started = time.perf_counter()
+    for text in texts:
+        simhash(text)
+    print(f"simhash: {(time.perf_counter() - started) / len(texts) * 1000:.2f} ms per article "
+          f"({len(texts)} fixture pages)")
+
+    rng = random.Random(42)
+    print(f"{'distance':>8} {'bands':>6} {'fill':>8} {'miss':>9} {'near-dup':>9} {'found':>11} {'db size':>9}")
+    for max_distance in distances:
+        fill, miss, false_hits, hit, found, size = bench_index(entries, lookups, max_distance, rng)
+        print(f"{max_distance:>8} {max_distance + 1:>6} {fill:>7.1f}s {miss * 1e6:>7.0f}us {hit * 1e6:>7.0f}us "
+              f"{found:>5}/{lookups:<5} {size / 1e6:>7.1f}MB"
+              + (f"  ({false_hits} false hits)" if false_hits else ''))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the near-duplicate LSH index')
+    parser.add_argument('--entries', type=int, default=100000)
+    parser.add_argument('--lookups', type=int, default=2000)
+    parser.add_argument('--distances', type=int, nargs='+', default=[3, 5])
+    args = parser.parse_args()
+    main(args.entries, args.lookups, args.distances)
@@ -0,0 +1,78 @@
+# Compare article parsing per site: html.parser (old) vs lxml vs lxml partial parse
+#
+#   python -m benchmarks.parse_compare [--repeat 20] [--sites bbc sur7cd]
+#
+# Pages are read from benchmarks/fixtures/<site>/article_*.html. Times are
+# the full extract_article() call (parse + extraction) per page; the last
+# column lists the fields whose value differs from the html.parser output.
+import argparse
+import contextlib
+import glob
+import importlib
+import io
+import os
+import time
+from utils import parse
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+SITES = ['france24', 'mediacongo', 'bbc', 'sur7cd', 'radio_okapi']
+MODES = ['html.parser', 'lxml', 'partial']
+
+
+def load_pages(site, pattern='article_*.html'):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES, site, pattern))):
+        with open(path, encoding='utf-8') as f:
+            pages.append((os.path.basename(path), f.read()))
+    return pages
+
+
+def candidate_for(site, name):
+    return {'title': f'{site} fixture {name}', 'url': f'https://example.invalid/{site}/{name}', 'image_url': None}
+
+
+def run_mode(module, site, pages, mode, repeat):
+    parse.set_mode(mode)
+    outputs = {}
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            for name, html in pages:
+                outputs[name] = module.extract_article(html, candidate_for(site, name))
+    elapsed = time.perf_counter() - started
+    return elapsed / (repeat * len(pages)), outputs
+
+
+def diff_fields(reference, other):
+    if reference is None or other is None:
+        return [] if reference is other else ['<article>']
+    return sorted(k for k in set(reference) | set(other) if reference.get(k) != other.get(k))
+
+
+def main(sites=SITES, repeat=20):
+    previous = parse.get_mode()
+    print(f"{'site':<12} {'mode':<12} {'ms/page':>9} {'speedup':>8}  differences vs html.parser")
+    try:
+        for site in sites:
+            pages = load_pages(site)
+            if not pages:
+                print(f"{site:<12} (no fixtures)")
+                continue
+            module = importlib.import_module(f'sites.{site}')
+            baseline_time, baseline = run_mode(module, site, pages, 'html.parser', repeat)
+            for mode in MODES:
+                per_page, outputs = (baseline_time, baseline) if mode == 'html.parser' else \
+                    run_mode(module, site, pages, mode, repeat)
+                diffs = sorted({f for name in outputs for f in diff_fields(baseline[name], outputs[name])})
+                print(f"{site:<12} {mode:<12} {per_page * 1000:9.2f} {baseline_time / per_page:7.1f}x  "
+                      f"{', '.join(diffs) or 'identical'}")
+    finally:
+        parse.set_mode(previous)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sites', nargs='*', default=SITES)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    main(args.sites, args.repeat)
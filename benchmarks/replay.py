@@ -0,0 +1,143 @@
+# Local replay server: answers scraper requests from the recorded pages in benchmarks/fixtures
+#
+#   python -m benchmarks.replay [--port 8765]
+#   REPLAY_URL=http://127.0.0.1:8765 FEED_DISCOVERY=false python main.py --dry-run
+#
+# utils.fetch sends https://host/path?query to <REPLAY_URL>/https/host/path?query.
+# Each fixtures/<site>/manifest.json maps listing URLs to their page and gives
+# a regex for article URLs; an article URL gets one of the site's
+# article_*.html pages, always the same one for a given URL. Anything else
+# (feeds, unknown pages) is a 404. GET /__stats returns the request and byte
+# counters as JSON (?reset=1 clears them).
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+from utils.frontier import canonicalize
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+class Corpus:
+    """Pages enregistrées de chaque site, indexées par URL"""
+
+    def __init__(self, root=FIXTURES):
+        self.listings = {}
+        self.articles = []
+        for manifest_path in sorted(glob.glob(os.path.join(root, '*', 'manifest.json'))):
+            directory = os.path.dirname(manifest_path)
+            site = os.path.basename(directory)
+            with open(manifest_path, encoding='utf-8') as f:
+                manifest = json.load(f)
+            for url, name in manifest.get('listings', {}).items():
+                self.listings[canonicalize(url)] = (site, _read(os.path.join(directory, name)))
+            pages = [_read(path) for path in sorted(glob.glob(os.path.join(directory, 'article_*.html')))]
+            if manifest.get('articles') and pages:
+                self.articles.append((site, re.compile(manifest['articles']), pages))
+
+    @property
+    def sites(self):
+        return sorted({site for site, _ in self.listings.values()} | {site for site, _, _ in self.articles})
+
+    def lookup(self, url):
+        """(site, corps) de la page enregistrée pour `url`, ou None"""
+        url = canonicalize(url)
+        if url in self.listings:
+            return self.listings[url]
+        for site, pattern, pages in self.articles:
+            if pattern.search(url):
+                return site, pages[zlib.crc32(url.encode('utf-8')) % len(pages)]
+        return None
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        if parts.path == '/__stats':
+            self._send(200, json.dumps(self.server.snapshot('reset' in parse_qs(parts.query))).encode(),
+                       'application/json')
+            return
+        scheme, _, rest = parts.path.lstrip('/').partition('/')
+        host, _, path = rest.partition('/')
+        url = f'{scheme}://{host}/{path}' + (f'?{parts.query}' if parts.query else '')
+        page = self.server.corpus.lookup(url) if scheme in ('http', 'https') and host else None
+        if page is None:
+            self.server.count(None, 0)
+            self._send(404, b'not recorded', 'text/plain')
+            return
+        site, body = page
+        self.server.count(site, len(body))
+        self._send(200, body, 'text/html; charset=utf-8')
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ReplayServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, corpus=None):
+        super().__init__(address, ReplayHandler)
+        self.corpus = corpus or Corpus()
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def count(self, site, size):
+        with self._lock:
+            entry = self._stats.setdefault(site or 'not_found', {'requests': 0, 'bytes': 0})
+            entry['requests'] += 1
+            entry['bytes'] += size
+
+    def snapshot(self, reset=False):
+        with self._lock:
+            stats = {site: dict(entry) for site, entry in self._stats.items()}
+            if reset:
+                self._stats.clear()
+        return stats
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+
+def main(host, port):
+    server = ReplayServer((host, port))
+    # Première ligne lue par benchmarks.suite pour connaître le port choisi
+    print(server.url, flush=True)
+    print(f"Replaying {', '.join(server.corpus.sites)}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve the recorded fixture pages to the scrapers')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765, help='0 picks a free port')
+    args = parser.parse_args()
+    main(args.host, args.port)
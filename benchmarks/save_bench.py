@@ -0,0 +1,102 @@
+# Load benchmark of the save path (utils.save.save_to_api) against benchmarks.mock_api
+#
+#   python -m benchmarks.save_bench [--sizes 1000 10000 100000] [--modes single bulk bulk-gzip]
+#                                   [--latency 0.02] [--capacity 8] [--throttle-rate 0.01] [--error-rate 0.01]
+#
+# The mock API runs in a child process with the given latency and fault
+# injection; synthetic articles (distinct URLs, fixture-sized content) go
+# through save_to_api() exactly as main.py sends them. Reported per run:
+# articles/s, POST latency p50/p95/p99, retries and 429s seen by the
+# poster, failed articles, and the server-side request count.
+import argparse
+import contextlib
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import urllib.request
+from benchmarks.mock_api import add_arguments, server_arguments
+
+MODES = {'single': (False, False), 'bulk': (True, False), 'bulk-gzip': (True, True)}
+WORDS = ('kinshasa goma gouvernement assemblée nationale ministre élection sécurité économie santé '
+         'province accord paix budget président conflit développement population rapport réunion').split()
+
+
+@contextlib.contextmanager
+def mock_server(args):
+    """Lance benchmarks.mock_api sur un port libre et renvoie son URL"""
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'benchmarks.mock_api', '--port', '0'] + server_arguments(args),
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    try:
+        url = process.stdout.readline().strip()
+        if not url:
+            raise RuntimeError('mock API did not start')
+        yield url
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def server_stats(base_url):
+    with urllib.request.urlopen(f'{base_url}/__stats?reset=1', timeout=5) as resp:
+        return json.load(resp)
+
+
+def synthetic_articles(count, words, run, rng):
+    # Quelques dizaines de textes partagés: 100k articles tiennent en mémoire
+    texts = [' '.join(rng.choice(WORDS) for _ in range(words)) for _ in range(50)]
+    return [{
+        'title': f'Synthetic article {run}-{i}',
+        'url': f'https://bench.invalid/{run}/{i}',
+        'content': texts[i % len(texts)],
+        'image_url': f'https://bench.invalid/{run}/{i}.jpg',
+        'source': 'bench',
+        'published_at': '2026-10-17T08:00:00',
+    } for i in range(count)]
+
+
+def main(args):
+    rng = random.Random(args.seed)
+    rows = []
+    with mock_server(args) as base_url:
+        # Les URLs de l'API sont lues à l'import de config.settings: les fixer avant
+        os.environ['API_URL'] = f'{base_url}/api/articles'
+        os.environ['API_BULK_URL'] = f'{base_url}/api/articles/bulk'
+        from utils.save import save_to_api, save_bulk
+
+        for size in args.sizes:
+            for mode in args.modes:
+                bulk, use_gzip = MODES[mode]
+                articles = synthetic_articles(size, args.words, f'{mode}-{size}', rng)
+                server_stats(base_url)
+                print(f"[+] {size} articles, {mode}")
+                started = time.perf_counter()
+                with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                    if bulk:
+                        summary = save_bulk(articles, use_gzip=use_gzip)
+                    else:
+                        summary = save_to_api(articles, bulk=False)
+                elapsed = time.perf_counter() - started
+                rows.append((size, mode, elapsed, summary['failed'], summary['stats'], server_stats(base_url)))
+
+    print(f"\n{'articles':>8} {'mode':<10} {'articles/s':>10} {'p50':>8} {'p95':>8} {'p99':>8} "
+          f"{'requests':>9} {'retries':>8} {'429':>6} {'failed':>7} {'concurrency':>11}")
+    for size, mode, elapsed, failed, stats, served in rows:
+        latency = [stats[k] * 1000 if stats[k] is not None else 0 for k in ('p50_latency', 'p95_latency', 'p99_latency')]
+        print(f"{size:>8} {mode:<10} {size / elapsed:>10.0f} {latency[0]:>6.0f}ms {latency[1]:>6.0f}ms "
+              f"{latency[2]:>6.0f}ms {served['requests']:>9} {stats['retries']:>8} {stats['throttled']:>6} "
+              f"{failed:>7} {stats['final_concurrency']:>11}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load benchmark of the ingestion path against a mock API')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--modes', nargs='+', default=list(MODES), choices=list(MODES))
+    parser.add_argument('--words', type=int, default=400, help='words of content per article')
+    add_arguments(parser)
+    main(parser.parse_args())
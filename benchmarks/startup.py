@@ -0,0 +1,139 @@
+# Cold-start report: what a cron or container run imports before its first request
+#
+#   python -m benchmarks.startup [--sites bbc] [--repeat 5] [--top 12]
+#   python -m benchmarks.startup --history
+#
+# Each run is a fresh `python -X importtime` interpreter that imports main and
+# loads the selected scrapers through main.discover_scrapers(), as main.py does
+# before scraping. Reported (median over the runs): process wall time, total
+# import time, import time per top-level package (self time of its modules)
+# and the slowest modules (cumulative). Every report is appended to
+# benchmarks/results/startup.jsonl; --history prints that log so cold-start
+# latency can be followed from one revision to the next.
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+from benchmarks.suite import RESULTS_DIR, git_revision
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HISTORY_PATH = os.path.join(RESULTS_DIR, 'startup.jsonl')
+PROBE = 'import sys, main; main.discover_scrapers(sys.argv[1:] or None)'
+
+
+def parse_importtime(stderr):
+    """[(module, profondeur, self µs, cumulé µs)] des lignes `import time:` de -X importtime"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # en-tête "self [us] | cumulative | imported package"
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((name.strip(), depth, int(fields[0]), int(fields[1])))
+    return entries
+
+
+def cold_start(sites):
+    """Un démarrage à froid: (durée du processus en s, entrées importtime)"""
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', PROBE, *sites],
+        capture_output=True, text=True, cwd=ROOT
+    )
+    wall = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f'startup probe failed:\n{result.stderr[-2000:]}')
+    return wall, parse_importtime(result.stderr)
+
+
+def run_report(sites, repeat, top):
+    walls, totals = [], []
+    packages = defaultdict(list)
+    modules = defaultdict(list)
+    for _ in range(repeat):
+        wall, entries = cold_start(sites)
+        walls.append(wall)
+        # Les imports de premier niveau couvrent tout le reste
+        totals.append(sum(cumulative for _, depth, _, cumulative in entries if depth == 0))
+        per_package = defaultdict(int)
+        for name, _, own, cumulative in entries:
+            per_package[name.split('.')[0]] += own
+            modules[name].append(cumulative)
+        for package, own in per_package.items():
+            packages[package].append(own)
+
+    def median_ms(values):
+        # Un module absent d'un run (import conditionnel) compte pour 0
+        return round(statistics.median(values + [0] * (repeat - len(values))) / 1000, 2)
+
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'sites': sites or 'all',
+        'repeat': repeat,
+        'wall_ms': round(statistics.median(walls) * 1000, 1),
+        'import_ms': median_ms(totals),
+        'packages': dict(sorted(((p, median_ms(v)) for p, v in packages.items()),
+                                key=lambda item: item[1], reverse=True)[:top]),
+        'modules': dict(sorted(((m, median_ms(v)) for m, v in modules.items()),
+                               key=lambda item: item[1], reverse=True)[:top]),
+    }
+
+
+def print_report(report):
+    sites = report['sites'] if isinstance(report['sites'], str) else ' '.join(report['sites'])
+    print(f"\nCold start ({sites}, median of {report['repeat']}): "
+          f"{report['wall_ms']:.0f}ms process, {report['import_ms']:.0f}ms importing")
+    print(f"\n{'package':<28} {'self ms':>9}")
+    for name, ms in report['packages'].items():
+        print(f"{name:<28} {ms:>9.1f}")
+    print(f"\n{'module':<40} {'cumulative ms':>14}")
+    for name, ms in report['modules'].items():
+        print(f"{name:<40} {ms:>14.1f}")
+
+
+def print_history(path=HISTORY_PATH):
+    if not os.path.exists(path):
+        print(f"No startup history yet ({path})")
+        return
+    print(f"{'created':<20} {'revision':<10} {'python':<8} {'sites':<24} {'process':>9} {'imports':>9}")
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            r = json.loads(line)
+            sites = r['sites'] if isinstance(r['sites'], str) else ' '.join(r['sites'])
+            print(f"{r['created']:<20} {r['revision'] or '-':<10} {r['python']:<8} {sites[:24]:<24} "
+                  f"{r['wall_ms']:>7.0f}ms {r['import_ms']:>7.0f}ms")
+
+
+def main(sites, repeat, top):
+    # Un premier démarrage non compté: fichiers .pyc et cache disque chauds comme en production
+    cold_start(sites)
+    report = run_report(sites, repeat, top)
+    print_report(report)
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    with open(HISTORY_PATH, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(report) + '\n')
+    print(f"\nAppended to {HISTORY_PATH}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Import-time report of a cold main.py start')
+    parser.add_argument('--sites', nargs='*', default=[], help='scrapers to load (default: all)')
+    parser.add_argument('--repeat', type=int, default=5, help='cold starts measured (median kept)')
+    parser.add_argument('--top', type=int, default=12, help='packages and modules listed')
+    parser.add_argument('--history', action='store_true', help='print the startup log and exit')
+    args = parser.parse_args()
+    if args.history:
+        print_history()
+    else:
+        main(args.sites, args.repeat, args.top)
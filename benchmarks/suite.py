@@ -0,0 +1,248 @@
+# Offline benchmark suite: every scraper end to end against the replay server,
+# plus micro-benchmarks of listing parsing, link discovery and article extraction
+#
+#   python -m benchmarks.suite [--sites bbc sur7cd] [--limit 20] [--repeat 3] [--output run.json]
+#   python -m benchmarks.suite --compare before.json after.json
+#
+# scrape() runs with the real fetch/parse/extract code; benchmarks.replay
+# (started in a child process, so its CPU is not counted) answers every
+# request from benchmarks/fixtures. Feeds, the HTTP cache and the seen-URL
+# index are off so each run fetches the HTML listing and `limit` articles.
+# Results (pages/s, CPU ms per article, peak Python heap, ms per call for
+# the micro-benchmarks) are written as JSON; --compare prints the change
+# between two result files.
+import os
+
+# Avant tout import du projet (les réglages sont lus à l'import)
+os.environ['HTTP_CACHE'] = 'false'
+os.environ['FEED_DISCOVERY'] = 'false'
+
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+import urllib.request
+from datetime import datetime
+from benchmarks.links_bench import LISTING_URLS
+from benchmarks.parse_compare import load_pages, candidate_for, SITES, FIXTURES
+from utils import frontier, parse, seen
+from utils.fetch import set_replay_url
+from utils.links import discover_links
+from utils.runctx import SiteRun, run_in_site
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+# Métriques où une valeur plus haute est meilleure (les autres: plus basse)
+HIGHER_IS_BETTER = {'pages_per_s'}
+
+
+@contextlib.contextmanager
+def replay_server():
+    """Lance benchmarks.replay sur un port libre et renvoie son URL"""
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'benchmarks.replay', '--port', '0'],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    try:
+        url = process.stdout.readline().strip()
+        if not url:
+            raise RuntimeError('replay server did not start')
+        yield url
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def server_stats(base_url):
+    """Compteurs du serveur depuis le dernier appel (remis à zéro)"""
+    with urllib.request.urlopen(f'{base_url}/__stats?reset=1', timeout=5) as resp:
+        return json.load(resp)
+
+
+def scrape_once(module, site, limit):
+    frontier.reset()
+    run = SiteRun(site)
+    with contextlib.redirect_stdout(io.StringIO()):
+        articles = run_in_site(run, module.scrape, limit)
+    return list(articles or [])
+
+
+def bench_scrape(site, limit, repeat, base_url):
+    module = importlib.import_module(f'sites.{site}')
+    # Premier passage non mesuré: imports paresseux, connexions, sélecteurs compilés
+    scrape_once(module, site, limit)
+    server_stats(base_url)
+
+    walls, cpus = [], []
+    articles = pages = size = 0
+    for _ in range(repeat):
+        wall, cpu = time.perf_counter(), time.process_time()
+        articles = len(scrape_once(module, site, limit))
+        walls.append(time.perf_counter() - wall)
+        cpus.append(time.process_time() - cpu)
+        served = server_stats(base_url)
+        pages = sum(entry['requests'] for entry in served.values())
+        size = served.get(site, {}).get('bytes', 0)
+
+    # Pic mémoire mesuré à part: tracemalloc ralentit nettement l'exécution
+    tracemalloc.start()
+    try:
+        scrape_once(module, site, limit)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    server_stats(base_url)
+
+    wall = statistics.median(walls)
+    cpu = statistics.median(cpus)
+    return {
+        'articles': articles,
+        'pages': pages,
+        'bytes': size,
+        'wall_s': round(wall, 4),
+        'pages_per_s': round(pages / wall, 1) if wall else None,
+        'cpu_ms_per_article': round(cpu * 1000 / articles, 2) if articles else None,
+        'peak_mb': round(peak / 1e6, 2),
+    }
+
+
+def per_call_ms(fn, calls, repeat):
+    """Médiane sur `repeat` passages du temps moyen d'un appel, en ms"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for args in calls:
+            fn(*args)
+        samples.append((time.perf_counter() - started) / len(calls))
+    return round(statistics.median(samples) * 1000, 3)
+
+
+def bench_micro(site, repeat):
+    module = importlib.import_module(f'sites.{site}')
+    results = {}
+    listing = load_pages(site, 'listing.html')
+    if listing:
+        html = listing[0][1]
+        results['parse_listing_ms'] = per_call_ms(parse.parse_html, [(html,)], repeat)
+        if site in LISTING_URLS:
+            soup = parse.parse_html(html)
+            results['discover_links_ms'] = per_call_ms(
+                discover_links, [(soup, module.LINK_MATCHER, LISTING_URLS[site])], repeat)
+    pages = load_pages(site)
+    if pages:
+        results['parse_article_ms'] = per_call_ms(
+            parse.parse_article, [(html, module.ARTICLE_CONTAINERS) for _, html in pages], repeat)
+        with contextlib.redirect_stdout(io.StringIO()):
+            results['extract_article_ms'] = per_call_ms(
+                module.extract_article, [(html, candidate_for(site, name)) for name, html in pages], repeat)
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(FIXTURES), check=True).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(sites, limit, repeat, micro_repeat):
+    results = {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'parse_mode': parse.get_mode(),
+            'limit': limit,
+            'repeat': repeat,
+        },
+        'scrape': {},
+        'micro': {},
+    }
+    seen.set_refetch(True)
+    with replay_server() as base_url:
+        set_replay_url(base_url)
+        try:
+            for site in sites:
+                print(f"[+] {site}: scrape() x{repeat}")
+                results['scrape'][site] = bench_scrape(site, limit, repeat, base_url)
+        finally:
+            set_replay_url('')
+    for site in sites:
+        print(f"[+] {site}: micro-benchmarks x{micro_repeat}")
+        results['micro'][site] = bench_micro(site, micro_repeat)
+    return results
+
+
+def print_results(results):
+    print(f"\n{'site':<12} {'articles':>8} {'pages':>6} {'wall':>8} {'pages/s':>8} {'cpu/article':>12} {'peak':>8}")
+    for site, r in results['scrape'].items():
+        cpu = f"{r['cpu_ms_per_article']:.2f}ms" if r['cpu_ms_per_article'] is not None else '-'
+        print(f"{site:<12} {r['articles']:>8} {r['pages']:>6} {r['wall_s']:>7.3f}s {r['pages_per_s'] or 0:>8.1f} "
+              f"{cpu:>12} {r['peak_mb']:>6.2f}MB")
+    print(f"\n{'site':<12} {'parse listing':>14} {'links':>8} {'parse article':>14} {'extract':>9}  (ms per call)")
+    for site, r in results['micro'].items():
+        cells = [r.get(k) for k in ('parse_listing_ms', 'discover_links_ms', 'parse_article_ms', 'extract_article_ms')]
+        cells = [f'{c:.3f}' if c is not None else '-' for c in cells]
+        print(f"{site:<12} {cells[0]:>14} {cells[1]:>8} {cells[2]:>14} {cells[3]:>9}")
+
+
+def _metrics(results):
+    for section in ('scrape', 'micro'):
+        for site, values in results.get(section, {}).items():
+            for name, value in values.items():
+                if isinstance(value, (int, float)) and name not in ('articles', 'pages', 'bytes'):
+                    yield (section, site, name), value
+
+
+def compare(before_path, after_path):
+    with open(before_path, encoding='utf-8') as f:
+        before = json.load(f)
+    with open(after_path, encoding='utf-8') as f:
+        after = json.load(f)
+    old = dict(_metrics(before))
+    print(f"before: {before_path} ({before['meta'].get('revision')}, {before['meta'].get('created')})")
+    print(f"after:  {after_path} ({after['meta'].get('revision')}, {after['meta'].get('created')})\n")
+    print(f"{'site':<12} {'metric':<20} {'before':>10} {'after':>10} {'change':>8}")
+    for key, value in _metrics(after):
+        if key not in old or not old[key]:
+            continue
+        section, site, name = key
+        change = (value - old[key]) / old[key] * 100
+        better = change > 0 if name in HIGHER_IS_BETTER else change < 0
+        flag = '' if abs(change) < 5 else ('  better' if better else '  worse')
+        print(f"{site:<12} {name:<20} {old[key]:>10} {value:>10} {change:>+7.1f}%{flag}")
+
+
+def main(sites, limit, repeat, micro_repeat, output):
+    results = run_suite(sites, limit, repeat, micro_repeat)
+    print_results(results)
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"suite-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Offline end-to-end and micro benchmarks on the recorded fixtures')
+    parser.add_argument('--sites', nargs='+', default=SITES, choices=SITES)
+    parser.add_argument('--limit', type=int, default=20, help='articles per scrape() call')
+    parser.add_argument('--repeat', type=int, default=3, help='timed scrape() runs per site (median kept)')
+    parser.add_argument('--micro-repeat', type=int, default=20)
+    parser.add_argument('--output', help='JSON results file (default: benchmarks/results/suite-<time>.json)')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help='compare two result files')
+    args = parser.parse_args()
+    if args.compare:
+        compare(*args.compare)
+    else:
+        main(args.sites, args.limit, args.repeat, args.micro_repeat, args.output)
@@ -6,3 +6,136 @@ API_URL = os.getenv('API_URL', 'http://127.0.0.1:8001/api/articles')
 USER_AGENT = os.getenv('USER_AGENT', 'ActuVerseScraper/1.0 (+https://actuverse.example)')
 REQUEST_TIMEOUT = int(os.getenv('REQUEST_TIMEOUT', '10'))
 DRY_RUN = False
+
+def env_flag(name, default=False):
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+# Ingestion groupée: N articles par requête vers API_BULK_URL
+API_BULK = env_flag('API_BULK')
+API_BULK_URL = os.getenv('API_BULK_URL', API_URL.rstrip('/') + '/bulk')
+API_BULK_MAX_ITEMS = int(os.getenv('API_BULK_MAX_ITEMS', '50'))
+API_BULK_MAX_BYTES = int(os.getenv('API_BULK_MAX_BYTES', str(1024 * 1024)))
+API_GZIP = env_flag('API_GZIP')
+
+# Envoi concurrent adaptatif (AIMD): requêtes POST simultanées vers l'API
+API_CONCURRENCY_START = int(os.getenv('API_CONCURRENCY_START', '4'))
+API_MAX_CONCURRENCY = int(os.getenv('API_MAX_CONCURRENCY', '16'))
+API_TARGET_LATENCY = float(os.getenv('API_TARGET_LATENCY', '1.0'))
+API_MAX_ATTEMPTS = int(os.getenv('API_MAX_ATTEMPTS', '5'))
+# Disjoncteur: après N erreurs de connexion consécutives, les envois restants échouent tout de suite
+# pendant API_BREAKER_COOLDOWN secondes (puis une requête d'essai)
+API_BREAKER_ERRORS = int(os.getenv('API_BREAKER_ERRORS', '5'))
+API_BREAKER_COOLDOWN = float(os.getenv('API_BREAKER_COOLDOWN', '30'))
+
+# Deadline (secondes) d'un site en mode --parallel
+SITE_TIMEOUT = float(os.getenv('SITE_TIMEOUT', '120'))
+
+# Répertoire des états persistants entre deux runs (index, caches)
+STATE_DIR = os.getenv('STATE_DIR', 'data')
+
+# Index des URLs déjà acceptées par l'API: on ne les re-télécharge pas
+SEEN_DB_PATH = os.getenv('SEEN_DB_PATH', os.path.join(STATE_DIR, 'seen.sqlite3'))
+SEEN_TTL_DAYS = float(os.getenv('SEEN_TTL_DAYS', '30'))
+SEEN_MAX_ENTRIES = int(os.getenv('SEEN_MAX_ENTRIES', '200000'))
+
+# Quasi-doublons de contenu (SimHash 64 bits + index LSH persistant): 'drop', 'tag' ou 'off'
+NEARDUP_MODE = os.getenv('NEARDUP_MODE', 'drop')
+NEARDUP_DB_PATH = os.getenv('NEARDUP_DB_PATH', os.path.join(STATE_DIR, 'neardup.sqlite3'))
+# Bits différents tolérés sur 64: 0 = copie exacte, 5 ~ quelques phrases réécrites
+NEARDUP_MAX_DISTANCE = int(os.getenv('NEARDUP_MAX_DISTANCE', '5'))
+NEARDUP_TTL_DAYS = float(os.getenv('NEARDUP_TTL_DAYS', str(SEEN_TTL_DAYS)))
+NEARDUP_MAX_ENTRIES = int(os.getenv('NEARDUP_MAX_ENTRIES', str(SEEN_MAX_ENTRIES)))
+
+# Cache HTTP disque (ETag / Last-Modified), borné en taille avec éviction LRU
+HTTP_CACHE = env_flag('HTTP_CACHE', True)
+HTTP_CACHE_DIR = os.getenv('HTTP_CACHE_DIR', os.path.join(STATE_DIR, 'http-cache'))
+HTTP_CACHE_MAX_BYTES = int(os.getenv('HTTP_CACHE_MAX_MB', '200')) * 1024 * 1024
+
+# Empreinte des liens de la page de liste: site sauté si elle n'a pas changé depuis le dernier run complet
+LISTING_SKIP = env_flag('LISTING_SKIP', True)
+LISTING_STATE_PATH = os.getenv('LISTING_STATE_PATH', os.path.join(STATE_DIR, 'listings.sqlite3'))
+# Au-delà, la liste est reparcourue même inchangée
+LISTING_MAX_AGE_MINUTES = float(os.getenv('LISTING_MAX_AGE_MINUTES', '360'))
+
+# Métriques du run (temps par étape et par site, compteurs): texte Prometheus et résumé JSON ('' = pas d'export)
+METRICS_PROM_PATH = os.getenv('METRICS_PROM_PATH', os.path.join(STATE_DIR, 'metrics.prom'))
+METRICS_JSON_PATH = os.getenv('METRICS_JSON_PATH', os.path.join(STATE_DIR, 'run-summary.json'))
+
+# Serveur de rejeu (benchmarks.replay): toutes les requêtes des scrapers y sont redirigées
+REPLAY_URL = os.getenv('REPLAY_URL', '')
+
+# Parseur des pages: 'partial' (lxml, sous-arbres utiles), 'lxml' ou 'html.parser'
+HTML_PARSE_MODE = os.getenv('HTML_PARSE_MODE', 'partial')
+
+# Extraction des articles dans un pool de processus (hors GIL): 0 = dans les threads, 'auto' = un par cœur
+_extract_processes = os.getenv('EXTRACT_PROCESSES', '0').strip().lower()
+EXTRACT_PROCESSES = (os.cpu_count() or 1) if _extract_processes == 'auto' else max(0, int(_extract_processes or 0))
+# Temps CPU max (secondes) de l'extraction d'une page dans le pool: au-delà, la page est abandonnée
+EXTRACT_CPU_LIMIT = float(os.getenv('EXTRACT_CPU_LIMIT', '5'))
+
+# Nombre de pages d'articles récupérées en parallèle par site
+SCRAPER_CONCURRENCY = int(os.getenv('SCRAPER_CONCURRENCY', '4'))
+
+# Corps de réponse max téléchargé par requête (Mo, 0 = illimité), <SITE>_FETCH_MAX_MB par site
+FETCH_MAX_MB = float(os.getenv('FETCH_MAX_MB', '5'))
+
+# Taille max du pool de connexions partagé par le moteur asyncio (0 = illimité)
+ASYNC_MAX_CONNECTIONS = int(os.getenv('ASYNC_MAX_CONNECTIONS', '1000'))
+
+# Client HTTP partagé: connexions gardées par hôte (0 = concurrence max des sites)
+HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', '0'))
+HTTP_POOL_HOSTS = int(os.getenv('HTTP_POOL_HOSTS', '20'))
+DNS_CACHE_TTL = float(os.getenv('DNS_CACHE_TTL', '300'))
+
+# Pipeline en flux: articles envoyés par lots dès leur extraction (file bornée = back-pressure)
+STREAM = env_flag('STREAM', True)
+STREAM_QUEUE_SIZE = int(os.getenv('STREAM_QUEUE_SIZE', '100'))
+STREAM_BATCH_SIZE = int(os.getenv('STREAM_BATCH_SIZE', '20'))
+STREAM_FLUSH_SECONDS = float(os.getenv('STREAM_FLUSH_SECONDS', '2'))
+
+# Découverte par flux RSS / sitemaps news, repli sur la page HTML si flux absent ou périmé
+FEED_DISCOVERY = env_flag('FEED_DISCOVERY', True)
+FEED_MAX_AGE_HOURS = float(os.getenv('FEED_MAX_AGE_HOURS', '48'))
+
+# Mode --daemon: minutes entre deux passages d'un site (<SITE>_INTERVAL_MINUTES pour un site)
+SCRAPE_INTERVAL_MINUTES = float(os.getenv('SCRAPE_INTERVAL_MINUTES', '15'))
+# Intervalle adaptatif: appris du débit d'articles nouveaux de chaque site, entre POLL_MIN et POLL_MAX
+POLL_ADAPTIVE = env_flag('POLL_ADAPTIVE', True)
+POLL_TARGET_NEW = int(os.getenv('POLL_TARGET_NEW', '3'))
+POLL_MIN_MINUTES = float(os.getenv('POLL_MIN_MINUTES', '2'))
+POLL_MAX_MINUTES = float(os.getenv('POLL_MAX_MINUTES', '120'))
+POLL_STATE_PATH = os.getenv('POLL_STATE_PATH', os.path.join(STATE_DIR, 'polling.sqlite3'))
+
+def site_concurrency(site, default=None):
+    """Concurrence d'un site: <SITE>_CONCURRENCY, sinon SCRAPER_CONCURRENCY"""
+    value = os.getenv(f'{site.upper()}_CONCURRENCY')
+    if value:
+        return max(1, int(value))
+    return max(1, default or SCRAPER_CONCURRENCY)
+
+def site_fetch_max_bytes(site):
+    """Taille max d'un corps de réponse pour `site` (octets, 0 = illimité)"""
+    value = os.getenv(f'{site.upper()}_FETCH_MAX_MB') if site else None
+    return int(float(value or FETCH_MAX_MB) * 1024 * 1024)
+
+def site_interval(site):
+    """Minutes entre deux passages d'un site en mode --daemon"""
+    value = os.getenv(f'{site.upper()}_INTERVAL_MINUTES')
+    return max(0.1, float(value) if value else SCRAPE_INTERVAL_MINUTES)
+
+def site_poll_bounds(site):
+    """(min, max) minutes de l'intervalle adaptatif: <SITE>_POLL_MIN/MAX_MINUTES, sinon POLL_MIN/MAX_MINUTES"""
+    low = float(os.getenv(f'{site.upper()}_POLL_MIN_MINUTES') or POLL_MIN_MINUTES)
+    high = float(os.getenv(f'{site.upper()}_POLL_MAX_MINUTES') or POLL_MAX_MINUTES)
+    return max(0.1, low), max(0.1, low, high)
+
+def max_site_concurrency():
+    """Plus grande concurrence configurée (SCRAPER_CONCURRENCY ou <SITE>_CONCURRENCY)"""
+    values = [SCRAPER_CONCURRENCY]
+    for name, value in os.environ.items():
+        if name.endswith('_CONCURRENCY') and not name.startswith(('API_', 'SCRAPER_')) and value.isdigit():
+            values.append(int(value))
+    return max(1, *values)
@@ -1,88 +1,490 @@
 # ActuVerse scraper - orchestrator
 import argparse
+import asyncio
 import importlib
+import itertools
 import os
 import pkgutil
+import signal
 import sys
-from datetime import datetime
-from utils.save import save_to_api
-from utils.fetch import get_session
-from config.settings import DRY_RUN, API_URL
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from utils.save import save_to_api, StreamSaver
+from utils.pipeline import StreamPipeline, article_url
+from utils.fetch import get_session, abort_count, compression_stats
+from utils import seen, httpcache, neardup, frontier, metrics, listing, offload
+from utils.runctx import SiteRun, run_in_site, run_in_site_async
+from utils.polling import PollingStore
+from config.settings import (
+    DRY_RUN, API_URL, SITE_TIMEOUT, STREAM, METRICS_PROM_PATH, METRICS_JSON_PATH, POLL_ADAPTIVE,
+    site_interval
+)
 
 SITES_PACKAGE = 'sites'
 
-def discover_scrapers():
-    scrapers = []
+def scraper_names():
+    """Noms des modules de sites/, lus sur le disque sans les importer"""
     package = importlib.import_module(SITES_PACKAGE)
-    for finder, name, ispkg in pkgutil.iter_modules(package.__path__):
-        if name.startswith('_'):
-            continue
+    return [name for _, name, _ in pkgutil.iter_modules(package.__path__) if not name.startswith('_')]
+
+def discover_scrapers(selected=None):
+    """Importe les scrapers de sites/ (seulement ceux de `selected` s'il est donné).
+
+    Les modules non sélectionnés ne sont jamais importés (démarrage à froid de cron / conteneur).
+    """
+    names = scraper_names()
+    if selected:
+        unknown = sorted(set(selected) - set(names))
+        if unknown:
+            print(f"[!] Unknown scrapers: {', '.join(unknown)}")
+        names = [name for name in names if name in selected]
+    scrapers = []
+    for name in names:
         module = importlib.import_module(f'{SITES_PACKAGE}.{name}')
-        if hasattr(module, 'scrape'):
-            scrapers.append((name, module.scrape))
+        scrape_async = getattr(module, 'scrape_async', None)
+        if hasattr(module, 'scrape') or scrape_async:
+            # (nom, scrape synchrone ou None, scrape_async ou None)
+            scrapers.append((name, getattr(module, 'scrape', None), scrape_async))
     return scrapers
 
 def dedupe_by_url(articles):
     seen = set()
     out = []
     for a in articles:
-        url = a.get('url') or a.get('link') or a.get('source_url')
+        url = article_url(a)
         if not url:
             continue
         if url in seen:
+            metrics.reject('duplicate_url')
             continue
         seen.add(url)
         out.append(a)
     return out
 
-def main(dry_run=False, selected=None, show_full_content=False):
-    scrapers = discover_scrapers()
-    if selected:
-        scrapers = [s for s in scrapers if s[0] in selected]
-    all_articles = []
-    for name, fn in scrapers:
+def run_sequential(scrapers, sink=None):
+    runs = []
+    for name, fn, async_fn in scrapers:
+        run = SiteRun(name, sink=sink)
+        if fn is None:
+            fn = lambda run=run, async_fn=async_fn: asyncio.run(run_in_site_async(run, async_fn))
         try:
             print(f"[+] Running scraper: {name}")
-            site_articles = fn()
-            print(f"    -> {len(site_articles)} items returned by {name}")
-            all_articles.extend(site_articles)
+            site_articles = run_in_site(run, fn)
+            run.finish('ok', articles=site_articles)
+            print(f"    -> {run.article_count()} items returned by {name}")
         except Exception as e:
+            run.finish('error', e)
             print(f"[!] Error running {name}: {e}")
+        runs.append(run)
+    return runs
+
+def run_parallel(scrapers, timeout=SITE_TIMEOUT, sink=None):
+    """Lance chaque scraper dans son propre thread, avec une deadline par site.
+
+    Un site qui dépasse sa deadline est marqué 'timeout' et on garde les
+    articles déjà extraits. Les threads sont daemon: un site bloqué
+    n'empêche pas le processus de se terminer. Avec `sink`, les articles
+    partent vers le pipeline en flux dès leur extraction.
+    """
+    runs = []
+    threads = []
+    for name, fn, async_fn in scrapers:
+        run = SiteRun(name, timeout, sink=sink)
+        if fn is None:
+            fn = lambda run=run, async_fn=async_fn: asyncio.run(run_in_site_async(run, async_fn))
+
+        def target(run=run, fn=fn):
+            try:
+                site_articles = run_in_site(run, fn)
+                if run.finish('ok', articles=site_articles):
+                    print(f"    -> {run.article_count()} items returned by {run.name}")
+            except Exception as e:
+                run.finish('error', e)
+                print(f"[!] Error running {run.name}: {e}")
+
+        print(f"[+] Starting scraper: {name}")
+        thread = threading.Thread(target=target, name=f'scraper-{name}', daemon=True)
+        thread.start()
+        runs.append(run)
+        threads.append(thread)
+
+    for run, thread in zip(runs, threads):
+        thread.join(run.remaining())
+        if thread.is_alive() and run.finish('timeout'):
+            print(f"[!] {run.name} timed out after {timeout}s, keeping {run.article_count()} partial items")
+    return runs
+
+def run_async(scrapers, timeout=SITE_TIMEOUT, sink=None):
+    """Moteur asyncio: tous les scrape_async() tournent sur une seule boucle.
+
+    Les scrapers sans scrape_async() gardent leur scrape() synchrone, exécuté
+    dans un thread daemon. Même deadline par site que run_parallel().
+    """
+    return asyncio.run(_run_async_all(scrapers, timeout, sink))
+
+async def _run_async_all(scrapers, timeout, sink=None):
+    runs = [SiteRun(name, timeout, sink=sink) for name, _, _ in scrapers]
+    await asyncio.gather(*(
+        _run_site_async(run, fn, async_fn)
+        for run, (_, fn, async_fn) in zip(runs, scrapers)
+    ))
+    return runs
+
+async def _run_site_async(run, fn, async_fn):
+    if async_fn is not None:
+        print(f"[+] Starting async scraper: {run.name}")
+        awaitable = run_in_site_async(run, async_fn)
+    else:
+        print(f"[+] Starting scraper in thread: {run.name}")
+        awaitable = _in_daemon_thread(run_in_site, run, fn)
+    try:
+        site_articles = await asyncio.wait_for(awaitable, run.remaining())
+        if run.finish('ok', articles=site_articles):
+            print(f"    -> {run.article_count()} items returned by {run.name}")
+    except asyncio.TimeoutError:
+        if run.finish('timeout'):
+            print(f"[!] {run.name} timed out, keeping {run.article_count()} partial items")
+    except Exception as e:
+        run.finish('error', e)
+        print(f"[!] Error running {run.name}: {e}")
+
+def _in_daemon_thread(fn, *args):
+    # Pas de run_in_executor: un site bloqué ne doit pas retenir la fermeture de la boucle
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def deliver(setter, value):
+        if not future.done():
+            setter(value)
+
+    def target():
+        try:
+            result = fn(*args)
+            loop.call_soon_threadsafe(deliver, future.set_result, result)
+        except Exception as e:
+            loop.call_soon_threadsafe(deliver, future.set_exception, e)
+
+    threading.Thread(target=target, daemon=True).start()
+    return future
+
+def print_run_summary(runs):
+    print("[+] Per-site summary:")
+    for run in runs:
+        count = run.article_count()
+        line = f"    {run.name:<12} {run.status:<8} {count:>3} items  {run.elapsed:6.1f}s"
+        cache = httpcache.site_stats(run.name)
+        if cache['hits'] or cache['misses']:
+            line += (f"  cache {cache['hits']}/{cache['hits'] + cache['misses']} hits,"
+                     f" {cache['bytes_saved'] / 1024:.0f} KB saved")
+        urls = frontier.site_stats(run.name)
+        if urls['duplicates']:
+            line += f"  {urls['duplicates']}/{urls['submitted']} duplicate URLs skipped"
+        transfer = compression_stats(run.name)
+        if transfer['ratio'] and transfer['ratio'] > 1.05:
+            encodings = '/'.join(sorted(e for e in transfer['encodings'] if e != 'identity')) or 'identity'
+            line += f"  {transfer['ratio']:.1f}x {encodings} ({transfer['wire'] / 1024:.0f} KB on the wire)"
+        aborted = abort_count(run.name)
+        if aborted:
+            line += f"  {aborted} downloads aborted (type/size)"
+        links = listing.site_stats(run.name)
+        if links is not None:
+            line += f"  listing unchanged ({links} links), skipped"
+        if run.error:
+            line += f"  ({run.error})"
+        print(line)
+
+def print_neardup_summary():
+    stats = neardup.stats()
+    if stats['dropped'] or stats['tagged']:
+        print(f"[+] Near-duplicates: {stats['dropped']} dropped, {stats['tagged']} tagged "
+              f"out of {stats['checked']} fingerprinted articles")
+
+def print_metrics_summary():
+    slowest = metrics.slowest_stages()
+    if slowest:
+        print("[+] Slowest stages: " + ", ".join(f"{site} {stage} {seconds:.1f}s" for site, stage, seconds in slowest))
+
+def export_metrics():
+    try:
+        metrics.export(METRICS_PROM_PATH, METRICS_JSON_PATH)
+    except OSError as e:
+        print(f"[!] Could not write run metrics: {e}")
+
+def print_article(i, art, show_full_content=False):
+    print(f"--- {i} ---")
+    print(f"Title: {art.get('title')}")
+    print(f"URL: {art.get('url')}")
+    print(f"Author: {art.get('author', 'N/A')}")
+    print(f"Published: {art.get('published_at', 'N/A')}")
+    print(f"Image: {art.get('image_url', 'No image')}")
+    content = art.get('content', '')
+    if content:
+        print(f"Content ({len(content)} chars):")
+        if show_full_content:
+            print(content)
+            print(f"[contenu complet affiché - {len(content)} caractères]")
+        else:
+            # Afficher les 500 premiers caractères au lieu de 200
+            print(f"{content[:500]}...")
+            print(f"[... reste {len(content)-500} caractères ...]" if len(content) > 500 else "[contenu complet affiché]")
+    else:
+        print("Content: No content found")
+    print(f"Source: {art.get('source', 'N/A')}")
+    print()
 
-    all_articles = dedupe_by_url(all_articles)
+def dry_run_handler(show_full_content=False, max_items=30):
+    """Lots du pipeline en flux affichés au lieu d'être envoyés (30 premiers articles)"""
+    numbers = itertools.count(1)
+
+    def handle(batch):
+        for art in neardup.filter_near_duplicates(batch):
+            i = next(numbers)
+            if i <= max_items:
+                print_article(i, art, show_full_content)
+    return handle
+
+def ingest_handler(saver):
+    """Lots du pipeline en flux envoyés à l'API, URLs acceptées enregistrées aussitôt"""
+    def handle(batch):
+        kept = neardup.filter_near_duplicates(batch)
+        seen.mark_near_duplicates(batch, kept)
+        batch = kept
+        if not batch:
+            return
+        results = saver.save(batch)
+        recorded = seen.mark_ingested(results, batch)
+        neardup.record_ingested(results, batch)
+        print(f"[+] {recorded} URLs recorded as ingested")
+    return handle
+
+def run_scrapers(scrapers, parallel=False, site_timeout=SITE_TIMEOUT, use_async=False, sink=None):
+    if use_async:
+        return run_async(scrapers, site_timeout, sink)
+    if parallel:
+        return run_parallel(scrapers, site_timeout, sink)
+    return run_sequential(scrapers, sink)
+
+def main(dry_run=False, selected=None, show_full_content=False, parallel=False,
+         site_timeout=SITE_TIMEOUT, use_async=False, bulk=None, refetch=False, stream=STREAM):
+    seen.set_refetch(refetch)
+    frontier.reset()
+    listing.reset()
+    seen.reset_outcomes()
+    metrics.reset()
+    try:
+        _run(dry_run, selected, show_full_content, parallel, site_timeout, use_async, bulk, stream)
+    finally:
+        offload.shutdown()
+        print_metrics_summary()
+        export_metrics()
+
+def _run(dry_run, selected, show_full_content, parallel, site_timeout, use_async, bulk, stream):
+    scrapers = discover_scrapers(selected)
+
+    if stream:
+        # Articles dédupliqués et envoyés par lots pendant que les scrapers tournent
+        saver = None if dry_run else StreamSaver(bulk)
+        handler = dry_run_handler(show_full_content) if dry_run else ingest_handler(saver)
+        pipeline = StreamPipeline(handler)
+        runs = run_scrapers(scrapers, parallel, site_timeout, use_async, sink=pipeline.put)
+        pipeline.close()
+        if not dry_run:
+            listing.commit(runs)
+        print_run_summary(runs)
+        stats = pipeline.stats()
+        first = stats['first_batch_after']
+        print(f"[+] Total unique articles: {stats['unique']} ({stats['duplicates']} duplicates dropped), "
+              f"{stats['batches']} batches, first batch done after {first if first is not None else 0:.1f}s")
+        print_neardup_summary()
+        if saver is not None:
+            summary = saver.summary()
+            print(f"[+] Streamed ingest: {summary['saved']} saved, {summary['existing']} already stored, "
+              f"{summary['failed']} failed")
+        return
+
+    runs = run_scrapers(scrapers, parallel, site_timeout, use_async)
+    print_run_summary(runs)
+
+    all_articles = []
+    for run in runs:
+        all_articles.extend(run.partial_articles())
+
+    unique_articles = dedupe_by_url(all_articles)
+    all_articles = neardup.filter_near_duplicates(unique_articles)
     print(f"[+] Total unique articles: {len(all_articles)}")
+    print_neardup_summary()
 
     if dry_run:
         for i, art in enumerate(all_articles[:30], 1):
-            print(f"--- {i} ---")
-            print(f"Title: {art.get('title')}")
-            print(f"URL: {art.get('url')}")
-            print(f"Author: {art.get('author', 'N/A')}")
-            print(f"Published: {art.get('published_at', 'N/A')}")
-            print(f"Image: {art.get('image_url', 'No image')}")
-            content = art.get('content', '')
-            if content:
-                print(f"Content ({len(content)} chars):")
-                if show_full_content:
-                    print(content)
-                    print(f"[contenu complet affiché - {len(content)} caractères]")
-                else:
-                    # Afficher les 500 premiers caractères au lieu de 200
-                    print(f"{content[:500]}...")
-                    print(f"[... reste {len(content)-500} caractères ...]" if len(content) > 500 else "[contenu complet affiché]")
-            else:
-                print("Content: No content found")
-            print(f"Source: {art.get('source', 'N/A')}")
-            print()
+            print_article(i, art, show_full_content)
         return
 
+    seen.mark_near_duplicates(unique_articles, all_articles)
+
     # send to API
-    save_to_api(all_articles)
+    summary = save_to_api(all_articles, bulk=bulk)
+    recorded = seen.mark_ingested(summary['results'], all_articles)
+    neardup.record_ingested(summary['results'], all_articles)
+    listing.commit(runs)
+    print(f"[+] {recorded} URLs recorded as ingested")
+
+def new_articles(run):
+    """Articles du site acceptés comme nouveaux par l'API pendant ce run"""
+    return sum(1 for status in seen.outcomes(run.article_urls()).values() if status in (200, 201))
+
+def run_daemon(dry_run=False, selected=None, show_full_content=False, site_timeout=SITE_TIMEOUT,
+               use_async=False, bulk=None, refetch=False):
+    """--daemon: processus permanent, chaque site relancé toutes les site_interval() minutes.
+
+    Le client HTTP, les modules des sites, le pipeline en flux et le poster
+    restent chauds d'un passage à l'autre. Un site encore en cours n'est pas
+    relancé (le passage est sauté). Avec POLL_ADAPTIVE, l'intervalle de
+    chaque site suit son débit d'articles nouveaux (utils.polling).
+    SIGTERM / SIGINT: plus de nouveau passage, on attend les sites en cours,
+    on vide le pipeline et on sort.
+    """
+    import schedule  # seulement pour --daemon
+    seen.set_refetch(refetch)
+    metrics.reset()
+    scrapers = discover_scrapers(selected)
+    if not scrapers:
+        print("[!] No scraper selected")
+        return
+
+    saver = None if dry_run else StreamSaver(bulk)
+    handler = dry_run_handler(show_full_content) if dry_run else ingest_handler(saver)
+    pipeline = StreamPipeline(handler)
+    workers = ThreadPoolExecutor(max_workers=len(scrapers), thread_name_prefix='daemon')
+    stop = threading.Event()
+    running = set()
+    finished = []
+    # site -> URLs des articles de son passage précédent
+    previous_urls = {}
+    lock = threading.Lock()
+    polling = PollingStore() if POLL_ADAPTIVE else None
+
+    def forget_previous(name):
+        # État du passage précédent de ce site seulement: les autres sites peuvent être en cours.
+        # Les URLs réclamées mais jamais ingérées redeviennent disponibles (les ingérées restent
+        # filtrées par utils.seen), et les ensembles ne grossissent pas d'un passage à l'autre
+        frontier.forget(name)
+        listing.forget(name)
+        with lock:
+            urls = previous_urls.pop(name, set())
+        seen.forget_outcomes(urls)
+        pipeline.forget(urls)
+
+    def run_site(scraper):
+        try:
+            forget_previous(scraper[0])
+            # Un seul site, dans son thread avec sa deadline (run_parallel / run_async)
+            runs = run_scrapers([scraper], True, site_timeout, use_async, sink=pipeline.put)
+            # Articles du site passés par l'API avant de juger le run complet (utils.listing)
+            pipeline.flush()
+            if not dry_run:
+                listing.commit(runs)
+            print_run_summary(runs)
+            export_metrics()
+            # Articles vraiment nouveaux (201/200): ni quasi-doublons, ni 409 d'un --refetch
+            new = {run.name: new_articles(run) for run in runs}
+            with lock:
+                finished.extend((run, new[run.name]) for run in runs)
+                previous_urls.update((run.name, run.article_urls()) for run in runs)
+        except Exception as e:
+            print(f"[!] Error running {scraper[0]}: {e}")
+        finally:
+            with lock:
+                running.discard(scraper[0])
+
+    def dispatch(scraper):
+        name = scraper[0]
+        if stop.is_set():
+            return
+        with lock:
+            if name in running:
+                print(f"[*] {name} is still running, skipping this cycle")
+                return
+            running.add(name)
+        print(f"[+] {datetime.now():%H:%M:%S} scheduled run: {name}")
+        workers.submit(run_site, scraper)
+
+    def reschedule(run, new):
+        # Appelé depuis la boucle principale: schedule n'est pas thread-safe
+        if polling is None or dry_run or run.status != 'ok':
+            return
+        minutes, rate = polling.record(run.name, new, site_interval(run.name))
+        job = jobs[run.name]
+        job.interval = max(1, round(minutes * 60))
+        job.next_run = datetime.now() + timedelta(minutes=minutes)
+        learned = f", ~{rate * 60:.1f} new/h" if rate is not None else ''
+        print(f"[*] {run.name}: {new} new articles{learned}, next run in {minutes:.1f} min")
+
+    scheduler = schedule.Scheduler()
+    jobs = {}
+    for scraper in scrapers:
+        name = scraper[0]
+        minutes = polling.interval(name, site_interval(name)) if polling else site_interval(name)
+        jobs[name] = scheduler.every(max(1, round(minutes * 60))).seconds.do(dispatch, scraper)
+        print(f"[*] {name} every {minutes:.1f} min{' (adaptive)' if polling else ''}")
+
+    def request_stop(signum, frame):
+        print(f"[*] {signal.Signals(signum).name} received, finishing running sites...")
+        stop.set()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    # Premier passage de chaque site tout de suite, puis à leur intervalle
+    scheduler.run_all()
+    while not stop.is_set():
+        scheduler.run_pending()
+        idle = scheduler.idle_seconds
+        stop.wait(min(max(idle if idle is not None else 5, 0.5), 5))
+        with lock:
+            done, finished[:] = finished[:], []
+        for run, new in done:
+            reschedule(run, new)
+
+    workers.shutdown(wait=True)
+    offload.shutdown()
+    if polling is not None:
+        polling.close()
+    pipeline.close()
+    stats = pipeline.stats()
+    print(f"[+] Daemon stopped: {stats['unique']} unique articles in {stats['batches']} batches")
+    print_neardup_summary()
+    if saver is not None:
+        summary = saver.summary()
+        print(f"[+] Streamed ingest: {summary['saved']} saved, {summary['existing']} already stored, "
+              f"{summary['failed']} failed")
+    print_metrics_summary()
+    export_metrics()
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument('--dry-run', action='store_true', help='Do not post to API, only print')
     parser.add_argument('--sites', nargs='*', help='Run only specific scrapers (module names)')
     parser.add_argument('--full-content', action='store_true', help='Show full content in dry-run mode')
+    parser.add_argument('--parallel', action='store_true', help='Run all scrapers side by side')
+    parser.add_argument('--site-timeout', type=float, default=SITE_TIMEOUT,
+                        help='Per-site wall-clock deadline in seconds for --parallel/--async')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='Run scrapers on the asyncio engine (scrape_async when available)')
+    parser.add_argument('--bulk', action='store_true', default=None,
+                        help='Post articles in chunks to API_BULK_URL (default: API_BULK)')
+    parser.add_argument('--refetch', action='store_true',
+                        help='Fetch articles again even if already ingested by a previous run')
+    parser.add_argument('--no-stream', dest='stream', action='store_false', default=STREAM,
+                        help='Collect every article before deduping and posting (default: STREAM)')
+    parser.add_argument('--daemon', action='store_true',
+                        help='Keep running and scrape each site every <SITE>_INTERVAL_MINUTES / SCRAPE_INTERVAL_MINUTES')
     args = parser.parse_args()
-    main(dry_run=args.dry_run, selected=args.sites, show_full_content=args.full_content)
+    if args.daemon:
+        run_daemon(dry_run=args.dry_run, selected=args.sites, show_full_content=args.full_content,
+                   site_timeout=args.site_timeout, use_async=args.use_async, bulk=args.bulk,
+                   refetch=args.refetch)
+    else:
+        main(dry_run=args.dry_run, selected=args.sites, show_full_content=args.full_content,
+             parallel=args.parallel, site_timeout=args.site_timeout, use_async=args.use_async,
+             bulk=args.bulk, refetch=args.refetch, stream=args.stream)
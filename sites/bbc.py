@@ -1,187 +1,198 @@
 # Enhanced BBC news scraper - fetches full article content and metadata
-from utils.fetch import get_session
-from bs4 import BeautifulSoup
+from utils.fetch import fetch
+from utils.offload import offload
+from utils.pool import run_limited
+from utils.seen import filter_unseen
+from utils.listing import unchanged_listing
+from utils.metrics import reject
+from config.settings import site_concurrency
+from utils.parse import parse_html, parse_article
+from utils.metadata import compile_rules, extract_metadata
+from utils.links import LinkMatcher, discover_links
+from utils.frontier import UrlRules, submit
+from utils.feeds import discover_feed_links
 from datetime import datetime
 from urllib.parse import urljoin
-import requests
 
 BASE = 'https://www.bbc.com'
 SOURCE = "BBC News"
+CONCURRENCY = site_concurrency('bbc')
+
+# bbc.co.uk and bbc.com serve the same articles; article URLs never need a query
+# (feed links carry ?at_medium=RSS&at_campaign=rss), see utils/frontier.py
+URL_RULES = UrlRules(
+    hosts={'bbc.com': 'www.bbc.com', 'bbc.co.uk': 'www.bbc.com', 'www.bbc.co.uk': 'www.bbc.com'},
+    strip_query=True,
+)
+
+# Discovery feeds (see utils/feeds.py)
+FEEDS = [
+    'https://feeds.bbci.co.uk/news/rss.xml',
+    'https://www.bbc.com/sitemaps/https-sitemap-com-news-1.xml',
+]
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (compatible; ActuVerseBot/1.0; +https://actuverse.com/bot)"
 }
 
+# Sections, live pages and other listings linked from /news
+NON_ARTICLE_PATHS = [
+    '/topics/', '/live/', '/av/', '/videos/', 
+    '/news/uk', '/news/world', '/news/business', '/news/politics',
+    '/news/health', '/news/science', '/news/technology', '/news/entertainment',
+    '/news/sports', '/news/england', '/news/scotland', '/news/wales',
+    '/news/northern_ireland', '/news/africa', '/news/asia', '/news/australia',
+    '/news/europe', '/news/latin_america', '/news/middle_east', '/news/us_canada',
+    '/bbcindepth', '/bbcverify', '/in_pictures'
+]
+
+# Subtrees read by extract_article() (partial parse, see utils/parse.py)
+ARTICLE_CONTAINERS = [
+    'h1', 'time', 'main', 'article', '[role="main"]',
+    '[data-component="text-block"]', '.story-body__inner', '.post-content', '.article-body',
+    '.story-hero__image', '.post-media',
+    '[data-testid="timestamp"]', '.date',
+    '.author', '[data-testid="byline"]', '.byline',
+]
+
+# Metadata by priority, extracted in a single pass (see utils/metadata.py)
+METADATA_RULES = compile_rules({
+    'title': ['h1'],
+    'image': [
+        'meta[property="og:image"]@content',
+        '.story-hero__image img@src|data-src',
+        'article img@src|data-src',
+        '.post-media img@src|data-src',
+        'main img@src|data-src',
+    ],
+    'published_at': [
+        'time[datetime]@datetime|text',
+        '[data-testid="timestamp"]',
+        '.date',
+        'meta[name="article:published_time"]@content',
+    ],
+    'author': [
+        '.author',
+        '[data-testid="byline"]',
+        '.byline',
+        'meta[name="author"]@content',
+    ],
+})
+
 def scrape(limit=10):
-    s = get_session()
-    resp = s.get('https://www.bbc.com/news', timeout=15)
-    soup = BeautifulSoup(resp.text, 'lxml')
+    # RSS feed and news sitemap first; the /news page only when they are missing or stale
+    candidates = discover_feed_links(FEEDS, LINK_MATCHER, headers=HEADERS)
     
-    articles = []
-    processed_count = 0
-    
-    # Find all news links
-    for a in soup.select('a[href*="/news/"]'):
-        if processed_count >= limit:
-            break
-            
-        title = a.get_text(strip=True)
-        href = a.get('href')
+    if not candidates:
+        resp = fetch('https://www.bbc.com/news', timeout=15)
+        soup = parse_html(resp.text)
         
-        if not href or not title or len(title) < 15:
-            continue
-            
-        if href.startswith('/'):
-            href = urljoin(BASE, href)
-            
-        # Filter out non-article links (categories, live pages, etc.)
-        if any(x in href for x in [
-            '/topics/', '/live/', '/av/', '/videos/', 
-            '/news/uk', '/news/world', '/news/business', '/news/politics',
-            '/news/health', '/news/science', '/news/technology', '/news/entertainment',
-            '/news/sports', '/news/england', '/news/scotland', '/news/wales',
-            '/news/northern_ireland', '/news/africa', '/news/asia', '/news/australia',
-            '/news/europe', '/news/latin_america', '/news/middle_east', '/news/us_canada',
-            '/bbcindepth', '/bbcverify', '/in_pictures'
-        ]):
-            continue
-            
-        # Check if it's an individual article (has article ID)
-        if not href.count('/') >= 5 or href.endswith('/news'):
-            continue
-            
-        print(f"    -> Processing BBC article: {title[:60]}...")
-        
-        # Fetch full article content
-        try:
-            article_resp = requests.get(href, headers=HEADERS, timeout=15)
-            article_resp.raise_for_status()
-            article_soup = BeautifulSoup(article_resp.text, 'html.parser')
-            
-            # Get title from article page (more accurate)
-            article_title = article_soup.select_one('h1')
-            if article_title:
-                title = article_title.get_text(strip=True)
-            
-            # Extract content - try multiple selectors
-            content = ""
-            content_selectors = [
-                '[data-component="text-block"]',
-                '.story-body__inner p',
-                'article p',
-                '[role="main"] p',
-                '.post-content p',
-                '.article-body p'
-            ]
-            
-            for selector in content_selectors:
-                paragraphs = article_soup.select(selector)
-                if paragraphs:
-                    content_parts = []
-                    for p in paragraphs:
-                        text = p.get_text(strip=True)
-                        if text and len(text) > 10:
-                            content_parts.append(text)
-                    content = " ".join(content_parts)
-                    if content:
-                        break
-            
-            # If still no content, try broader approach
-            if not content:
-                main_content = article_soup.select_one('main, article, [role="main"]')
-                if main_content:
-                    paragraphs = main_content.find_all('p')
-                    content_parts = []
-                    for p in paragraphs:
-                        text = p.get_text(strip=True)
-                        if text and len(text) > 20:
-                            content_parts.append(text)
-                    content = " ".join(content_parts)
-            
-            # Extract image
-            image_url = None
-            img_selectors = [
-                'meta[property="og:image"]',
-                '.story-hero__image img',
-                'article img',
-                '.post-media img',
-                'main img'
-            ]
-            
-            for selector in img_selectors:
-                img_el = article_soup.select_one(selector)
-                if img_el:
-                    if img_el.name == 'meta':
-                        image_url = img_el.get('content')
-                    else:
-                        image_url = img_el.get('src') or img_el.get('data-src')
-                    
-                    if image_url:
-                        if not image_url.startswith('http'):
-                            image_url = urljoin(BASE, image_url)
-                        break
-            
-            # Extract publication date
-            published_at = None
-            date_selectors = [
-                'time[datetime]',
-                '[data-testid="timestamp"]',
-                '.date',
-                'meta[name="article:published_time"]'
-            ]
-            
-            for selector in date_selectors:
-                date_el = article_soup.select_one(selector)
-                if date_el:
-                    if date_el.name == 'meta':
-                        published_at = date_el.get('content')
-                    elif date_el.name == 'time':
-                        published_at = date_el.get('datetime') or date_el.get_text(strip=True)
-                    else:
-                        published_at = date_el.get_text(strip=True)
-                    break
-            
-            if not published_at:
-                published_at = datetime.now().strftime("%Y-%m-%d")
-            
-            # Extract author
-            author = "BBC News"
-            author_selectors = [
-                '.author',
-                '[data-testid="byline"]',
-                '.byline',
-                'meta[name="author"]'
-            ]
-            
-            for selector in author_selectors:
-                author_el = article_soup.select_one(selector)
-                if author_el:
-                    if author_el.name == 'meta':
-                        author = author_el.get('content')
-                    else:
-                        author_text = author_el.get_text(strip=True)
-                        if author_text and len(author_text) < 100:
-                            author = author_text
-                    break
-            
-            # Only add articles with content
-            if content and len(content) > 100:
-                articles.append({
-                    'title': title,
-                    'url': href,
-                    'content': content,  # Full content without limit
-                    'image_url': image_url,
-                    'author': author,
-                    'published_at': published_at,
-                    'source': SOURCE,
-                })
-                processed_count += 1
-                print(f"    -> ✓ BBC article saved: {len(content)} chars content")
-            else:
-                print(f"    -> ✗ No content found for: {title[:60]}")
-                
-        except Exception as e:
-            print(f"    [!] Error fetching BBC article {href}: {e}")
-            continue
+        # One pass over the page's links, duplicates dropped
+        candidates = discover_links(soup, LINK_MATCHER, BASE)
+    
+    # Same links as the last complete run: nothing new to fetch
+    if unchanged_listing(candidates, URL_RULES):
+        return []
+
+    # Canonical URLs, unique across the run; skip articles ingested by previous runs
+    candidates = filter_unseen(submit(candidates, URL_RULES))
+    
+    # Fetch full article content, CONCURRENCY pages at a time
+    return run_limited(candidates, process_article, limit, CONCURRENCY)
+
+def resolve_link(href, page_url):
+    return urljoin(BASE, href) if href.startswith('/') else href
+
+def is_article_url(url):
+    # Filter out non-article links (categories, live pages, etc.)
+    if any(x in url for x in NON_ARTICLE_PATHS):
+        return False
+    # Check if it's an individual article (has article ID)
+    return url.count('/') >= 5 and not url.endswith('/news')
+
+def process_article(candidate):
+    """Fetch one BBC article page and extract it, or return None"""
+    href = candidate['url']
+    print(f"    -> Processing BBC article: {candidate['title'][:60]}...")
+    
+    try:
+        article_resp = fetch(href, headers=HEADERS, timeout=15)
+        article_resp.raise_for_status()
+        return offload(extract_article, article_resp.text, candidate)
+            
+    except Exception as e:
+        print(f"    [!] Error fetching BBC article {href}: {e}")
+        return None
+
+def extract_article(html, candidate):
+    """Extract a BBC article from its page HTML, or return None"""
+    title = candidate['title']
+    href = candidate['url']
+    article_soup = parse_article(html, ARTICLE_CONTAINERS)
+    
+    # Extract content - try multiple selectors
+    content = ""
+    content_selectors = [
+        '[data-component="text-block"]',
+        '.story-body__inner p',
+        'article p',
+        '[role="main"] p',
+        '.post-content p',
+        '.article-body p'
+    ]
     
-    return articles
+    for selector in content_selectors:
+        paragraphs = article_soup.select(selector)
+        if paragraphs:
+            content_parts = []
+            for p in paragraphs:
+                text = p.get_text(strip=True)
+                if text and len(text) > 10:
+                    content_parts.append(text)
+            content = " ".join(content_parts)
+            if content:
+                break
+    
+    # If still no content, try broader approach
+    if not content:
+        main_content = article_soup.select_one('main, article, [role="main"]')
+        if main_content:
+            paragraphs = main_content.find_all('p')
+            content_parts = []
+            for p in paragraphs:
+                text = p.get_text(strip=True)
+                if text and len(text) > 20:
+                    content_parts.append(text)
+            content = " ".join(content_parts)
+    
+    # Title (more accurate than the link text), image, date and author in one pass
+    meta = extract_metadata(article_soup, METADATA_RULES, base_url=BASE)
+    title = meta['title'] or title
+    image_url = meta['image'] or candidate.get('image_url')
+    published_at = meta['published_at'] or candidate.get('published_at') or datetime.now().strftime("%Y-%m-%d")
+    author = meta['author'] or "BBC News"
+    
+    # Only add articles with content
+    if content and len(content) > 100:
+        print(f"    -> ✓ BBC article saved: {len(content)} chars content")
+        return {
+            'title': title,
+            'url': href,
+            'content': content,  # Full content without limit
+            'image_url': image_url,
+            'author': author,
+            'published_at': published_at,
+            'source': SOURCE,
+        }
+    print(f"    -> ✗ No content found for: {title[:60]}")
+    reject('short_content')
+    return None
+
+# Article links on the /news page, matched in a single pass
+LINK_MATCHER = LinkMatcher(
+    selectors=['a[href*="/news/"]'],
+    resolve=resolve_link,
+    accept=is_article_url,
+    min_title=15,
+    rules=URL_RULES,
+)
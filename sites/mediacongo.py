@@ -1,22 +1,94 @@
 # Enhanced MediaCongo scraper - fetches full article content and metadata
-import requests
-from bs4 import BeautifulSoup
+import re
+from utils.fetch import fetch
+from utils.parse import parse_html, parse_article
+from utils.metadata import compile_rules, extract_metadata
+from utils.links import LinkMatcher, discover_links
+from utils.frontier import UrlRules, submit
 from datetime import datetime
 from urllib.parse import urljoin
-import time
+from utils.offload import offload
+from utils.pool import run_limited
+from utils.seen import filter_unseen
+from utils.runctx import produced
+from utils.listing import unchanged_listing
+from utils.metrics import reject
+from config.settings import site_concurrency
 
 SOURCE = "MediaCongo"
 BASE_URL = "https://www.mediacongo.net"
+CONCURRENCY = site_concurrency('mediacongo')
+
+# Un même article apparaît sous plusieurs slugs: son identité est son numéro
+ARTICLE_ID = re.compile(r'article-actualite-(\d+)')
+
+def article_key(url):
+    match = ARTICLE_ID.search(url)
+    return f'mediacongo:{match.group(1)}' if match else url
+
+# URLs canoniques (voir utils/frontier.py)
+URL_RULES = UrlRules(hosts={'mediacongo.net': 'www.mediacongo.net'}, key=article_key)
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
     "Accept-Language": "fr-FR,fr;q=0.9,en;q=0.8",
-    "Accept-Encoding": "gzip, deflate",
     "Connection": "keep-alive",
     "Upgrade-Insecure-Requests": "1"
 }
 
+# Sous-arbres lus par les extracteurs ci-dessous (parse partiel, voir utils/parse.py).
+# 'p' est gardé: le fallback de extract_article_content parcourt tous les paragraphes.
+ARTICLE_CONTAINERS = [
+    'h1', 'time', 'p', 'article', '[class*="text"]',
+    '.article-content', '.entry-content', '.post-content', '.content-body',
+    '[itemprop="articleBody"]', '.article-body',
+    '.article-image', '.featured-image', '.post-thumbnail', '.content',
+    '.article-date', '.published-date', '.post-date', '.date', '.timestamp',
+    '.article-author', '.byline', '.author-name', '.post-author', '[rel="author"]', '.author', '.writer',
+]
+
+# Métadonnées par priorité, extraites en un seul parcours (voir utils/metadata.py)
+METADATA_RULES = compile_rules({
+    'title': [
+        'h1.article-title',
+        'h1.entry-title',
+        'h1.post-title',
+        '.article-header h1',
+        '.content-header h1',
+        'h1',
+    ],
+    'image': [
+        'meta[property="og:image"]@content',
+        'meta[name="twitter:image"]@content',
+        '.article-image img@src',
+        '.featured-image img@src',
+        '.post-thumbnail img@src',
+        'article img@src',
+        '.content img@src',
+        '.entry-content img@src',
+    ],
+    'published_at': [
+        'meta[property="article:published_time"]@content',
+        'time[datetime]@datetime',
+        '.article-date',
+        '.published-date',
+        '.post-date',
+        '.date',
+        '.timestamp',
+    ],
+    'author': [
+        'meta[name="author"]@content',
+        '.article-author',
+        '.byline',
+        '.author-name',
+        '.post-author',
+        '[rel="author"]',
+        '.author',
+        '.writer',
+    ],
+})
+
 def scrape(limit=10):
     print(f"    -> Starting MediaCongo scraper...")
     
@@ -34,9 +106,9 @@ def scrape(limit=10):
         for base_url in urls_to_try:
             try:
                 print(f"    -> Trying URL: {base_url}")
-                response = requests.get(base_url, headers=HEADERS, timeout=15)
+                response = fetch(base_url, headers=HEADERS, timeout=15)
                 response.raise_for_status()
-                soup = BeautifulSoup(response.text, 'html.parser')
+                soup = parse_html(response.text)
                 
                 # Chercher les liens d'articles
                 article_links = find_article_links(soup, base_url)
@@ -54,105 +126,82 @@ def scrape(limit=10):
             print(f"    -> No articles found from any MediaCongo URL")
             return []
         
-        # Dédupliquer les articles
-        unique_articles = []
-        seen_urls = set()
-        for article in articles:
-            if article['url'] not in seen_urls:
-                seen_urls.add(article['url'])
-                unique_articles.append(article)
+        # Mêmes liens qu'au dernier run complet: rien de nouveau à télécharger
+        if unchanged_listing(articles, URL_RULES):
+            return []
         
-        print(f"    -> Processing {min(len(unique_articles), limit)} unique articles...")
+        # URLs canoniques, uniques sur tout le run; ignorer celles ingérées lors des runs précédents
+        unique_articles = filter_unseen(submit(articles, URL_RULES))
         
-        # Récupérer le contenu complet de chaque article
-        processed_count = 0
-        final_articles = []
+        print(f"    -> Processing up to {limit} of {len(unique_articles)} unique articles ({CONCURRENCY} workers)...")
         
-        for article in unique_articles[:limit]:
-            if processed_count >= limit:
-                break
-                
-            try:
-                print(f"    -> Processing article: {article['title'][:60]}...")
-                
-                # Récupérer la page de l'article
-                article_resp = requests.get(article['url'], headers=HEADERS, timeout=15)
-                article_resp.raise_for_status()
-                article_soup = BeautifulSoup(article_resp.text, 'html.parser')
-                
-                # Extraire le contenu complet
-                content = extract_article_content(article_soup)
-                if not content or len(content) < 200:
-                    print(f"    -> ✗ Insufficient content for: {article['title'][:60]}")
-                    continue
-                
-                # Extraire les métadonnées
-                title = extract_title(article_soup) or article['title']
-                image_url = extract_image(article_soup)
-                published_at = extract_date(article_soup)
-                author = extract_author(article_soup)
-                
-                final_articles.append({
-                    'title': title,
-                    'url': article['url'],
-                    'content': content,
-                    'image_url': image_url,
-                    'author': author,
-                    'published_at': published_at,
-                    'source': SOURCE,
-                })
-                
-                processed_count += 1
-                print(f"    -> ✓ Article saved: {len(content)} chars content")
-                
-                # Petite pause pour éviter d'être bloqué
-                time.sleep(1)
-                
-            except Exception as e:
-                print(f"    -> Error processing {article['url']}: {e}")
-                continue
+        # Récupérer le contenu complet des articles en parallèle
+        final_articles = run_limited(unique_articles, process_article, limit, CONCURRENCY)
         
-        print(f"    -> MediaCongo scraper completed: {len(final_articles)} articles")
+        print(f"    -> MediaCongo scraper completed: {produced(final_articles)} articles")
         return final_articles
         
     except Exception as e:
         print(f"    -> MediaCongo scraper failed: {e}")
         return []
 
-def find_article_links(soup, base_url):
-    """Trouve les liens d'articles dans la page"""
-    articles = []
-    
-    # Tous les liens de la page
-    all_links = soup.find_all('a', href=True)
-    
-    for link in all_links:
-        href = link.get('href')
-        title = link.get_text(strip=True)
-        
-        if not href or not title or len(title) < 15:
-            continue
-        
-        # Construire l'URL absolue
-        if href.startswith('/'):
-            href = urljoin(BASE_URL, href)
-        elif not href.startswith('http'):
-            # Liens relatifs spécifiques à MediaCongo
-            if href.endswith('.html') and 'article-actualite' in href:
-                href = urljoin(BASE_URL, href)
-            else:
-                continue
+def process_article(article):
+    """Récupère une page d'article et en extrait le contenu, ou None"""
+    try:
+        print(f"    -> Processing article: {article['title'][:60]}...")
         
-        # Filtrer pour garder seulement les articles MediaCongo
-        if not is_valid_mediacongo_article(href):
-            continue
+        # Récupérer la page de l'article
+        article_resp = fetch(article['url'], headers=HEADERS, timeout=15)
+        article_resp.raise_for_status()
+        return offload(extract_article, article_resp.text, article)
         
-        articles.append({
-            'title': title,
-            'url': href
-        })
+    except Exception as e:
+        print(f"    -> Error processing {article['url']}: {e}")
+        return None
+
+def extract_article(html, article):
+    """Extrait l'article depuis le HTML de sa page, ou None"""
+    article_soup = parse_article(html, ARTICLE_CONTAINERS)
+    
+    # Extraire le contenu complet
+    content = extract_article_content(article_soup)
+    if not content or len(content) < 200:
+        print(f"    -> ✗ Insufficient content for: {article['title'][:60]}")
+        reject('short_content')
+        return None
+    
+    # Extraire les métadonnées
+    meta = extract_metadata(article_soup, METADATA_RULES, base_url=BASE_URL)
+    title = meta['title'] or article['title']
+    image_url = meta['image']
+    published_at = meta['published_at'] or datetime.now().strftime("%Y-%m-%d")
+    author = meta['author'] or "MediaCongo"
     
-    return articles
+    print(f"    -> ✓ Article saved: {len(content)} chars content")
+    return {
+        'title': title,
+        'url': article['url'],
+        'content': content,
+        'image_url': image_url,
+        'author': author,
+        'published_at': published_at,
+        'source': SOURCE,
+    }
+
+def find_article_links(soup, base_url):
+    """Trouve les liens d'articles dans la page (un seul parcours des <a>)"""
+    return discover_links(soup, LINK_MATCHER, base_url)
+
+def resolve_link(href, base_url):
+    """URL absolue d'un lien de la page, ou None"""
+    if href.startswith('/'):
+        return urljoin(BASE_URL, href)
+    if not href.startswith('http'):
+        # Liens relatifs spécifiques à MediaCongo
+        if href.endswith('.html') and 'article-actualite' in href:
+            return urljoin(BASE_URL, href)
+        return None
+    return href
 
 def is_valid_mediacongo_article(url):
     """Vérifie si l'URL est un article valide MediaCongo"""
@@ -178,26 +227,6 @@ def is_valid_mediacongo_article(url):
     
     return False
 
-def extract_title(soup):
-    """Extraire le titre de l'article"""
-    selectors = [
-        'h1.article-title',
-        'h1.entry-title',
-        'h1.post-title',
-        '.article-header h1',
-        '.content-header h1',
-        'h1'
-    ]
-    
-    for selector in selectors:
-        element = soup.select_one(selector)
-        if element:
-            title = element.get_text(strip=True)
-            if title and len(title) > 5:
-                return title
-    
-    return None
-
 def extract_article_content(soup):
     """Extraire le contenu principal de l'article"""
     # Supprimer les éléments indésirables
@@ -248,91 +277,5 @@ def extract_article_content(soup):
     
     return content.strip()
 
-def extract_image(soup):
-    """Extraire l'image principale de l'article"""
-    # Métadonnées OpenGraph
-    meta_image = soup.select_one('meta[property="og:image"]')
-    if meta_image and meta_image.get('content'):
-        return meta_image['content']
-    
-    # Métadonnées Twitter
-    twitter_image = soup.select_one('meta[name="twitter:image"]')
-    if twitter_image and twitter_image.get('content'):
-        return twitter_image['content']
-    
-    # Images dans le contenu
-    img_selectors = [
-        '.article-image img',
-        '.featured-image img',
-        '.post-thumbnail img',
-        'article img',
-        '.content img',
-        '.entry-content img'
-    ]
-    
-    for selector in img_selectors:
-        img = soup.select_one(selector)
-        if img and img.get('src'):
-            src = img['src']
-            if src.startswith('/'):
-                src = urljoin(BASE_URL, src)
-            return src
-    
-    return None
-
-def extract_date(soup):
-    """Extraire la date de publication"""
-    # Métadonnées
-    meta_date = soup.select_one('meta[property="article:published_time"]')
-    if meta_date and meta_date.get('content'):
-        return meta_date['content']
-    
-    # Élément time
-    time_element = soup.select_one('time[datetime]')
-    if time_element:
-        return time_element.get('datetime')
-    
-    # Sélecteurs spécifiques MediaCongo
-    date_selectors = [
-        '.article-date',
-        '.published-date',
-        '.post-date',
-        '.date',
-        '.timestamp'
-    ]
-    
-    for selector in date_selectors:
-        element = soup.select_one(selector)
-        if element:
-            date_text = element.get_text(strip=True)
-            if date_text:
-                return date_text
-    
-    return datetime.now().strftime("%Y-%m-%d")
-
-def extract_author(soup):
-    """Extraire l'auteur de l'article"""
-    # Métadonnées
-    meta_author = soup.select_one('meta[name="author"]')
-    if meta_author and meta_author.get('content'):
-        return meta_author['content']
-    
-    # Sélecteurs pour l'auteur
-    author_selectors = [
-        '.article-author',
-        '.byline',
-        '.author-name',
-        '.post-author',
-        '[rel="author"]',
-        '.author',
-        '.writer'
-    ]
-    
-    for selector in author_selectors:
-        element = soup.select_one(selector)
-        if element:
-            author = element.get_text(strip=True)
-            if author and len(author) < 100:
-                return author
-    
-    return "MediaCongo"
+# Tous les liens de la page, filtrés par URL (compilé une fois)
+LINK_MATCHER = LinkMatcher(resolve=resolve_link, accept=is_valid_mediacongo_article, min_title=15, rules=URL_RULES)
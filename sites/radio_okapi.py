@@ -1,163 +1,219 @@
-import requests
-from bs4 import BeautifulSoup
+from utils.parse import parse_html, parse_article
 import re
 from urllib.parse import urljoin
-import time
-import random
+from utils.fetch import fetch, get_async_session, async_get
+from utils.offload import offload, offload_async
+from utils.pool import run_limited, run_limited_async
+from utils.seen import filter_unseen
+from utils.runctx import produced
+from utils.listing import unchanged_listing
+from utils.metrics import reject
+from utils.links import LinkMatcher, discover_links
+from utils.frontier import UrlRules, submit
+from utils.feeds import discover_feed_links, discover_feed_links_async
+from config.settings import site_concurrency
+
+BASE_URL = "https://www.radiookapi.net"
+CONCURRENCY = site_concurrency('radio_okapi')
+
+# URLs canoniques (voir utils/frontier.py)
+URL_RULES = UrlRules(hosts={'radiookapi.net': 'www.radiookapi.net'})
+
+# Flux de découverte (voir utils/feeds.py)
+FEEDS = [f"{BASE_URL}/rss.xml"]
+
+# Pattern pour les URLs d'articles Radio Okapi: /YYYY/MM/DD/actualite/categorie/titre
+ARTICLE_PATTERN = re.compile(r'/20\d{2}/\d{2}/\d{2}/actualite/')
+
+# Filtrer les liens trop courts (titre de plus de 10 caractères)
+LINK_MATCHER = LinkMatcher(pattern=ARTICLE_PATTERN, resolve=lambda href, page_url: urljoin(BASE_URL, href),
+                           min_title=11, rules=URL_RULES)
+
+# Sous-arbres lus par extract_article() (parse partiel, voir utils/parse.py)
+ARTICLE_CONTAINERS = [
+    'h1',
+    'div.field-name-body',
+    '//p[contains(., "Publié le")]',
+]
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'fr-FR,fr;q=0.9,en;q=0.8',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1'
+}
 
 def scrape(limit=10):
     """
     Scrape articles from Radio Okapi
     Radio Okapi est la radio officielle de la MONUSCO en RDC, couvrant l'actualité congolaise
     """
-    base_url = "https://www.radiookapi.net"
-    articles_url = f"{base_url}/actualite"
-    
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'fr-FR,fr;q=0.9,en;q=0.8',
-        'Accept-Encoding': 'gzip, deflate, br',
-        'Connection': 'keep-alive',
-        'Upgrade-Insecure-Requests': '1'
-    }
-    
-    articles = []
+    articles_url = f"{BASE_URL}/actualite"
     
     try:
         print(f"🔍 Récupération de la page d'actualités Radio Okapi...")
-        response = requests.get(articles_url, headers=headers, timeout=15)
-        response.raise_for_status()
-        
-        # Forcer l'encodage UTF-8
-        response.encoding = 'utf-8'
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Pattern pour les URLs d'articles Radio Okapi: /YYYY/MM/DD/actualite/categorie/titre
-        article_pattern = re.compile(r'/20\d{2}/\d{2}/\d{2}/actualite/')
+        # Flux RSS d'abord; page d'actualités seulement si le flux est absent ou périmé
+        article_links = discover_feed_links(FEEDS, LINK_MATCHER, headers=HEADERS)
+        if not article_links:
+            response = fetch(articles_url, headers=HEADERS, timeout=15)
+            response.raise_for_status()
+            
+            # Forcer l'encodage UTF-8
+            response.encoding = 'utf-8'
+            
+            soup = parse_html(response.text)
+            article_links = find_article_links(soup)
         
-        # Rechercher tous les liens d'articles
-        article_links = []
-        seen_urls = set()
+        # Page /actualite inchangée depuis le dernier run complet: rien de nouveau à télécharger
+        if unchanged_listing(article_links, URL_RULES):
+            return []
         
-        for link in soup.find_all('a', href=True):
-            href = link['href']
-            if article_pattern.search(href):
-                full_url = urljoin(base_url, href)
-                if full_url not in seen_urls:
-                    # Extraire le titre depuis le texte du lien
-                    title = link.get_text(strip=True)
-                    if title and len(title) > 10:  # Filtrer les liens trop courts
-                        article_links.append({
-                            'url': full_url,
-                            'title': title
-                        })
-                        seen_urls.add(full_url)
+        article_links = filter_unseen(submit(article_links, URL_RULES))
         
         print(f"📰 {len(article_links)} articles trouvés sur Radio Okapi")
         
-        # Limiter le nombre d'articles
-        if limit and len(article_links) > limit:
-            article_links = article_links[:limit]
-            print(f"📝 Limitation à {limit} articles")
+        # Traitement des articles en parallèle, jusqu'à `limit` articles valides
+        articles = run_limited(article_links, process_article, limit, CONCURRENCY)
         
-        # Traitement de chaque article
-        for i, article_link in enumerate(article_links, 1):
-            try:
-                print(f"\n🔍 Traitement article {i}/{len(article_links)}: {article_link['title'][:50]}...")
-                
-                # Récupérer le contenu de l'article
-                time.sleep(random.uniform(1, 2))  # Délai respectueux
-                article_response = requests.get(article_link['url'], headers=headers, timeout=15)
-                article_response.raise_for_status()
-                article_response.encoding = 'utf-8'
-                
-                article_soup = BeautifulSoup(article_response.content, 'html.parser')
-                
-                # Extraire le titre principal (plus précis que le lien)
-                title = article_link['title']
-                title_elem = article_soup.find('h1')
-                if title_elem:
-                    title = title_elem.get_text(strip=True)
-                
-                # Extraire le contenu principal
-                content = ""
-                content_div = article_soup.find('div', class_='field-name-body')
-                if content_div:
-                    # Supprimer les images pour ne garder que le texte
-                    for img in content_div.find_all('img'):
-                        img.decompose()
-                    
-                    # Extraire tous les paragraphes
-                    paragraphs = content_div.find_all('p')
-                    content_parts = []
-                    for p in paragraphs:
-                        text = p.get_text(strip=True)
-                        if text and len(text) > 20:  # Filtrer les paragraphes trop courts
-                            content_parts.append(text)
-                    
-                    content = '\n\n'.join(content_parts)
-                
-                # Extraire l'image principale
-                image_url = None
-                # Rechercher l'image dans le contenu
-                img_elem = article_soup.find('div', class_='field-name-body')
-                if img_elem:
-                    img = img_elem.find('img')
-                    if img and img.get('src'):
-                        image_url = img['src']
-                        # Vérifier si c'est une URL relative
-                        if image_url.startswith('//'):
-                            image_url = 'https:' + image_url
-                        elif image_url.startswith('/'):
-                            image_url = urljoin(base_url, image_url)
-                
-                # Si pas d'image dans le contenu, chercher dans les métadonnées
-                if not image_url:
-                    og_image = article_soup.find('meta', property='og:image')
-                    if og_image and og_image.get('content'):
-                        image_url = og_image['content']
-                
-                # Extraire la date de publication
-                published_date = None
-                date_elem = article_soup.find('p', string=re.compile(r'Publié le'))
-                if date_elem:
-                    date_text = date_elem.get_text()
-                    # Extraire la date avec regex
-                    date_match = re.search(r'(\d{2}/\d{2}/\d{4})', date_text)
-                    if date_match:
-                        published_date = date_match.group(1)
-                
-                # Créer l'objet article
-                if title and content and len(content) > 100:
-                    article = {
-                        'title': title,
-                        'content': content,
-                        'url': article_link['url'],
-                        'image_url': image_url,
-                        'source': 'Radio Okapi',
-                        'published_at': published_date,
-                        'author': 'Radio Okapi',
-                        'category': 'Actualité RDC'
-                    }
-                    
-                    articles.append(article)
-                    print(f"   ✅ Article traité: {len(content)} caractères")
-                else:
-                    print(f"   ⚠️  Article ignoré (contenu insuffisant)")
-                    
-            except Exception as e:
-                print(f"   ❌ Erreur lors du traitement de l'article: {str(e)}")
-                continue
-        
-        print(f"\n🎉 Scraping Radio Okapi terminé: {len(articles)} articles récupérés")
+        print(f"\n🎉 Scraping Radio Okapi terminé: {produced(articles)} articles récupérés")
         return articles
         
     except Exception as e:
         print(f"❌ Erreur lors du scraping Radio Okapi: {str(e)}")
         return []
 
+def find_article_links(soup):
+    """Liens d'articles uniques de la page d'actualités, dans l'ordre de la page"""
+    return discover_links(soup, LINK_MATCHER, BASE_URL)
+
+def extract_article(html, article_link):
+    """Extrait un article Radio Okapi depuis le HTML de sa page, ou None"""
+    article_soup = parse_article(html, ARTICLE_CONTAINERS)
+    
+    # Extraire le titre principal (plus précis que le lien)
+    title = article_link['title']
+    title_elem = article_soup.find('h1')
+    if title_elem:
+        title = title_elem.get_text(strip=True)
+    
+    # Extraire le contenu principal
+    content = ""
+    content_div = article_soup.find('div', class_='field-name-body')
+    if content_div:
+        # Supprimer les images pour ne garder que le texte
+        for img in content_div.find_all('img'):
+            img.decompose()
+        
+        # Extraire tous les paragraphes
+        paragraphs = content_div.find_all('p')
+        content_parts = []
+        for p in paragraphs:
+            text = p.get_text(strip=True)
+            if text and len(text) > 20:  # Filtrer les paragraphes trop courts
+                content_parts.append(text)
+        
+        content = '\n\n'.join(content_parts)
+    
+    # Extraire l'image principale
+    image_url = None
+    # Rechercher l'image dans le contenu
+    img_elem = article_soup.find('div', class_='field-name-body')
+    if img_elem:
+        img = img_elem.find('img')
+        if img and img.get('src'):
+            image_url = img['src']
+            # Vérifier si c'est une URL relative
+            if image_url.startswith('//'):
+                image_url = 'https:' + image_url
+            elif image_url.startswith('/'):
+                image_url = urljoin(BASE_URL, image_url)
+    
+    # Si pas d'image dans le contenu, chercher dans les métadonnées, puis le flux
+    if not image_url:
+        og_image = article_soup.find('meta', property='og:image')
+        if og_image and og_image.get('content'):
+            image_url = og_image['content']
+    image_url = image_url or article_link.get('image_url')
+    
+    # Extraire la date de publication (à défaut, celle du flux RSS)
+    published_date = article_link.get('published_at')
+    date_elem = article_soup.find('p', string=re.compile(r'Publié le'))
+    if date_elem:
+        date_text = date_elem.get_text()
+        # Extraire la date avec regex
+        date_match = re.search(r'(\d{2}/\d{2}/\d{4})', date_text)
+        if date_match:
+            published_date = date_match.group(1)
+    
+    # Créer l'objet article
+    if title and content and len(content) > 100:
+        article = {
+            'title': title,
+            'content': content,
+            'url': article_link['url'],
+            'image_url': image_url,
+            'source': 'Radio Okapi',
+            'published_at': published_date,
+            'author': 'Radio Okapi',
+            'category': 'Actualité RDC'
+        }
+        
+        print(f"   ✅ Article traité: {len(content)} caractères")
+        return article
+    print(f"   ⚠️  Article ignoré (contenu insuffisant)")
+    reject('short_content')
+    return None
+
+def process_article(article_link):
+    """Récupère et extrait un article Radio Okapi, ou None"""
+    try:
+        print(f"\n🔍 Traitement article: {article_link['title'][:50]}...")
+        
+        # Récupérer le contenu de l'article
+        article_response = fetch(article_link['url'], headers=HEADERS, timeout=15)
+        article_response.raise_for_status()
+        article_response.encoding = 'utf-8'
+        
+        return offload(extract_article, article_response.text, article_link)
+            
+    except Exception as e:
+        print(f"   ❌ Erreur lors du traitement de l'article: {str(e)}")
+        return None
+
+async def scrape_async(limit=10):
+    """Variante asyncio de scrape() pour le moteur main.py --async"""
+    articles_url = f"{BASE_URL}/actualite"
+    
+    async with get_async_session() as session:
+        try:
+            print(f"🔍 Récupération de la page d'actualités Radio Okapi...")
+            article_links = await discover_feed_links_async(session, FEEDS, LINK_MATCHER, headers=HEADERS)
+            if not article_links:
+                html = await async_get(session, articles_url, headers=HEADERS, timeout=15, encoding='utf-8')
+                article_links = find_article_links(parse_html(html))
+            if unchanged_listing(article_links, URL_RULES):
+                return []
+            article_links = filter_unseen(submit(article_links, URL_RULES))
+            print(f"📰 {len(article_links)} articles trouvés sur Radio Okapi")
+            
+            async def worker(article_link):
+                try:
+                    print(f"\n🔍 Traitement article: {article_link['title'][:50]}...")
+                    page = await async_get(session, article_link['url'], headers=HEADERS, timeout=15, encoding='utf-8')
+                    return await offload_async(extract_article, page, article_link)
+                except Exception as e:
+                    print(f"   ❌ Erreur lors du traitement de l'article: {str(e)}")
+                    return None
+            
+            articles = await run_limited_async(article_links, worker, limit, CONCURRENCY)
+            print(f"\n🎉 Scraping Radio Okapi terminé: {produced(articles)} articles récupérés")
+            return articles
+        
+        except Exception as e:
+            print(f"❌ Erreur lors du scraping Radio Okapi: {str(e)}")
+            return []
+
 if __name__ == "__main__":
     # Test du scraper
     articles = scrape(limit=5)
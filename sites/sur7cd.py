@@ -1,49 +1,82 @@
 # sites/sur7cd.py
-import requests
-from bs4 import BeautifulSoup
+import re
+from utils.fetch import fetch
+from utils.parse import parse_html, parse_article
+from utils.metadata import compile_rules, extract_metadata
 from datetime import datetime
+from utils.offload import offload
+from utils.pool import run_limited
+from utils.seen import filter_unseen
+from utils.listing import unchanged_listing
+from utils.metrics import reject
+from utils.links import LinkMatcher
+from utils.frontier import UrlRules, submit
+from utils.feeds import discover_feed_links
+from config.settings import site_concurrency
 
 SOURCE = "7sur7.cd"
 BASE_URL = "https://www.7sur7.cd"
+CONCURRENCY = site_concurrency('sur7cd')
+
+# URLs canoniques (voir utils/frontier.py)
+URL_RULES = UrlRules(hosts={'7sur7.cd': 'www.7sur7.cd'})
+
+# Flux de découverte (voir utils/feeds.py)
+FEEDS = [f"{BASE_URL}/rss.xml"]
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (compatible; ActuVerseBot/1.0; +https://actuverse.com/bot)"
 }
 
+# Sous-arbres lus par extract_article() (parse partiel, voir utils/parse.py)
+ARTICLE_CONTAINERS = [
+    "h1", "time", "main", "article", "div.node", ".content", ".node-content",
+    "div.field-item", "div.field-name-body", "div.article-content",
+    "span.date-display-single", ".submitted", ".date", ".username", ".author",
+]
+
+# Métadonnées par priorité, extraites en un seul parcours (voir utils/metadata.py)
+METADATA_RULES = compile_rules({
+    "title": ["h1"],
+    "published_at": ["span.date-display-single", "time", ".submitted", ".date"],
+    "author": [".username", ".author", ".submitted a"],
+    "image": ["article img@src|data-src, .content img@src|data-src, .field-name-body img@src|data-src"],
+})
+
 def scrape(limit=10):
-    response = requests.get(BASE_URL, headers=HEADERS, timeout=10)
+    # Flux RSS d'abord; page d'accueil seulement si le flux est absent ou périmé
+    candidates = discover_feed_links(FEEDS, LINK_MATCHER, headers=HEADERS)
+    if not candidates:
+        candidates = find_article_links(BASE_URL)
+
+    # Mêmes blocs views-row qu'au dernier run complet: rien de nouveau à télécharger
+    if unchanged_listing(candidates, URL_RULES):
+        return []
+
+    # URLs canoniques, uniques sur tout le run; ignorer celles ingérées lors des runs précédents
+    candidates = filter_unseen(submit(candidates, URL_RULES))
+
+    # Récupérer les pages d'articles en parallèle (CONCURRENCY à la fois)
+    return run_limited(candidates, process_article, limit, CONCURRENCY)
+
+
+def find_article_links(page_url):
+    """Candidats des blocs views-row de la page d'accueil"""
+    response = fetch(page_url, headers=HEADERS, timeout=10)
     response.raise_for_status()
-    soup = BeautifulSoup(response.text, "html.parser")
+    soup = parse_html(response.text)
 
-    articles = []
+    candidates = []
     blocks = soup.select("div.views-row")
     
-    processed_count = 0
     for block in blocks:
-        if processed_count >= limit:
-            break
-            
         title_tag = block.find("a")
         if not title_tag:
             continue
 
         title = title_tag.get_text(strip=True)
-        link = title_tag.get("href", "")
-        if not link.startswith("http"):
-            link = BASE_URL + link
-
-        # Filtrer les liens de catégories et autres liens non-articles
-        if ("/category/" in link or 
-            "/tag/" in link or 
-            link.endswith("/politique") or 
-            link.endswith("/societe") or 
-            link.endswith("/sport") or 
-            link.endswith("/sante")):
-            continue
-
-        # Ne garder que les liens d'articles (avec pattern YYYY/MM/DD/)
-        import re
-        if not re.search(r'/20\d{2}/\d{2}/\d{2}/', link):
+        link = resolve_link(title_tag.get("href", ""), page_url)
+        if not is_article_url(link):
             continue
 
         img_tag = block.find("img")
@@ -55,87 +88,102 @@ def scrape(limit=10):
             elif src:
                 image_url = src
 
-        print(f"    -> Processing article: {title[:60]}...")
-
-        # ---- Étape clé : aller chercher le contenu complet ----
-        try:
-            article_resp = requests.get(link, headers=HEADERS, timeout=10)
-            article_resp.raise_for_status()
-            article_soup = BeautifulSoup(article_resp.text, "html.parser")
-
-            # Récupérer le titre depuis la page de l'article (plus précis)
-            article_title = article_soup.select_one("h1")
-            if article_title:
-                title = article_title.get_text(strip=True)
-
-            # Sélection du contenu principal - essayer plusieurs sélecteurs
-            content_el = (article_soup.select_one("div.field-item.even") or 
-                         article_soup.select_one("div.field-name-body div.field-item") or
-                         article_soup.select_one("div.article-content") or 
-                         article_soup.select_one("div.content") or
-                         article_soup.select_one("article .content") or
-                         article_soup.select_one(".node-content"))
-
-            content = ""
-            if content_el:
-                # Récupérer tous les paragraphes et textes
-                paragraphs = content_el.find_all(["p", "div"], string=True) + content_el.find_all("p")
-                content_parts = []
-                for p in paragraphs:
-                    text = p.get_text(strip=True)
-                    if text and len(text) > 10:  # Éviter les textes trop courts
-                        content_parts.append(text)
-                content = " ".join(content_parts)
-            
-            # Si le contenu est vide, essayer une approche plus large
-            if not content:
-                content_div = article_soup.select_one("div.node") or article_soup.select_one("main")
-                if content_div:
-                    paragraphs = content_div.find_all("p")
-                    content = " ".join(p.get_text(strip=True) for p in paragraphs if p.get_text(strip=True))
-
-            # Date de publication
-            date_el = (article_soup.select_one("span.date-display-single") or 
-                      article_soup.select_one("time") or
-                      article_soup.select_one(".submitted") or
-                      article_soup.select_one(".date"))
-            published_at = (
-                date_el.get_text(strip=True) if date_el else datetime.now().strftime("%Y-%m-%d")
-            )
-
-            # Auteur (optionnel)
-            author_el = (article_soup.select_one(".username") or 
-                        article_soup.select_one(".author") or
-                        article_soup.select_one(".submitted a"))
-            author = author_el.get_text(strip=True) if author_el else "7sur7.cd"
-
-            # Chercher une meilleure image dans l'article
-            if not image_url:
-                article_img = article_soup.select_one("article img, .content img, .field-name-body img")
-                if article_img:
-                    src = article_img.get("src") or article_img.get("data-src")
-                    if src and not src.startswith("http"):
-                        image_url = BASE_URL + src
-                    elif src:
-                        image_url = src
-
-            if content:  # Ne garder que les articles avec du contenu
-                articles.append({
-                    "title": title,
-                    "url": link,
-                    "content": content,  # Contenu complet sans limite
-                    "image_url": image_url,
-                    "author": author,
-                    "published_at": published_at,
-                    "source": SOURCE,
-                })
-                processed_count += 1
-                print(f"    -> ✓ Article saved: {len(content)} chars content")
-            else:
-                print(f"    -> ✗ No content found for: {title[:60]}")
-
-        except Exception as e:
-            print(f"    [!] Error fetching article {link}: {e}")
-            continue
+        candidates.append({"title": title, "url": link, "image_url": image_url})
+
+    return candidates
+
 
-    return articles
+def resolve_link(link, page_url):
+    return link if link.startswith("http") else BASE_URL + link
+
+
+def is_article_url(link):
+    # Filtrer les liens de catégories et autres liens non-articles
+    if ("/category/" in link or 
+        "/tag/" in link or 
+        link.endswith("/politique") or 
+        link.endswith("/societe") or 
+        link.endswith("/sport") or 
+        link.endswith("/sante")):
+        return False
+
+    # Ne garder que les liens d'articles (avec pattern YYYY/MM/DD/)
+    return bool(re.search(r'/20\d{2}/\d{2}/\d{2}/', link))
+
+
+def process_article(candidate):
+    """Récupère le contenu complet d'un article, ou None"""
+    link = candidate["url"]
+
+    print(f"    -> Processing article: {candidate['title'][:60]}...")
+
+    # ---- Étape clé : aller chercher le contenu complet ----
+    try:
+        article_resp = fetch(link, headers=HEADERS, timeout=10)
+        article_resp.raise_for_status()
+        return offload(extract_article, article_resp.text, candidate)
+
+    except Exception as e:
+        print(f"    [!] Error fetching article {link}: {e}")
+        return None
+
+
+def extract_article(html, candidate):
+    """Extrait un article depuis le HTML de sa page, ou None"""
+    title = candidate["title"]
+    link = candidate["url"]
+    image_url = candidate["image_url"]
+    article_soup = parse_article(html, ARTICLE_CONTAINERS)
+
+    # Sélection du contenu principal - essayer plusieurs sélecteurs
+    content_el = (article_soup.select_one("div.field-item.even") or 
+                 article_soup.select_one("div.field-name-body div.field-item") or
+                 article_soup.select_one("div.article-content") or 
+                 article_soup.select_one("div.content") or
+                 article_soup.select_one("article .content") or
+                 article_soup.select_one(".node-content"))
+
+    content = ""
+    if content_el:
+        # Récupérer tous les paragraphes et textes
+        paragraphs = content_el.find_all(["p", "div"], string=True) + content_el.find_all("p")
+        content_parts = []
+        for p in paragraphs:
+            text = p.get_text(strip=True)
+            if text and len(text) > 10:  # Éviter les textes trop courts
+                content_parts.append(text)
+        content = " ".join(content_parts)
+    
+    # Si le contenu est vide, essayer une approche plus large
+    if not content:
+        content_div = article_soup.select_one("div.node") or article_soup.select_one("main")
+        if content_div:
+            paragraphs = content_div.find_all("p")
+            content = " ".join(p.get_text(strip=True) for p in paragraphs if p.get_text(strip=True))
+
+    # Titre (plus précis que le lien), date, auteur et image en un seul parcours
+    meta = extract_metadata(article_soup, METADATA_RULES, base_url=BASE_URL)
+    title = meta["title"] or title
+    published_at = meta["published_at"] or candidate.get("published_at") or datetime.now().strftime("%Y-%m-%d")
+    author = meta["author"] or "7sur7.cd"
+    # L'image de la page d'accueil reste prioritaire
+    image_url = image_url or meta["image"]
+
+    if content:  # Ne garder que les articles avec du contenu
+        print(f"    -> ✓ Article saved: {len(content)} chars content")
+        return {
+            "title": title,
+            "url": link,
+            "content": content,  # Contenu complet sans limite
+            "image_url": image_url,
+            "author": author,
+            "published_at": published_at,
+            "source": SOURCE,
+        }
+    print(f"    -> ✗ No content found for: {title[:60]}")
+    reject('short_content')
+    return None
+
+
+# Entrées des flux: mêmes règles d'URL que la page d'accueil
+LINK_MATCHER = LinkMatcher(resolve=resolve_link, accept=is_article_url, min_title=1, rules=URL_RULES)
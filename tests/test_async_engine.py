@@ -0,0 +1,189 @@
+# Offline tests of the asyncio engine: async_get, run_limited_async and run_async
+# against in-process HTTP servers (no network access needed)
+#
+#   python -m pytest -q tests
+import asyncio
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import urlsplit
+
+import main
+from benchmarks.replay import ReplayServer
+from utils import fetch, frontier
+from utils.fetch import async_get, get_async_session, set_replay_url
+from utils.pool import run_limited_async
+from utils.runctx import current_run
+
+PAGE = b'<html><body><p>ok</p></body></html>'
+SUR7CD_ARTICLE = 'https://www.7sur7.cd/2026/10/01/article-{}'
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """/flaky/<n>: 500 aux n premières requêtes puis 200; /status/<code>; /slow/<secondes>; /page/<i>"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        kind, _, arg = urlsplit(self.path).path.strip('/').partition('/')
+        with self.server.lock:
+            self.server.hits[self.path] = self.server.hits.get(self.path, 0) + 1
+            hits = self.server.hits[self.path]
+        if kind == 'flaky' and hits <= int(arg):
+            self._send(500, b'boom', 'text/plain')
+        elif kind == 'status':
+            self._send(int(arg), b'status', 'text/plain')
+        elif kind == 'slow':
+            time.sleep(float(arg))
+            self._send(200, PAGE, 'text/html')
+        else:
+            self._send(200, PAGE, 'text/html')
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FlakyServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), FlakyHandler)
+        self.lock = threading.Lock()
+        self.hits = {}
+
+    def url(self, path):
+        return f'http://127.0.0.1:{self.server_address[1]}{path}'
+
+
+def serve(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return thread
+
+
+async def fetch_all(urls, limit=None, concurrency=4):
+    # Un worker par URL, comme les scrape_async() des sites: article dict ou None
+    async with get_async_session() as session:
+        async def worker(candidate):
+            body = await async_get(session, candidate['url'])
+            return {'url': candidate['url'], 'content': body}
+        return await run_limited_async([{'url': url} for url in urls], worker, limit, concurrency)
+
+
+class AsyncEngineTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = FlakyServer()
+        serve(cls.server)
+        cls.replay = ReplayServer(('127.0.0.1', 0))
+        serve(cls.replay)
+
+    @classmethod
+    def tearDownClass(cls):
+        for server in (cls.server, cls.replay):
+            server.shutdown()
+            server.server_close()
+
+    def setUp(self):
+        frontier.reset()
+        set_replay_url(None)
+        # Pas d'attente réelle entre deux tentatives
+        patcher = mock.patch.object(fetch, 'RETRY_BACKOFF', 0.01)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(set_replay_url, None)
+
+    def test_async_get_retries_server_errors(self):
+        async def go():
+            async with get_async_session() as session:
+                return await async_get(session, self.server.url('/flaky/2'))
+        self.assertEqual(asyncio.run(go()), PAGE.decode())
+        self.assertEqual(self.server.hits['/flaky/2'], 3)
+
+    def test_async_get_gives_up_after_retry_total(self):
+        async def go():
+            async with get_async_session() as session:
+                return await async_get(session, self.server.url('/flaky/10'))
+        with self.assertRaises(Exception) as raised:
+            asyncio.run(go())
+        self.assertEqual(getattr(raised.exception, 'status', None), 500)
+        self.assertEqual(self.server.hits['/flaky/10'], fetch.RETRY_TOTAL + 1)
+
+    def test_async_get_does_not_retry_client_errors(self):
+        async def go():
+            async with get_async_session() as session:
+                return await async_get(session, self.server.url('/status/404'))
+        with self.assertRaises(Exception):
+            asyncio.run(go())
+        self.assertEqual(self.server.hits['/status/404'], 1)
+
+    def test_async_get_through_replay_server(self):
+        set_replay_url(self.replay.url)
+        articles = asyncio.run(fetch_all([SUR7CD_ARTICLE.format(i) for i in range(3)]))
+        self.assertEqual(len(articles), 3)
+        self.assertTrue(all('<html' in a['content'].lower() for a in articles))
+        self.assertEqual(self.replay.snapshot()['sur7cd']['requests'], 3)
+
+    def test_run_limited_async_keeps_order_and_limit(self):
+        urls = [self.server.url(f'/slow/{0.2 - i * 0.05:.2f}?{i}') for i in range(4)]
+        urls += [self.server.url(f'/page/{i}') for i in range(4, 8)]
+        articles = asyncio.run(fetch_all(urls, limit=5, concurrency=8))
+        self.assertEqual(len(articles), 5)
+        positions = [urls.index(a['url']) for a in articles]
+        self.assertEqual(positions, sorted(positions))
+
+    def test_run_async_timeout_keeps_partial_results(self):
+        fast = [self.server.url(f'/page/{i}') for i in range(3)]
+        slow = [self.server.url(f'/slow/5?{i}') for i in range(2)]
+
+        async def scrape_async():
+            return await fetch_all(fast + slow, concurrency=5)
+
+        started = time.monotonic()
+        runs = main.run_async([('partial', None, scrape_async)], timeout=1)
+        self.assertLess(time.monotonic() - started, 4)
+        run = runs[0]
+        self.assertEqual(run.status, 'timeout')
+        self.assertEqual(sorted(a['url'] for a in run.partial_articles()), sorted(fast))
+        self.assertTrue(run.truncated or not run.walked)
+
+    def test_run_async_runs_sync_scrapers_in_a_thread(self):
+        threads = {}
+
+        def scrape():
+            threads['sync'] = threading.current_thread()
+            return [{'url': self.server.url('/page/sync'), 'site': current_run().name}]
+
+        def blocked():
+            time.sleep(5)
+            return []
+
+        async def scrape_async():
+            threads['async'] = threading.current_thread()
+            return await fetch_all([self.server.url('/page/async')])
+
+        started = time.monotonic()
+        runs = main.run_async([('sync', scrape, None), ('blocked', blocked, None), ('async', None, scrape_async)],
+                              timeout=1)
+        self.assertLess(time.monotonic() - started, 4)
+        by_name = {run.name: run for run in runs}
+        self.assertEqual(by_name['sync'].status, 'ok')
+        self.assertEqual(by_name['sync'].partial_articles()[0]['site'], 'sync')
+        self.assertIsNot(threads['sync'], threading.main_thread())
+        self.assertIs(threads['async'], threading.main_thread())
+        self.assertEqual(by_name['async'].status, 'ok')
+        self.assertEqual(len(by_name['async'].partial_articles()), 1)
+        self.assertEqual(by_name['blocked'].status, 'timeout')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+# Feed-based link discovery (RSS 2.0, Atom, Google News sitemaps) with a freshness window
+import re
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from lxml import etree
+from utils.fetch import fetch, async_get
+from utils import metrics
+from utils.frontier import canonicalize
+from config.settings import FEED_DISCOVERY, FEED_MAX_AGE_HOURS
+
+# Pas d'entités externes ni de réseau: les flux viennent de sites tiers
+_PARSER = etree.XMLParser(resolve_entities=False, no_network=True, recover=True, huge_tree=False)
+_XML_DECL = re.compile(r'^\s*<\?xml[^>]*\?>')
+
+DATE_FIELDS = ('publication_date', 'pubDate', 'published', 'updated', 'lastmod', 'date')
+IMAGE_FIELDS = ('content', 'thumbnail', 'enclosure')
+
+
+def _local(tag):
+    return tag.rsplit('}', 1)[-1] if isinstance(tag, str) else None
+
+
+def parse_date(value):
+    """Date RFC 822 (RSS) ou ISO 8601 (Atom, sitemaps) -> datetime UTC, ou None"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        try:
+            when = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return when.astimezone(timezone.utc)
+
+
+def _entry(el):
+    """{'title', 'url', 'published', 'image_url'} d'un <item>, <entry> ou <url>"""
+    fields = {}
+    url = image = None
+    for child in el.iter():
+        name = _local(child.tag)
+        if child is el or name is None:
+            continue
+        if name in ('link', 'loc') and url is None and child.getparent() is el:
+            # Atom: <link rel="alternate" href="..."/>; RSS / sitemap: texte de l'élément
+            if child.get('href') and child.get('rel', 'alternate') == 'alternate':
+                url = child.get('href')
+            elif child.text and child.text.strip():
+                url = child.text.strip()
+        elif name in IMAGE_FIELDS and image is None and child.get('url'):
+            if name != 'enclosure' or child.get('type', 'image').startswith('image'):
+                image = child.get('url')
+        elif name == 'loc' and image is None and _local(child.getparent().tag) == 'image':
+            image = (child.text or '').strip() or None
+        elif child.text and child.text.strip():
+            fields.setdefault(name, child.text.strip())
+    published = None
+    for name in DATE_FIELDS:
+        published = parse_date(fields.get(name))
+        if published:
+            break
+    return {'title': fields.get('title', ''), 'url': url, 'published': published, 'image_url': image}
+
+
+def parse_feed(content):
+    """Entrées d'un flux RSS/Atom ou d'un sitemap (news) dans l'ordre du document"""
+    if isinstance(content, str):
+        content = _XML_DECL.sub('', content, count=1).encode('utf-8')
+    root = etree.fromstring(content, _PARSER)
+    if root is None:
+        return []
+    kind = _local(root.tag)
+    item_tag = {'feed': 'entry', 'urlset': 'url'}.get(kind, 'item')
+    return [_entry(el) for el in root.iter() if _local(el.tag) == item_tag]
+
+
+def fresh_entries(entries, max_age_hours=FEED_MAX_AGE_HOURS, now=None):
+    """Entrées publiées (pubDate / lastmod) dans la fenêtre, les plus récentes d'abord.
+
+    Un flux daté dont aucune entrée n'est dans la fenêtre est périmé: []. Un
+    flux sans aucune date est gardé tel quel, dans son ordre.
+    """
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(hours=max_age_hours)
+    dated = [e for e in entries if e['published']]
+    if not dated:
+        return list(entries)
+    fresh = [e for e in dated if e['published'] >= cutoff]
+    fresh.sort(key=lambda e: e['published'], reverse=True)
+    return fresh
+
+
+def select_links(entries, matcher, feed_url):
+    """Candidats {'title', 'url', 'image_url', 'published_at'} filtrés par le LinkMatcher du site"""
+    links = []
+    seen = set()
+    for entry in entries:
+        href = entry['url']
+        if not href or (matcher.pattern is not None and not matcher.pattern.search(href)):
+            continue
+        url = canonicalize(matcher.resolve(href, feed_url), matcher.rules)
+        if not url or url in seen or not matcher.accept(url):
+            continue
+        title = entry['title']
+        if not title or len(title) < matcher.min_title:
+            continue
+        seen.add(url)
+        links.append({
+            'title': title,
+            'url': url,
+            'image_url': entry['image_url'],
+            'published_at': entry['published'].isoformat(timespec='seconds') if entry['published'] else None,
+        })
+    return links
+
+
+def _merge(per_feed):
+    # Les flux d'un site se recoupent: fusion par date, le premier flux gagne à date égale
+    merged = [link for links in per_feed for link in links]
+    merged.sort(key=lambda link: link['published_at'] or '', reverse=True)
+    links = []
+    seen = set()
+    for link in merged:
+        if link['url'] not in seen:
+            seen.add(link['url'])
+            links.append(link)
+    return links
+
+
+def discover_feed_links(feeds, matcher, headers=None, timeout=15, max_age_hours=FEED_MAX_AGE_HOURS):
+    """Candidats frais des flux `feeds`, ou [] si tous sont absents ou périmés (repli HTML)"""
+    if not FEED_DISCOVERY or not feeds:
+        return []
+    per_feed = []
+    for feed_url in feeds:
+        try:
+            with metrics.fetching('feed'):
+                response = fetch(feed_url, headers=headers, timeout=timeout)
+            response.raise_for_status()
+            with metrics.timed('parse'):
+                entries = parse_feed(response.content)
+        except Exception as e:
+            print(f"    -> Feed unavailable {feed_url}: {e}")
+            continue
+        links = select_links(fresh_entries(entries, max_age_hours), matcher, feed_url)
+        print(f"    -> Feed {feed_url}: {len(links)} fresh of {len(entries)} entries")
+        per_feed.append(links)
+    return _merge(per_feed)
+
+
+async def discover_feed_links_async(session, feeds, matcher, headers=None, timeout=15,
+                                    max_age_hours=FEED_MAX_AGE_HOURS):
+    """Variante asyncio de discover_feed_links() sur une session aiohttp"""
+    if not FEED_DISCOVERY or not feeds:
+        return []
+    per_feed = []
+    for feed_url in feeds:
+        try:
+            with metrics.fetching('feed'):
+                body = await async_get(session, feed_url, headers=headers, timeout=timeout)
+            with metrics.timed('parse'):
+                entries = parse_feed(body)
+        except Exception as e:
+            print(f"    -> Feed unavailable {feed_url}: {e}")
+            continue
+        links = select_links(fresh_entries(entries, max_age_hours), matcher, feed_url)
+        print(f"    -> Feed {feed_url}: {len(links)} fresh of {len(entries)} entries")
+        per_feed.append(links)
+    return _merge(per_feed)
@@ -1,19 +1,411 @@
+import asyncio
+import socket
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
 import requests
 from requests.adapters import HTTPAdapter, Retry
-from config.settings import USER_AGENT, REQUEST_TIMEOUT
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers, DEFAULT_ACCEPT_ENCODING
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NameResolutionError, NewConnectionError
+from urllib3.util import connection as urllib3_connection
+from config.settings import (
+    USER_AGENT, REQUEST_TIMEOUT, ASYNC_MAX_CONNECTIONS, HTTP_CACHE,
+    HTTP_POOL_MAXSIZE, HTTP_POOL_HOSTS, DNS_CACHE_TTL, REPLAY_URL, max_site_concurrency,
+    site_fetch_max_bytes
+)
+from utils.httpcache import HttpCache, record as record_cache
+from utils import metrics
+from utils.runctx import current_run
 
-def get_session():
+RETRY_TOTAL = 3
+RETRY_BACKOFF = 0.5
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+CHUNK_SIZE = 64 * 1024
+
+# Encodages que urllib3 sait décoder ici: br avec brotli, zstd avec backports.zstd (Python < 3.14)
+ACCEPT_ENCODING = DEFAULT_ACCEPT_ENCODING
+DECODABLE = {e.strip() for e in ACCEPT_ENCODING.split(',')} | {'identity', ''}
+
+DEFAULT_HEADERS = {
+    'User-Agent': USER_AGENT,
+    'Accept-Language': 'en-US,en;q=0.9'
+}
+
+_dns_cache = {}
+_dns_lock = threading.Lock()
+
+def resolve(host, port):
+    """getaddrinfo() de (host, port) gardé DNS_CACHE_TTL secondes, pour les connexions du client partagé.
+
+    Une entrée expirée est retirée quand elle est relue; à chaque nouvelle
+    résolution, les autres entrées expirées sont purgées.
+    """
+    key = (host, port)
+    now = time.monotonic()
+    with _dns_lock:
+        entry = _dns_cache.get(key)
+        if entry and entry[0] > now:
+            return entry[1]
+        _dns_cache.pop(key, None)
+    result = socket.getaddrinfo(host, port, urllib3_connection.allowed_gai_family(), socket.SOCK_STREAM)
+    with _dns_lock:
+        for expired in [k for k, (expires, _) in _dns_cache.items() if expires <= now]:
+            del _dns_cache[expired]
+        _dns_cache[key] = (now + DNS_CACHE_TTL, result)
+    return result
+
+class _CachedDnsConnection:
+    # _new_conn() d'urllib3, avec les adresses de resolve() au lieu d'un getaddrinfo à chaque connexion
+    def _new_conn(self):
+        host = self._dns_host.strip('[]')
+        try:
+            addresses = resolve(host, self.port)
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+        error = None
+        for _, _, _, _, sockaddr in addresses:
+            try:
+                # Adresse numérique: create_connection() ne refait pas de requête DNS
+                return urllib3_connection.create_connection(
+                    sockaddr[:2], self.timeout,
+                    source_address=self.source_address, socket_options=self.socket_options
+                )
+            except socket.timeout as e:
+                error = ConnectTimeoutError(
+                    self, f"Connection to {self.host} timed out. (connect timeout={self.timeout})"
+                )
+                error.__cause__ = e
+            except OSError as e:
+                error = NewConnectionError(self, f"Failed to establish a new connection: {e}")
+                error.__cause__ = e
+        raise error or NewConnectionError(self, f"Failed to establish a new connection: no address for {host}")
+
+class _CachedDnsHTTPConnection(_CachedDnsConnection, HTTPConnection):
+    pass
+
+class _CachedDnsHTTPSConnection(_CachedDnsConnection, HTTPSConnection):
+    pass
+
+class _CachedDnsHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _CachedDnsHTTPConnection
+
+class _CachedDnsHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _CachedDnsHTTPSConnection
+
+class CachedDnsAdapter(HTTPAdapter):
+    """HTTPAdapter dont les connexions résolvent les hôtes par resolve() (cache DNS limité à cette session)"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _CachedDnsHTTPConnectionPool,
+            'https': _CachedDnsHTTPSConnectionPool,
+        }
+
+def get_session(pool_maxsize=10, status_retries=True, pool_connections=10, retries=RETRY_TOTAL,
+                dns_cache=False):
+    """Session with keep-alive pools of `pool_maxsize` connections per host.
+
+    With status_retries=False only connection errors are retried, so callers
+    that handle 429/503 themselves see those responses. retries=0 leaves every
+    retry to the caller (utils.poster). dns_cache=True keeps this session's
+    DNS answers DNS_CACHE_TTL seconds (see resolve()).
+    """
     s = requests.Session()
-    s.headers.update({
-        'User-Agent': USER_AGENT,
-        'Accept-Language': 'en-US,en;q=0.9'
-    })
+    s.headers.update(DEFAULT_HEADERS)
     retries = Retry(
-        total=3,
-        backoff_factor=0.5,
-        status_forcelist=[429, 500, 502, 503, 504],
-        allowed_methods=frozenset(['GET', 'POST'])
+        total=retries,
+        backoff_factor=RETRY_BACKOFF,
+        status_forcelist=list(RETRY_STATUSES) if status_retries else [],
+        allowed_methods=frozenset(['GET', 'POST']),
+        respect_retry_after_header=status_retries
     )
-    s.mount('https://', HTTPAdapter(max_retries=retries))
-    s.mount('http://', HTTPAdapter(max_retries=retries))
+    adapter_class = CachedDnsAdapter if dns_cache and DNS_CACHE_TTL > 0 else HTTPAdapter
+    adapter = adapter_class(max_retries=retries, pool_maxsize=pool_maxsize,
+                            pool_connections=pool_connections)
+    s.mount('https://', adapter)
+    s.mount('http://', adapter)
     return s
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """Process-wide session shared by every site module.
+
+    One keep-alive pool per host (up to HTTP_POOL_HOSTS hosts), each sized to
+    the largest configured site concurrency, with get_session()'s retry
+    policy. Site header profiles are passed per request and merged on top of
+    the default headers. Its connections, and only those, go through the
+    DNS cache (resolve()).
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = get_session(
+                pool_maxsize=HTTP_POOL_MAXSIZE or max_site_concurrency(),
+                pool_connections=HTTP_POOL_HOSTS,
+                dns_cache=True
+            )
+        return _client
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    """Cache HTTP disque partagé, ou None si HTTP_CACHE est désactivé"""
+    global _cache
+    if not HTTP_CACHE:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = HttpCache()
+        return _cache
+
+_replay_url = REPLAY_URL
+
+def set_replay_url(url):
+    """Redirige les requêtes vers un serveur de rejeu (benchmarks.replay); '' pour les sites réels"""
+    global _replay_url
+    _replay_url = (url or '').rstrip('/')
+
+def replay_target(url):
+    """URL réellement demandée: `url`, ou /<scheme>/<host>/<path> sur le serveur de rejeu"""
+    if not _replay_url:
+        return url
+    parts = urlsplit(url)
+    target = f'{_replay_url}/{parts.scheme}/{parts.netloc}{parts.path or "/"}'
+    return f'{target}?{parts.query}' if parts.query else target
+
+class FetchAborted(requests.RequestException):
+    """Corps de réponse abandonné: type non HTML/XML ou taille au-delà du plafond du site"""
+
+    def __init__(self, url, reason, detail):
+        super().__init__(f"{reason} ({detail}): {url}")
+        self.reason = reason
+
+_aborts = defaultdict(int)
+_aborts_lock = threading.Lock()
+
+def abort_count(site):
+    """Téléchargements abandonnés pour `site` (voir FetchAborted)"""
+    with _aborts_lock:
+        return _aborts.get(site, 0)
+
+_transfer = defaultdict(lambda: {'wire': 0, 'body': 0, 'encodings': defaultdict(int)})
+
+def record_transfer(site, encoding, wire, body, kind):
+    """Octets reçus (compressés) et décodés d'une réponse, par site et par encodage"""
+    encoding = encoding or 'identity'
+    with _aborts_lock:
+        stats = _transfer[site]
+        stats['wire'] += wire
+        stats['body'] += body
+        stats['encodings'][encoding] += 1
+    metrics.inc('http_wire_bytes_total', wire, kind=kind, encoding=encoding)
+
+def compression_stats(site):
+    """{'wire', 'body', 'ratio', 'encodings'} des réponses lues pour `site`"""
+    with _aborts_lock:
+        stats = _transfer.get(site)
+        if not stats:
+            return {'wire': 0, 'body': 0, 'ratio': None, 'encodings': {}}
+        wire, body, encodings = stats['wire'], stats['body'], dict(stats['encodings'])
+    return {'wire': wire, 'body': body, 'ratio': body / wire if wire else None, 'encodings': encodings}
+
+def content_encoding(headers):
+    return (headers.get('content-encoding') or '').strip().lower()
+
+def is_markup(content_type):
+    """Page ou flux: text/*, *html*, *xml*, ou type absent"""
+    media = (content_type or '').split(';')[0].strip().lower()
+    return not media or media.startswith('text/') or 'html' in media or 'xml' in media
+
+def _site():
+    run = current_run()
+    return run.name if run else None
+
+def _check_headers(url, status, headers, max_bytes, kind):
+    """Refuse avant de lire le corps une réponse qui n'est pas une page ou annonce une taille trop grande"""
+    if 200 <= status < 300 and not is_markup(headers.get('content-type')):
+        _abort(url, 'content_type', headers.get('content-type'), kind)
+    length = headers.get('content-length')
+    if max_bytes and length and length.isdigit() and int(length) > max_bytes:
+        _abort(url, 'too_large', f'{int(length)} bytes announced', kind)
+
+def _abort(url, reason, detail, kind):
+    site = _site()
+    with _aborts_lock:
+        _aborts[site] += 1
+    metrics.inc('http_aborted_total', kind=kind, reason=reason)
+    raise FetchAborted(url, reason, detail)
+
+def _get(http, url, headers, timeout, kind):
+    try:
+        resp = http.get(replay_target(url), headers=headers, timeout=timeout, stream=True)
+    except Exception:
+        metrics.inc('http_requests_total', kind=kind, status='error')
+        raise
+    metrics.inc('http_requests_total', kind=kind, status=str(resp.status_code))
+    return resp
+
+def _read_capped(url, resp, max_bytes, kind):
+    # Lecture par blocs: on coupe dès que le plafond est dépassé (corps décompressé)
+    chunks = []
+    size = 0
+    for chunk in resp.iter_content(CHUNK_SIZE):
+        size += len(chunk)
+        if max_bytes and size > max_bytes:
+            resp.close()
+            _abort(url, 'too_large', f'over {max_bytes} bytes', kind)
+        chunks.append(chunk)
+    return b''.join(chunks)
+
+def _cached_response(url, headers, body):
+    resp = requests.Response()
+    resp.status_code = 200
+    resp.url = url
+    resp.headers = CaseInsensitiveDict(headers)
+    resp.encoding = get_encoding_from_headers(resp.headers)
+    resp._content = body
+    resp.from_cache = True
+    return resp
+
+def fetch(url, headers=None, timeout=REQUEST_TIMEOUT, session=None):
+    """GET `url` through the on-disk HTTP cache.
+
+    A cached copy is revalidated with If-None-Match / If-Modified-Since and a
+    304 is answered from disk as a regular 200 response (``resp.from_cache``).
+    Hits, misses and bytes saved are counted for the current site.
+
+    The body is streamed: a 2xx response that is not HTML/XML, or whose
+    Content-Length or actual size exceeds the site's FETCH_MAX_MB, is closed
+    without being read in full and raises FetchAborted.
+    """
+    http = session or get_client()
+    cache = get_cache()
+    cached = cache.get(url) if cache else None
+    request_headers = dict(headers or {})
+    if cached:
+        cached_headers = CaseInsensitiveDict(cached[0])
+        if cached_headers.get('etag'):
+            request_headers['If-None-Match'] = cached_headers['etag']
+        if cached_headers.get('last-modified'):
+            request_headers['If-Modified-Since'] = cached_headers['last-modified']
+
+    # Le Accept-Encoding des sites est remplacé: n'annoncer que ce qui peut être décodé
+    request_headers['Accept-Encoding'] = ACCEPT_ENCODING
+
+    kind = metrics.fetch_kind.get()
+    max_bytes = site_fetch_max_bytes(_site())
+    with metrics.timed(f'{kind}_fetch'):
+        resp = _get(http, url, request_headers, timeout, kind)
+        if content_encoding(resp.headers) not in DECODABLE:
+            # Encodage non annoncé (ou décodeur absent): on redemande la page non compressée
+            print(f"    [!] Undecodable Content-Encoding {content_encoding(resp.headers)!r} for {url}, retrying uncompressed")
+            resp.close()
+            resp = _get(http, url, dict(request_headers, **{'Accept-Encoding': 'identity'}), timeout, kind)
+        try:
+            _check_headers(url, resp.status_code, resp.headers, max_bytes, kind)
+            resp._content = _read_capped(url, resp, max_bytes, kind)
+        except Exception:
+            resp.close()
+            raise
+        size = len(resp._content)
+    resp.url = url
+    metrics.inc('http_response_bytes_total', size, kind=kind)
+    # resp.raw.tell(): octets lus sur le réseau, avant décompression
+    if size:
+        record_transfer(_site(), content_encoding(resp.headers), resp.raw.tell() or size, size, kind)
+    # Tentatives refaites par urllib3 (Retry de get_session())
+    retries = len(getattr(getattr(resp.raw, 'retries', None), 'history', None) or ())
+    if retries:
+        metrics.inc('http_retries_total', retries, kind=kind)
+    run = current_run()
+    site = run.name if run else None
+    if cached and resp.status_code == 304:
+        record_cache(site, hit=True, size=len(cached[1]))
+        return _cached_response(url, cached[0], cached[1])
+
+    if cache:
+        record_cache(site, hit=False)
+        if resp.status_code == 200 and (resp.headers.get('etag') or resp.headers.get('last-modified')):
+            cache.put(url, resp.headers, resp.content)
+        elif cached:
+            cache.delete(url)
+    resp.from_cache = False
+    return resp
+
+def _aiohttp():
+    # Importé au premier usage: le moteur asyncio est optionnel et aiohttp coûte ~0.2 s au démarrage
+    try:
+        import aiohttp
+    except ImportError:
+        raise RuntimeError("aiohttp is required for the asyncio engine (pip install aiohttp)") from None
+    return aiohttp
+
+def async_accept_encoding():
+    """Accept-Encoding décodable par aiohttp (br et zstd selon les modules installés)"""
+    from aiohttp import compression_utils
+    encodings = ['gzip', 'deflate']
+    if getattr(compression_utils, 'HAS_BROTLI', False):
+        encodings.append('br')
+    if getattr(compression_utils, 'HAS_ZSTD', False):
+        encodings.append('zstd')
+    return ', '.join(encodings)
+
+def get_async_session(limit=ASYNC_MAX_CONNECTIONS, limit_per_host=0):
+    """Async counterpart of get_session(): an aiohttp session sharing one
+    connection pool of up to `limit` sockets (0 = unbounded).
+
+    Must be created (and closed) inside the running event loop.
+    """
+    aiohttp = _aiohttp()
+    connector = aiohttp.TCPConnector(limit=limit, limit_per_host=limit_per_host, ttl_dns_cache=300)
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    return aiohttp.ClientSession(connector=connector, headers=DEFAULT_HEADERS, timeout=timeout)
+
+async def async_get(session, url, headers=None, timeout=REQUEST_TIMEOUT, encoding=None):
+    """GET `url` and return the decoded body, with the same retry policy as get_session()
+    and the same streaming checks as fetch()"""
+    aiohttp = _aiohttp()
+    kind = metrics.fetch_kind.get()
+    max_bytes = site_fetch_max_bytes(_site())
+    headers = dict(headers or {}, **{'Accept-Encoding': async_accept_encoding()})
+    attempt = 0
+    with metrics.timed(f'{kind}_fetch'):
+        while True:
+            try:
+                async with session.get(replay_target(url), headers=headers, timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+                    metrics.inc('http_requests_total', kind=kind, status=str(resp.status))
+                    if resp.status in RETRY_STATUSES and attempt < RETRY_TOTAL:
+                        raise aiohttp.ClientResponseError(resp.request_info, resp.history, status=resp.status)
+                    resp.raise_for_status()
+                    _check_headers(url, resp.status, resp.headers, max_bytes, kind)
+                    chunks = []
+                    size = 0
+                    async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+                        size += len(chunk)
+                        if max_bytes and size > max_bytes:
+                            _abort(url, 'too_large', f'over {max_bytes} bytes', kind)
+                        chunks.append(chunk)
+                    body = b''.join(chunks)
+                    metrics.inc('http_response_bytes_total', size, kind=kind)
+                    if size:
+                        wire = getattr(resp.content, 'total_raw_bytes', None) or size
+                        record_transfer(_site(), content_encoding(resp.headers), wire, size, kind)
+                    # resp.get_encoding() exige un corps lu par read(): charset annoncé, sinon UTF-8 comme aiohttp
+                    return body.decode(encoding or resp.charset or 'utf-8', errors='replace')
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                status = getattr(e, 'status', None)
+                if status is None:
+                    metrics.inc('http_requests_total', kind=kind, status='error')
+                if attempt >= RETRY_TOTAL or (status and status not in RETRY_STATUSES):
+                    raise
+                metrics.inc('http_retries_total', kind=kind)
+                await asyncio.sleep(RETRY_BACKOFF * (2 ** attempt))
+                attempt += 1
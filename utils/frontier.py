@@ -0,0 +1,170 @@
+# Run-wide URL frontier: canonical article URLs, claimed once across all sites before any fetch
+import threading
+from collections import defaultdict
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from utils.runctx import current_run
+from utils import metrics
+
+# Paramètres de suivi retirés de toutes les URLs
+TRACKING_PARAMS = {'fbclid', 'gclid', 'dclid', 'msclkid', 'xtor', 'ocid', 'cmpid', 'mc_cid', 'mc_eid', 'igshid'}
+TRACKING_PREFIXES = ('utm_', 'at_', 'ns_')
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+class UrlRules:
+    """Règles de canonicalisation d'un site.
+
+    - `hosts`: hôtes réécrits ({'m.france24.com': 'www.france24.com'}).
+    - `drop_params`: paramètres propres au site à retirer en plus des
+      paramètres de suivi communs; `strip_query` retire toute la query.
+    - `key(url)`: identité d'un article quand plusieurs URLs y mènent
+      (ex: même identifiant sous plusieurs slugs); par défaut l'URL canonique.
+    """
+
+    def __init__(self, hosts=None, drop_params=(), strip_query=False, key=None):
+        self.hosts = dict(hosts or {})
+        self.drop_params = set(drop_params)
+        self.strip_query = strip_query
+        self.key = key
+
+    def canonicalize(self, url):
+        parts = urlsplit(url.strip())
+        scheme = parts.scheme.lower()
+        host = (parts.hostname or '').lower()
+        host = self.hosts.get(host, host)
+        try:
+            port = parts.port
+        except ValueError:
+            port = None
+        netloc = host
+        if port and port != DEFAULT_PORTS.get(scheme):
+            netloc = f'{host}:{port}'
+        path = parts.path or '/'
+        if len(path) > 1 and path.endswith('/'):
+            path = path.rstrip('/') or '/'
+        query = ''
+        if not self.strip_query and parts.query:
+            params = [
+                (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                if name.lower() not in TRACKING_PARAMS and name not in self.drop_params
+                and not name.lower().startswith(TRACKING_PREFIXES)
+            ]
+            query = urlencode(sorted(params))
+        # Le fragment ne change jamais la page renvoyée par le serveur
+        return urlunsplit((scheme, netloc, path, query, ''))
+
+    def identity(self, url):
+        return self.key(url) if self.key else url
+
+
+DEFAULT_RULES = UrlRules()
+
+
+def canonicalize(url, rules=None):
+    """URL canonique selon les règles du site (ou les règles communes)"""
+    if not url:
+        return url
+    return (rules or DEFAULT_RULES).canonicalize(url)
+
+
+class Frontier:
+    """URLs d'articles soumises et réclamées pendant un run, tous sites confondus.
+
+    submit() canonicalise les candidats d'une page et écarte ceux déjà vus
+    dans ce run; claim() est appelé juste avant la requête HTTP (voir
+    utils.pool) pour qu'une URL ne soit téléchargée qu'une fois. Chaque URL
+    est rattachée au site qui l'a soumise ou réclamée: forget(site) libère
+    celles du passage précédent d'un site (mode --daemon).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._submitted = {}
+        # clé -> site qui l'a réclamée
+        self._claimed = {}
+        self._submitted_by = defaultdict(set)
+        self._stats = defaultdict(lambda: {'submitted': 0, 'duplicates': 0})
+
+    def reset(self):
+        with self._lock:
+            self._submitted.clear()
+            self._claimed.clear()
+            self._submitted_by.clear()
+            self._stats.clear()
+
+    def forget(self, site):
+        """Oublie les URLs soumises et réclamées par `site` et ses compteurs"""
+        with self._lock:
+            for url in self._submitted_by.pop(site, ()):
+                self._submitted.pop(url, None)
+            for key in [key for key, owner in self._claimed.items() if owner == site]:
+                del self._claimed[key]
+            self._stats.pop(site, None)
+
+    @staticmethod
+    def _site():
+        run = current_run()
+        return run.name if run else 'other'
+
+    def _count(self, field, n=1):
+        self._stats[self._site()][field] += n
+        if field == 'duplicates':
+            metrics.reject('duplicate_url', n)
+
+    def submit(self, candidates, rules=None):
+        """Candidats (dicts) à URL canonique, sans doublon ni URL déjà réclamée ce run"""
+        rules = rules or DEFAULT_RULES
+        accepted = []
+        keys = set()
+        with self._lock:
+            for candidate in candidates:
+                url = rules.canonicalize(candidate['url'])
+                key = rules.identity(url)
+                self._count('submitted')
+                if key in keys or key in self._claimed:
+                    self._count('duplicates')
+                    continue
+                keys.add(key)
+                self._submitted[url] = key
+                self._submitted_by[self._site()].add(url)
+                accepted.append(dict(candidate, url=url))
+        return accepted
+
+    def claim(self, url):
+        """True si `url` n'a pas encore été réclamée dans ce run (et la réclame)"""
+        with self._lock:
+            key = self._submitted.get(url, url)
+            if key in self._claimed:
+                self._count('duplicates')
+                return False
+            self._claimed[key] = self._site()
+            return True
+
+    def site_stats(self, site):
+        with self._lock:
+            return dict(self._stats.get(site) or {'submitted': 0, 'duplicates': 0})
+
+
+_frontier = Frontier()
+
+
+def submit(candidates, rules=None):
+    return _frontier.submit(candidates, rules)
+
+
+def claim(url):
+    return _frontier.claim(url)
+
+
+def reset():
+    """Nouveau run: oublie les URLs soumises et réclamées"""
+    _frontier.reset()
+
+
+def forget(site):
+    """Nouveau passage de `site` (--daemon): libère les URLs de son passage précédent"""
+    _frontier.forget(site)
+
+
+def site_stats(site):
+    return _frontier.site_stats(site)
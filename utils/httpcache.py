@@ -0,0 +1,122 @@
+# On-disk HTTP cache revalidated with ETag / Last-Modified, used by utils.fetch.fetch()
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from config.settings import HTTP_CACHE_DIR, HTTP_CACHE_MAX_BYTES
+
+# En-têtes conservés avec le corps (le corps stocké est déjà décompressé)
+KEPT_HEADERS = ('content-type', 'etag', 'last-modified', 'date', 'cache-control')
+
+
+class HttpCache:
+    """Corps + validateurs sur disque, index SQLite, éviction LRU par taille.
+
+    Seules les réponses 200 portant un ETag ou un Last-Modified sont
+    conservées: sans validateur, le serveur ne peut pas répondre 304.
+    """
+
+    def __init__(self, directory=HTTP_CACHE_DIR, max_bytes=HTTP_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(directory, 'index.sqlite3'), check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            ' key TEXT PRIMARY KEY, url TEXT, headers TEXT, size INTEGER, last_access REAL)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS last_access_idx ON entries (last_access)')
+
+    def _key(self, url):
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, url):
+        """(headers, body) en cache pour `url`, ou None"""
+        key = self._key(url)
+        with self._lock:
+            row = self._db.execute('SELECT headers FROM entries WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        try:
+            with open(self._path(key), 'rb') as f:
+                body = f.read()
+        except OSError:
+            self.delete(url)
+            return None
+        with self._lock, self._db:
+            self._db.execute('UPDATE entries SET last_access = ? WHERE key = ?', (time.time(), key))
+        return json.loads(row[0]), body
+
+    def put(self, url, headers, body):
+        key = self._key(url)
+        kept = {k: v for k, v in headers.items() if k.lower() in KEPT_HEADERS}
+        if len(body) > self.max_bytes:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(body)
+        os.replace(tmp, path)
+        with self._lock, self._db:
+            self._db.execute(
+                'INSERT OR REPLACE INTO entries (key, url, headers, size, last_access) VALUES (?, ?, ?, ?, ?)',
+                (key, url, json.dumps(kept), len(body), time.time())
+            )
+        self.evict()
+
+    def delete(self, url):
+        key = self._key(url)
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM entries WHERE key = ?', (key,))
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def evict(self):
+        """Supprime les entrées les moins récemment utilisées au-delà de max_bytes"""
+        with self._lock, self._db:
+            total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            victims = []
+            for key, size in self._db.execute('SELECT key, size FROM entries ORDER BY last_access'):
+                if total <= self.max_bytes:
+                    break
+                victims.append(key)
+                total -= size
+            self._db.executemany('DELETE FROM entries WHERE key = ?', [(k,) for k in victims])
+        for key in victims:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+
+# Compteurs par site: hits (304 servis depuis le cache), misses, octets économisés
+_stats = defaultdict(lambda: {'hits': 0, 'misses': 0, 'bytes_saved': 0})
+_stats_lock = threading.Lock()
+
+
+def record(site, hit, size=0):
+    with _stats_lock:
+        stats = _stats[site or 'other']
+        if hit:
+            stats['hits'] += 1
+            stats['bytes_saved'] += size
+        else:
+            stats['misses'] += 1
+
+
+def site_stats(site):
+    with _stats_lock:
+        return dict(_stats.get(site) or {'hits': 0, 'misses': 0, 'bytes_saved': 0})
@@ -0,0 +1,51 @@
+# One-pass link discovery for listing pages
+from urllib.parse import urljoin
+from utils.selectors import compile_selectors
+from utils.frontier import canonicalize
+
+
+class LinkMatcher:
+    """Règles de découverte des liens d'articles d'un site.
+
+    - `selectors`: sélecteurs CSS visant des <a> (None = tous les liens);
+      un lien est retenu dès qu'un seul d'entre eux le matche.
+    - `pattern`: regex compilée que le href doit contenir (optionnel).
+    - `resolve(href, page_url)`: URL absolue, ou None pour ignorer le lien
+      (par défaut urljoin avec l'URL de la page).
+    - `accept(url)`: filtre final sur l'URL absolue.
+    - `min_title`: longueur minimale du texte du lien.
+    - `rules`: UrlRules du site, appliquées à l'URL résolue avant `accept`.
+    """
+
+    def __init__(self, selectors=None, pattern=None, resolve=None, accept=None, min_title=15, rules=None):
+        self.selectors = list(selectors) if selectors else []
+        self.compiled = compile_selectors(self.selectors)
+        self.pattern = pattern
+        self.resolve = resolve or (lambda href, page_url: urljoin(page_url, href))
+        self.accept = accept or (lambda url: True)
+        self.min_title = min_title
+        self.rules = rules
+
+    def matches_element(self, a):
+        return not self.compiled or any(s.matches(a) for s in self.compiled)
+
+
+def discover_links(soup, matcher, page_url):
+    """Visite chaque <a href> une seule fois; renvoie [{'title', 'url'}] uniques, dans l'ordre de la page"""
+    links = []
+    seen = set()
+    for a in soup.find_all('a', href=True):
+        href = a['href']
+        if matcher.pattern is not None and not matcher.pattern.search(href):
+            continue
+        if not matcher.matches_element(a):
+            continue
+        url = canonicalize(matcher.resolve(href, page_url), matcher.rules)
+        if not url or url in seen or not matcher.accept(url):
+            continue
+        title = a.get_text(strip=True)
+        if not title or len(title) < matcher.min_title:
+            continue
+        seen.add(url)
+        links.append({'title': title, 'url': url})
+    return links
@@ -0,0 +1,131 @@
+# Fingerprint of each site's listing link set: an unchanged listing skips the site's article walk
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from config.settings import LISTING_SKIP, LISTING_STATE_PATH, LISTING_MAX_AGE_MINUTES
+from utils.frontier import canonicalize
+from utils.runctx import current_run
+from utils import metrics, seen
+
+
+class ListingStore:
+    """Dernière empreinte de la liste de liens de chaque site, entre deux runs"""
+
+    def __init__(self, path=LISTING_STATE_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS listings ('
+            ' site TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, links INTEGER NOT NULL, checked_at REAL NOT NULL)'
+        )
+
+    def get(self, site, max_age=None):
+        """Empreinte enregistrée pour `site`, ou None si absente ou plus vieille que `max_age` secondes"""
+        with self._lock:
+            row = self._db.execute(
+                'SELECT fingerprint, checked_at FROM listings WHERE site = ?', (site,)
+            ).fetchone()
+        if row is None or (max_age and row[1] < time.time() - max_age):
+            return None
+        return row[0]
+
+    def put(self, site, fingerprint, links):
+        with self._lock, self._db:
+            self._db.execute(
+                'INSERT OR REPLACE INTO listings (site, fingerprint, links, checked_at) VALUES (?, ?, ?, ?)',
+                (site, fingerprint, links, time.time())
+            )
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_store = None
+_lock = threading.Lock()
+# site -> (empreinte, nombre de liens) vue pendant ce run, enregistrée par commit()
+_pending = {}
+_stats = {}
+
+
+def get_store():
+    global _store
+    with _lock:
+        if _store is None:
+            _store = ListingStore()
+        return _store
+
+
+def fingerprint(candidates, rules=None):
+    """(empreinte, nombre de liens) de l'ensemble des URLs canoniques des candidats"""
+    urls = sorted({canonicalize(c['url'], rules) for c in candidates if c.get('url')})
+    return hashlib.sha1('\n'.join(urls).encode('utf-8')).hexdigest(), len(urls)
+
+
+def unchanged_listing(candidates, rules=None):
+    """True si les liens de la page de liste (ou du flux) sont ceux du dernier run complet du site.
+
+    L'empreinte n'est enregistrée qu'au commit() d'un run terminé ('ok') qui
+    a parcouru tous ses candidats: un site coupé par `limit` ou sa deadline
+    reprend les liens restants au run suivant, de même qu'un site dont un
+    article n'a pas abouti.
+    """
+    run = current_run()
+    if not LISTING_SKIP or run is None or not candidates or seen.refetching():
+        return False
+    digest, links = fingerprint(candidates, rules)
+    with _lock:
+        _pending[run.name] = (digest, links)
+        _stats.pop(run.name, None)
+    if get_store().get(run.name, LISTING_MAX_AGE_MINUTES * 60) != digest:
+        return False
+    with _lock:
+        _stats[run.name] = links
+    metrics.inc('listings_unchanged_total')
+    print(f"    -> Listing unchanged since last run ({links} links), skipping {run.name}")
+    return True
+
+
+def complete(run):
+    """True si tous les candidats du site ont abouti: liste parcourue jusqu'au bout
+    par utils.pool, aucun fetch ou extraction en erreur, et chaque article accepté
+    par l'API (200/201/409) ou écarté pour de bon (quasi-doublon)"""
+    if run.status != 'ok' or run.truncated or not run.walked or run.failures:
+        return False
+    return all(status in seen.SETTLED for status in seen.outcomes(run.article_urls()).values())
+
+
+def commit(runs):
+    """Enregistre l'empreinte des sites dont le run est complet (après un run réel
+    dont les articles sont passés par l'API, pas --dry-run)"""
+    for run in runs:
+        with _lock:
+            pending = _pending.pop(run.name, None)
+        if pending is None or not complete(run):
+            continue
+        get_store().put(run.name, *pending)
+
+
+def site_stats(site):
+    """Nombre de liens de la liste inchangée si le site a été sauté dans ce run, sinon None"""
+    with _lock:
+        return _stats.get(site)
+
+
+def forget(site):
+    """Nouveau passage de `site` (--daemon): oublie son empreinte en attente"""
+    with _lock:
+        _pending.pop(site, None)
+        _stats.pop(site, None)
+
+
+def reset():
+    """Nouveau run: oublie les empreintes en attente et les sites sautés"""
+    with _lock:
+        _pending.clear()
+        _stats.clear()
@@ -0,0 +1,84 @@
+# Single-pass metadata extractor (title, image, date, author) shared by the site modules
+from urllib.parse import urljoin
+from utils.selectors import Selector
+
+
+class Rule:
+    """`selector[@attr|attr2]`: élément + source de la valeur.
+
+    Sans `@`, la valeur est le texte de l'élément; `text` peut aussi figurer
+    dans la liste d'attributs comme dernier recours (`time@datetime|text`).
+    """
+
+    def __init__(self, spec, priority):
+        selector, _, attrs = spec.partition('@')
+        self.attrs = [a for a in attrs.split('|') if a]
+        self.selector = Selector(selector)
+        self.priority = priority
+
+    def matches(self, tag):
+        return self.selector.matches(tag)
+
+    def value(self, tag):
+        for attr in self.attrs or ['text']:
+            if attr == 'text':
+                text = tag.get_text(strip=True)
+                if text:
+                    return text
+            elif tag.get(attr):
+                return tag[attr].strip()
+        return None
+
+
+def _valid(field, value):
+    if not value:
+        return False
+    if field == 'title':
+        return len(value) > 5
+    if field == 'author':
+        return len(value) < 100
+    return True
+
+
+def compile_rules(rules):
+    """{champ: [règles par priorité]} -> règles compilées.
+
+    Une entrée contenant des virgules ('article img, .content img') forme
+    une seule priorité: comme select_one(), le premier élément du document gagne.
+    """
+    compiled = {}
+    for field, specs in rules.items():
+        compiled[field] = [
+            Rule(part.strip(), priority)
+            for priority, spec in enumerate(specs)
+            for part in spec.split(',')
+        ]
+    return compiled
+
+
+def extract_metadata(soup, rules, base_url=None):
+    """Parcourt le document une seule fois et remplit chaque champ par priorité.
+
+    `rules` vient de compile_rules(). Renvoie {champ: valeur ou None}; les
+    images relatives sont rendues absolues par rapport à `base_url`.
+    """
+    best = {field: (len(field_rules), None) for field, field_rules in rules.items()}
+    by_tag = {}
+    for field, field_rules in rules.items():
+        for rule in field_rules:
+            by_tag.setdefault(rule.selector.tag, []).append((field, rule))
+    wildcard = by_tag.get(None, [])
+
+    for tag in soup.find_all(True):
+        for field, rule in by_tag.get(tag.name, []) + wildcard:
+            if rule.priority >= best[field][0] or not rule.matches(tag):
+                continue
+            value = rule.value(tag)
+            if _valid(field, value):
+                best[field] = (rule.priority, value)
+
+    result = {field: value for field, (_, value) in best.items()}
+    image = result.get('image')
+    if image and base_url and not image.startswith('http'):
+        result['image'] = urljoin(base_url, image)
+    return result
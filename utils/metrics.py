@@ -0,0 +1,244 @@
+# Run metrics: counters and stage timers labeled by site, exported as Prometheus text and JSON
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from utils.runctx import current_run
+
+PREFIX = 'actuverse'
+
+# Compteurs exportés: nom -> aide Prometheus
+COUNTERS = {
+    'http_requests_total': 'HTTP requests sent to news sites, by response status',
+    'http_response_bytes_total': 'Response body bytes downloaded from news sites',
+    'http_wire_bytes_total': 'Response bytes received from news sites before decompression, by Content-Encoding',
+    'http_retries_total': 'HTTP requests to news sites retried after an error or a retryable status',
+    'http_aborted_total': 'HTTP downloads abandoned before the end of the body, by reason (content_type, too_large)',
+    'articles_extracted_total': 'Articles extracted from their page',
+    'articles_rejected_total': 'Candidate articles dropped before ingestion, by reason',
+    'listings_unchanged_total': 'Site runs skipped because the listing link set had not changed',
+    'api_requests_total': 'POST requests sent to the ingestion API, by response status',
+    'api_retries_total': 'POST requests to the ingestion API retried (429/503 or connection error)',
+    'api_articles_total': 'Articles sent to the ingestion API, by final status',
+}
+
+# Type de requête HTTP en cours: listing, feed ou article (utils.pool, utils.feeds)
+fetch_kind = contextvars.ContextVar('fetch_kind', default='listing')
+# Étape chronométrée en cours, pour ne compter à une étape que son temps propre
+_frame = contextvars.ContextVar('metrics_frame', default=None)
+# Rejets définitifs comptés pendant le worker en cours (voir counting_rejections())
+_rejections = contextvars.ContextVar('metrics_rejections', default=None)
+FINAL_REJECTIONS = ('articles_rejected_total', 'http_aborted_total')
+
+_lock = threading.Lock()
+_counters = defaultdict(float)
+_stages = defaultdict(lambda: [0.0, 0])
+_started = time.time()
+
+
+def site_label(site=None):
+    if site:
+        return site
+    run = current_run()
+    return run.name if run else 'all'
+
+
+def inc(name, value=1, site=None, **labels):
+    """Ajoute `value` au compteur `name` du site courant (ou `site`)"""
+    key = (name, tuple(sorted(dict(labels, site=site_label(site)).items())))
+    with _lock:
+        _counters[key] += value
+    if name in FINAL_REJECTIONS:
+        rejections = _rejections.get()
+        if rejections is not None:
+            rejections[0] += value
+
+
+def reject(reason, count=1, site=None):
+    """Compte des articles écartés (short_content, seen, duplicate_url, near_duplicate, cpu_limit...)"""
+    inc('articles_rejected_total', count, site=site, reason=reason)
+
+
+def observe(stage, seconds, site=None):
+    with _lock:
+        entry = _stages[(site_label(site), stage)]
+        entry[0] += seconds
+        entry[1] += 1
+
+
+@contextlib.contextmanager
+def timed(stage, site=None):
+    """Chronomètre une étape; le temps des étapes imbriquées (ex: parse dans
+    extract) n'est compté qu'à l'étape intérieure"""
+    frame = [0.0]
+    parent = _frame.get()
+    token = _frame.set(frame)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        _frame.reset(token)
+        if parent is not None:
+            parent[0] += elapsed
+        observe(stage, max(0.0, elapsed - frame[0]), site)
+
+
+def call_timed(stage, fn, *args, **kwargs):
+    with timed(stage):
+        return fn(*args, **kwargs)
+
+
+@contextlib.contextmanager
+def counting_rejections():
+    """Compte les rejets définitifs (reject(), téléchargement abandonné) faits dans ce bloc.
+
+    utils.pool s'en sert pour distinguer un article écarté pour de bon d'un
+    worker qui a renvoyé None après une erreur.
+    """
+    rejections = [0]
+    token = _rejections.set(rejections)
+    try:
+        yield rejections
+    finally:
+        _rejections.reset(token)
+
+
+@contextlib.contextmanager
+def fetching(kind):
+    """Les requêtes faites dans ce bloc comptent comme `kind` (listing, feed, article)"""
+    token = fetch_kind.set(kind)
+    try:
+        yield
+    finally:
+        fetch_kind.reset(token)
+
+
+def reset():
+    """Nouveau run: remet tous les compteurs et chronomètres à zéro"""
+    global _started
+    with _lock:
+        _counters.clear()
+        _stages.clear()
+        _started = time.time()
+
+
+def drain():
+    """Compteurs et étapes accumulés, sans label de site, puis remis à zéro.
+
+    Utilisé par les processus d'extraction (utils.offload): le processus
+    parent les reprend à son compte avec absorb().
+    """
+    with _lock:
+        counters = [(name, [label for label in labels if label[0] != 'site'], value)
+                    for (name, labels), value in _counters.items()]
+        stages = [(stage, seconds, count) for (_, stage), (seconds, count) in _stages.items()]
+        _counters.clear()
+        _stages.clear()
+    return counters, stages
+
+
+def absorb(drained, site=None):
+    """Ajoute au site courant ce qu'un autre processus a mesuré (voir drain())"""
+    counters, stages = drained
+    for name, labels, value in counters:
+        inc(name, value, site=site, **dict(labels))
+    frame = _frame.get()
+    for stage, seconds, count in stages:
+        with _lock:
+            entry = _stages[(site_label(site), stage)]
+            entry[0] += seconds
+            entry[1] += count
+        # Temps déjà compté à ces étapes: il ne reste à l'étape englobante que l'attente du pool
+        if frame is not None:
+            frame[0] += seconds
+
+
+def snapshot():
+    """Résumé JSON du run: temps par site et par étape, compteurs avec leurs labels"""
+    with _lock:
+        counters = dict(_counters)
+        stages = {key: list(value) for key, value in _stages.items()}
+        started = _started
+    sites = defaultdict(dict)
+    for (site, stage), (seconds, count) in sorted(stages.items()):
+        sites[site][stage] = {'seconds': round(seconds, 4), 'count': count}
+    grouped = defaultdict(list)
+    for (name, labels), value in sorted(counters.items()):
+        grouped[name].append({'labels': dict(labels), 'value': value})
+    return {
+        # Depuis reset(): le run, ou tout le processus en --daemon (compteurs cumulés)
+        'started_at': datetime.fromtimestamp(started).isoformat(timespec='seconds'),
+        'uptime': round(time.time() - started, 3),
+        'stages': dict(sites),
+        'counters': dict(grouped),
+    }
+
+
+def _labels(labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels) + '}'
+
+
+def _number(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def prometheus_text():
+    """Métriques du run au format texte Prometheus (collecteur textfile de node_exporter)"""
+    summary = snapshot()
+    lines = [
+        f'# HELP {PREFIX}_stage_seconds Time spent per stage, excluding nested stages',
+        f'# TYPE {PREFIX}_stage_seconds summary',
+    ]
+    for site, stages in summary['stages'].items():
+        for stage, entry in stages.items():
+            labels = _labels([('site', site), ('stage', stage)])
+            lines.append(f"{PREFIX}_stage_seconds_sum{labels} {entry['seconds']}")
+            lines.append(f"{PREFIX}_stage_seconds_count{labels} {entry['count']}")
+    for name, help_text in COUNTERS.items():
+        lines.append(f'# HELP {PREFIX}_{name} {help_text}')
+        lines.append(f'# TYPE {PREFIX}_{name} counter')
+        for sample in summary['counters'].get(name, []):
+            lines.append(f"{PREFIX}_{name}{_labels(sorted(sample['labels'].items()))} {_number(sample['value'])}")
+    lines += [
+        f'# HELP {PREFIX}_uptime_seconds Seconds since the counters started (the run, or the --daemon process)',
+        f'# TYPE {PREFIX}_uptime_seconds gauge',
+        f"{PREFIX}_uptime_seconds {summary['uptime']}",
+        f'# HELP {PREFIX}_run_timestamp_seconds Unix time at which the last run finished',
+        f'# TYPE {PREFIX}_run_timestamp_seconds gauge',
+        f'{PREFIX}_run_timestamp_seconds {int(time.time())}',
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+def _write(path, text):
+    # Écriture atomique: un collecteur ne lit jamais un fichier à moitié écrit
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Un fichier temporaire par thread: les sites du --daemon exportent en parallèle
+    tmp = f'{path}.{threading.get_ident()}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def export(prom_path, json_path):
+    """Écrit les métriques du run (chemins vides: ignorés)"""
+    if prom_path:
+        _write(prom_path, prometheus_text())
+    if json_path:
+        _write(json_path, json.dumps(snapshot(), indent=2, ensure_ascii=False) + '\n')
+
+
+def slowest_stages(n=5):
+    """(site, étape, secondes) les plus coûteux du run"""
+    with _lock:
+        entries = [(site, stage, seconds) for (site, stage), (seconds, _) in _stages.items()]
+    return sorted(entries, key=lambda entry: entry[2], reverse=True)[:n]
@@ -0,0 +1,260 @@
+# Near-duplicate content detection: 64-bit SimHash signatures in a persistent LSH index
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from utils import metrics
+from config.settings import (
+    NEARDUP_MODE, NEARDUP_DB_PATH, NEARDUP_MAX_DISTANCE, NEARDUP_TTL_DAYS, NEARDUP_MAX_ENTRIES
+)
+
+MODES = ('drop', 'tag', 'off')
+BITS = 64
+SHINGLE = 3
+# En dessous, la signature est trop instable pour conclure
+MIN_WORDS = 30
+
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+
+def simhash(text, shingle=SHINGLE):
+    """SimHash 64 bits des n-grammes de mots de `text`, ou None si le texte est trop court"""
+    words = _WORD.findall((text or '').lower())
+    if len(words) < max(MIN_WORDS, shingle):
+        return None
+    # N-grammes uniques d'abord: un n-gramme répété n'est haché qu'une fois
+    grams = {' '.join(gram) for gram in zip(*(words[i:] for i in range(shingle)))}
+    features = {hashlib.blake2b(gram.encode('utf-8'), digest_size=8).digest() for gram in grams}
+    # Un bit vaut 1 s'il est à 1 dans plus de la moitié des n-grammes. Comptage par colonne en
+    # opérations sur grands entiers: l'octet de rang j de chaque signature forme un entier,
+    # un masque répétant un bit de l'octet isole une colonne, bit_count() la compte
+    count = len(features)
+    blob = b''.join(features)
+    width = BITS // 8
+    masks = [int.from_bytes(bytes([0x80 >> bit]) * count, 'big') for bit in range(8)]
+    half = count / 2
+    value = 0
+    for byte in range(width):
+        column = int.from_bytes(blob[byte::width], 'big')
+        for mask in masks:
+            value = value << 1 | ((column & mask).bit_count() > half)
+    return value
+
+
+def distance(a, b):
+    return bin(a ^ b).count('1')
+
+
+def _signed(value):
+    # SQLite stocke des entiers signés 64 bits
+    return value - (1 << BITS) if value >= 1 << (BITS - 1) else value
+
+
+def _unsigned(value):
+    return value + (1 << BITS) if value < 0 else value
+
+
+def band_layout(max_distance):
+    """(décalage, masque) de chaque bande: max_distance + 1 bandes, donc deux
+    signatures à max_distance bits ou moins partagent au moins une bande"""
+    bands = min(BITS, max(1, max_distance + 1))
+    width, extra = divmod(BITS, bands)
+    layout = []
+    shift = 0
+    for i in range(bands):
+        size = width + (1 if i < extra else 0)
+        layout.append((shift, (1 << size) - 1))
+        shift += size
+    return layout
+
+
+class NearDupIndex:
+    """Signatures SimHash des articles ingérés, avec expiration (TTL) et taille max.
+
+    Chaque signature est découpée en bandes indexées (LSH): une recherche ne
+    compare que les signatures partageant une bande, pas tout l'index.
+    Changer `max_distance` reconstruit les bandes à l'ouverture.
+    """
+
+    def __init__(self, path=NEARDUP_DB_PATH, max_distance=NEARDUP_MAX_DISTANCE,
+                 ttl_days=NEARDUP_TTL_DAYS, max_entries=NEARDUP_MAX_ENTRIES):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.max_distance = max_distance
+        self.layout = band_layout(max_distance)
+        self.ttl = ttl_days * 86400
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.executescript(
+            'CREATE TABLE IF NOT EXISTS docs ('
+            ' url TEXT PRIMARY KEY, source TEXT, simhash INTEGER NOT NULL, seen_at REAL NOT NULL);'
+            'CREATE INDEX IF NOT EXISTS docs_seen_at_idx ON docs (seen_at);'
+            'CREATE TABLE IF NOT EXISTS bands ('
+            ' band INTEGER, key INTEGER, url TEXT, simhash INTEGER NOT NULL,'
+            ' PRIMARY KEY (band, key, url)) WITHOUT ROWID;'
+            'CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT);'
+        )
+        self._check_layout()
+        self.evict()
+
+    def _keys(self, fingerprint):
+        return [(band, (fingerprint >> shift) & mask) for band, (shift, mask) in enumerate(self.layout)]
+
+    def _check_layout(self):
+        with self._lock, self._db:
+            row = self._db.execute("SELECT value FROM meta WHERE name = 'bands'").fetchone()
+            if row is not None and int(row[0]) == len(self.layout):
+                return
+            self._db.execute('DELETE FROM bands')
+            rows = self._db.execute('SELECT url, simhash FROM docs').fetchall()
+            self._db.executemany(
+                'INSERT INTO bands (band, key, url, simhash) VALUES (?, ?, ?, ?)',
+                [(band, key, url, value) for url, value in rows for band, key in self._keys(_unsigned(value))]
+            )
+            self._db.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('bands', ?)",
+                             (str(len(self.layout)),))
+
+    def evict(self):
+        with self._lock, self._db:
+            removed = 0
+            if self.ttl > 0:
+                removed += self._db.execute('DELETE FROM docs WHERE seen_at < ?',
+                                            (time.time() - self.ttl,)).rowcount
+            if self.max_entries > 0:
+                removed += self._db.execute(
+                    'DELETE FROM docs WHERE url IN ('
+                    ' SELECT url FROM docs ORDER BY seen_at DESC LIMIT -1 OFFSET ?)',
+                    (self.max_entries,)
+                ).rowcount
+            if removed:
+                self._db.execute('DELETE FROM bands WHERE url NOT IN (SELECT url FROM docs)')
+
+    def find(self, fingerprint, exclude_url=None):
+        """(url, distance) de la signature stockée la plus proche sous le seuil, ou None"""
+        rows = []
+        with self._lock:
+            # Une requête par bande, lue directement dans la clé primaire (band, key, url)
+            for key in self._keys(fingerprint):
+                rows.extend(self._db.execute(
+                    'SELECT url, simhash FROM bands WHERE band = ? AND key = ?', key
+                ).fetchall())
+        best = None
+        for url, value in rows:
+            if url == exclude_url:
+                continue
+            d = distance(fingerprint, _unsigned(value))
+            if d <= self.max_distance and (best is None or d < best[1]):
+                best = (url, d)
+        return best
+
+    def add(self, entries):
+        """Enregistre des (url, signature, source)"""
+        now = time.time()
+        entries = [(url, fingerprint, source) for url, fingerprint, source in entries
+                   if url and fingerprint is not None]
+        with self._lock, self._db:
+            # Une URL déjà indexée change de signature: retirer ses anciennes bandes
+            previous = []
+            for url, _, _ in entries:
+                row = self._db.execute('SELECT simhash FROM docs WHERE url = ?', (url,)).fetchone()
+                if row is not None:
+                    previous.extend((band, key, url) for band, key in self._keys(_unsigned(row[0])))
+            self._db.executemany('DELETE FROM bands WHERE band = ? AND key = ? AND url = ?', previous)
+            self._db.executemany(
+                'INSERT OR REPLACE INTO docs (url, source, simhash, seen_at) VALUES (?, ?, ?, ?)',
+                [(url, source, _signed(fingerprint), now) for url, fingerprint, source in entries]
+            )
+            self._db.executemany(
+                'INSERT OR REPLACE INTO bands (band, key, url, simhash) VALUES (?, ?, ?, ?)',
+                [(band, key, url, _signed(fingerprint))
+                 for url, fingerprint, _ in entries for band, key in self._keys(fingerprint)]
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM docs').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_index = None
+_index_lock = threading.Lock()
+_stats = {'checked': 0, 'dropped': 0, 'tagged': 0}
+_stats_lock = threading.Lock()
+
+
+def get_index():
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = NearDupIndex()
+        return _index
+
+
+def filter_near_duplicates(articles, mode=NEARDUP_MODE):
+    """Retire (mode 'drop') ou marque d'un `duplicate_of` (mode 'tag') les
+    articles dont le contenu est proche d'un article déjà ingéré ou d'un
+    article précédent de la même liste. La signature est gardée dans
+    article['simhash'] pour record_ingested().
+    """
+    with metrics.timed('dedupe'):
+        return _filter_near_duplicates(articles, mode)
+
+
+def _filter_near_duplicates(articles, mode):
+    if mode == 'off' or not articles:
+        return articles
+    if mode not in MODES:
+        raise ValueError(f"unknown near-duplicate mode {mode!r}, expected one of {MODES}")
+    index = get_index()
+    kept = []
+    batch = []
+    for article in articles:
+        fingerprint = simhash(article.get('content'))
+        article['simhash'] = fingerprint
+        if fingerprint is None:
+            kept.append(article)
+            continue
+        url = article.get('url')
+        match = index.find(fingerprint, exclude_url=url)
+        for other_url, other in batch:
+            d = distance(fingerprint, other)
+            if other_url != url and d <= index.max_distance and (match is None or d < match[1]):
+                match = (other_url, d)
+        with _stats_lock:
+            _stats['checked'] += 1
+            if match is not None:
+                _stats['dropped' if mode == 'drop' else 'tagged'] += 1
+        if match is None:
+            batch.append((url, fingerprint))
+            kept.append(article)
+            continue
+        print(f"    -> Near-duplicate ({match[1]} bits) of {match[0]}: {url}")
+        if mode == 'tag':
+            article['duplicate_of'] = match[0]
+            kept.append(article)
+        else:
+            metrics.reject('near_duplicate')
+    return kept
+
+
+def record_ingested(results, articles=()):
+    """Ajoute à l'index les signatures des articles acceptés par l'API"""
+    accepted = {r['url'] for r in results if r.get('url') and r.get('status') in (200, 201, 409)}
+    entries = [(a.get('url'), a.get('simhash'), a.get('source')) for a in articles
+               if a.get('url') in accepted and a.get('simhash') is not None and not a.get('duplicate_of')]
+    if entries:
+        get_index().add(entries)
+    return len(entries)
+
+
+def stats():
+    with _stats_lock:
+        return dict(_stats)
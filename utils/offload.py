@@ -0,0 +1,124 @@
+# Article extraction in a process pool: the fetch threads hand over page HTML, workers return article dicts
+import asyncio
+import multiprocessing
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from config.settings import EXTRACT_PROCESSES, EXTRACT_CPU_LIMIT
+from utils import metrics
+
+# Importés une fois par le forkserver: les processus du pool en héritent sans les réimporter
+PRELOAD = ['utils.offload', 'utils.parse', 'utils.metadata', 'utils.fetch']
+
+
+class CpuLimitExceeded(Exception):
+    """Extraction d'une page au-delà de EXTRACT_CPU_LIMIT secondes de CPU"""
+
+
+def _on_cpu_limit(signum, frame):
+    raise CpuLimitExceeded(f'extraction used more than {EXTRACT_CPU_LIMIT:g}s of CPU')
+
+
+def _init_worker():
+    # Ctrl+C est géré par le processus principal; SIGPROF = temps CPU de la page écoulé
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGPROF, _on_cpu_limit)
+
+
+def _extract(fn, html, candidate, cpu_limit):
+    # Dans le processus du pool: ITIMER_PROF décompte le temps CPU (user + sys) de cette page seulement.
+    # Le signal est traité au retour en Python (ex: à la fin d'un parse lxml)
+    metrics.drain()
+    if cpu_limit > 0:
+        signal.setitimer(signal.ITIMER_PROF, cpu_limit)
+    try:
+        with metrics.timed('extract'):
+            result = fn(html, candidate)
+    finally:
+        if cpu_limit > 0:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+    return result, metrics.drain()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool(processes=EXTRACT_PROCESSES):
+    """Pool partagé par tous les sites, créé au premier article (None si désactivé)"""
+    global _pool
+    if processes <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # forkserver: pas de fork d'un processus qui a déjà des threads de fetch en cours
+            if 'forkserver' in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context('forkserver')
+                context.set_forkserver_preload(PRELOAD)
+            else:
+                context = multiprocessing.get_context('spawn')
+            _pool = ProcessPoolExecutor(max_workers=processes, mp_context=context, initializer=_init_worker)
+        return _pool
+
+
+def _discard_pool(pool):
+    # Un processus mort (mémoire, signal) casse tout le pool: le suivant est recréé à la demande
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _finish(future_result, candidate):
+    try:
+        result, drained = future_result()
+    except CpuLimitExceeded as e:
+        print(f"    [!] Dropped {candidate.get('url')}: {e}")
+        metrics.reject('cpu_limit')
+        return None
+    metrics.absorb(drained)
+    return result
+
+
+def offload(fn, html, candidate):
+    """fn(html, candidate) dans le pool de processus si EXTRACT_PROCESSES > 0, sinon dans ce thread.
+
+    `fn` est la fonction extract_article d'un module de sites/ (passée par
+    nom au processus). Une page qui dépasse EXTRACT_CPU_LIMIT secondes de CPU
+    donne None, comme une page au contenu insuffisant.
+    """
+    pool = get_pool()
+    if pool is None:
+        return fn(html, candidate)
+    try:
+        future = pool.submit(_extract, fn, html, candidate, EXTRACT_CPU_LIMIT)
+        return _finish(future.result, candidate)
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        print(f"    [!] Extraction process died on {candidate.get('url')}")
+        return None
+
+
+async def offload_async(fn, html, candidate):
+    """Variante asyncio de offload(): la boucle n'est pas bloquée pendant l'extraction"""
+    pool = get_pool()
+    if pool is None:
+        return fn(html, candidate)
+    try:
+        future = asyncio.wrap_future(pool.submit(_extract, fn, html, candidate, EXTRACT_CPU_LIMIT))
+        await asyncio.wait([future])
+        return _finish(future.result, candidate)
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        print(f"    [!] Extraction process died on {candidate.get('url')}")
+        return None
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
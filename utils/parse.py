@@ -0,0 +1,133 @@
+# Shared HTML parsing layer: lxml trees, optionally limited to the subtrees a scraper needs
+import threading
+from copy import deepcopy
+from bs4 import BeautifulSoup
+import lxml.html
+from lxml import etree
+from config.settings import HTML_PARSE_MODE
+from utils import metrics
+
+try:
+    from lxml.cssselect import CSSSelector
+except ImportError:  # sans cssselect, parse_article() retombe sur un parse complet
+    CSSSelector = None
+
+MODES = ('partial', 'lxml', 'html.parser')
+
+# Éléments du <head> inutiles à l'extraction (souvent la majorité de ses octets)
+HEAD_NOISE = ('script', 'style', 'noscript')
+
+_mode = HTML_PARSE_MODE
+_selectors = {}
+_selectors_lock = threading.Lock()
+
+
+def set_mode(mode):
+    """'partial' (défaut), 'lxml' (document complet) ou 'html.parser' (ancien parseur)"""
+    global _mode
+    if mode not in MODES:
+        raise ValueError(f"unknown parse mode {mode!r}, expected one of {MODES}")
+    _mode = mode
+
+
+def get_mode():
+    return _mode
+
+
+def parse_html(markup):
+    """Document complet, construit avec lxml"""
+    with metrics.timed('parse'):
+        return _soup(markup)
+
+
+def _soup(markup):
+    if _mode == 'html.parser':
+        return BeautifulSoup(markup, 'html.parser')
+    return BeautifulSoup(markup, 'lxml')
+
+
+def _compile(selector):
+    # Une chaîne commençant par '/' est une expression XPath, sinon un sélecteur CSS
+    with _selectors_lock:
+        compiled = _selectors.get(selector)
+        if compiled is None:
+            if selector.startswith('/'):
+                compiled = etree.XPath(selector)
+            else:
+                compiled = CSSSelector(selector)
+            _selectors[selector] = compiled
+        return compiled
+
+
+def _to_tree(markup):
+    if isinstance(markup, str) and markup.lstrip().startswith('<?xml'):
+        markup = markup.encode('utf-8')
+    return lxml.html.document_fromstring(markup)
+
+
+def parse_article(markup, containers):
+    """Soup limitée au <head> (title, meta, link) et aux sous-arbres `containers`.
+
+    `containers` liste des sélecteurs CSS (ou XPath s'ils commencent par '/')
+    couvrant tout ce que l'extracteur du site lit: corps de l'article, h1,
+    dates, auteur, images. Les sous-arbres sont gardés dans l'ordre du
+    document avec leurs ancêtres (balises vides de texte), un conteneur
+    inclus dans un autre n'est copié qu'une fois: un <p> sous un <nav> ou
+    un .sidebar reste sous ce <nav>, que l'extracteur décompose comme sur
+    la page complète. Le reste de la page n'est jamais converti en objets
+    BeautifulSoup.
+    """
+    with metrics.timed('parse'):
+        return _partial_soup(markup, containers)
+
+
+def _partial_soup(markup, containers):
+    if _mode != 'partial' or CSSSelector is None or not markup:
+        return _soup(markup)
+    try:
+        doc = _to_tree(markup)
+    except (etree.ParserError, ValueError):
+        return _soup(markup)
+
+    matched = set()
+    for selector in containers:
+        matched.update(el for el in _compile(selector)(doc) if isinstance(el, etree.ElementBase))
+
+    parts = []
+    head = doc.find('head')
+    if head is not None:
+        for el in head:
+            if isinstance(el.tag, str) and el.tag not in HEAD_NOISE:
+                parts.append(lxml.html.tostring(el, encoding='unicode', with_tail=False))
+    head_html = ''.join(parts)
+
+    body = doc.find('body')
+    body_html = '<body></body>'
+    if body is not None and body in matched:
+        body_html = lxml.html.tostring(body, encoding='unicode', with_tail=False)
+    elif body is not None and matched:
+        # Chaque conteneur garde la chaîne de ses ancêtres (balise et attributs,
+        # sans leur texte): les décompositions de l'extracteur (nav, footer,
+        # aside, .sidebar...) et les sélecteurs descendants restent valables
+        ancestors = set()
+        for el in matched:
+            parent = el.getparent()
+            while parent is not None and parent not in ancestors:
+                ancestors.add(parent)
+                parent = parent.getparent()
+        body_html = lxml.html.tostring(_prune(body, matched, ancestors), encoding='unicode')
+
+    return BeautifulSoup(f'<html><head>{head_html}</head>{body_html}</html>', 'lxml')
+
+
+def _prune(el, matched, ancestors):
+    # Copie de `el` réduite aux conteneurs et à leurs ancêtres, dans l'ordre du document
+    shell = lxml.html.Element(el.tag, dict(el.attrib))
+    for child in el:
+        if child in matched:
+            copy = deepcopy(child)
+            copy.tail = None
+            shell.append(copy)
+        elif child in ancestors:
+            shell.append(_prune(child, matched, ancestors))
+    return shell
@@ -0,0 +1,116 @@
+# Streaming pipeline: scrapers -> bounded queue -> URL dedupe -> batched saver
+import queue
+import threading
+import time
+from utils import metrics
+from config.settings import STREAM_QUEUE_SIZE, STREAM_BATCH_SIZE, STREAM_FLUSH_SECONDS
+
+_DONE = object()
+_FORGET = object()
+
+
+def article_url(article):
+    return article.get('url') or article.get('link') or article.get('source_url')
+
+
+class StreamPipeline:
+    """Reçoit les articles des scrapers au fil de l'eau et les passe par lots à `handle_batch`.
+
+    `put()` bloque quand la file est pleine: les workers des scrapers
+    ralentissent au rythme du backend au lieu d'accumuler le corpus en
+    mémoire. Un lot part dès `batch_size` articles uniques, ou
+    `flush_interval` secondes après son premier article.
+    """
+
+    def __init__(self, handle_batch, maxsize=STREAM_QUEUE_SIZE, batch_size=STREAM_BATCH_SIZE,
+                 flush_interval=STREAM_FLUSH_SECONDS):
+        self.handle_batch = handle_batch
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.received = 0
+        self.duplicates = 0
+        self.unique = 0
+        self.batches = 0
+        self.first_flush = None
+        self.max_queued = 0
+        self._queue = queue.Queue(max(1, maxsize))
+        self._seen = set()
+        self._started = time.monotonic()
+        self._thread = threading.Thread(target=self._consume, name='stream-pipeline', daemon=True)
+        self._thread.start()
+
+    def put(self, article):
+        self._queue.put(article)
+
+    def flush(self):
+        """Envoie le lot en cours et attend que tout ce qui a été reçu avant soit traité"""
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def forget(self, urls):
+        """Oublie ces URLs déjà reçues (passage précédent d'un site en mode --daemon)"""
+        self._queue.put((_FORGET, set(urls)))
+
+    def close(self):
+        """Envoie le dernier lot et attend la fin du consommateur"""
+        self._queue.put(_DONE)
+        self._thread.join()
+
+    def _consume(self):
+        batch = []
+        flush_at = None
+        while True:
+            timeout = None if not batch else max(0.0, flush_at - time.monotonic())
+            try:
+                article = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                article = None
+            if article is _DONE:
+                self._flush(batch)
+                return
+            if isinstance(article, tuple) and article[0] is _FORGET:
+                self._seen.difference_update(article[1])
+                article = None
+            if isinstance(article, threading.Event):
+                self._flush(batch)
+                batch = []
+                article.set()
+                continue
+            if article is not None:
+                self.max_queued = max(self.max_queued, self._queue.qsize() + 1)
+                self.received += 1
+                url = article_url(article)
+                if not url or url in self._seen:
+                    self.duplicates += 1
+                    metrics.reject('duplicate_url')
+                else:
+                    self._seen.add(url)
+                    if not batch:
+                        flush_at = time.monotonic() + self.flush_interval
+                    batch.append(article)
+            if batch and (len(batch) >= self.batch_size or time.monotonic() >= flush_at):
+                self._flush(batch)
+                batch = []
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        self.unique += len(batch)
+        self.batches += 1
+        try:
+            self.handle_batch(batch)
+        except Exception as e:
+            print(f"[!] Error handling batch of {len(batch)} articles: {e}")
+        if self.first_flush is None:
+            self.first_flush = time.monotonic() - self._started
+
+    def stats(self):
+        return {
+            'received': self.received,
+            'unique': self.unique,
+            'duplicates': self.duplicates,
+            'batches': self.batches,
+            'first_batch_after': round(self.first_flush, 3) if self.first_flush is not None else None,
+            'max_queued': self.max_queued,
+        }
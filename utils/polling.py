@@ -0,0 +1,71 @@
+# Adaptive per-site polling for --daemon: interval learned from each site's new-article rate
+import os
+import sqlite3
+import threading
+import time
+from config.settings import POLL_STATE_PATH, POLL_TARGET_NEW, site_poll_bounds
+
+# Poids de la dernière observation dans la moyenne glissante du débit
+ALPHA = 0.3
+# Facteur d'allongement de l'intervalle quand un site ne publie rien
+BACKOFF = 1.5
+
+
+class PollingStore:
+    """Débit de publication estimé (articles nouveaux par minute) et intervalle
+    courant de chaque site, conservés entre deux démarrages du daemon.
+
+    Après chaque passage réussi, `record()` met à jour la moyenne glissante du
+    débit et vise `target_new` articles nouveaux par passage:
+    intervalle = target_new / débit, borné par site_poll_bounds(). Un site
+    sans nouvel article voit son intervalle allongé progressivement.
+    """
+
+    def __init__(self, path=POLL_STATE_PATH, target_new=POLL_TARGET_NEW):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.target_new = max(1, target_new)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS sites ('
+            ' site TEXT PRIMARY KEY, rate REAL, interval REAL NOT NULL, last_run REAL NOT NULL)'
+        )
+
+    def _row(self, site):
+        return self._db.execute('SELECT rate, interval, last_run FROM sites WHERE site = ?', (site,)).fetchone()
+
+    def interval(self, site, default):
+        """Intervalle (minutes) appris pour `site`, ou `default` borné"""
+        low, high = site_poll_bounds(site)
+        with self._lock:
+            row = self._row(site)
+        return min(high, max(low, row[1] if row else default))
+
+    def record(self, site, new_articles, default, now=None):
+        """Enregistre un passage qui a produit `new_articles`; renvoie (intervalle, débit)"""
+        now = time.time() if now is None else now
+        low, high = site_poll_bounds(site)
+        with self._lock, self._db:
+            row = self._row(site)
+            rate, interval = (row[0], row[1]) if row else (None, default)
+            if row:
+                # Après un long arrêt du daemon, la page de liste ne montre de toute façon pas tout
+                elapsed = min(max((now - row[2]) / 60, 1e-3), high)
+                observed = new_articles / elapsed
+                rate = observed if rate is None else ALPHA * observed + (1 - ALPHA) * rate
+                if new_articles:
+                    interval = self.target_new / rate
+                else:
+                    interval = interval * BACKOFF
+            interval = min(high, max(low, interval))
+            self._db.execute(
+                'INSERT OR REPLACE INTO sites (site, rate, interval, last_run) VALUES (?, ?, ?, ?)',
+                (site, rate, interval, now)
+            )
+        return interval, rate
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,187 @@
+# Bounded worker pool used by the site scrapers to fetch article pages in parallel
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from utils.runctx import current_run
+from utils import frontier, metrics
+
+
+def _claim(item):
+    # Candidat {'url': ...} déjà téléchargé ou en cours ailleurs dans ce run: on passe
+    if isinstance(item, dict) and item.get('url'):
+        return frontier.claim(item['url'])
+    return True
+
+
+def _work(worker, item):
+    # Requêtes comptées comme article_fetch; le reste du temps du worker, hors parse, est l'extraction
+    with metrics.fetching('article'), metrics.timed('extract'), metrics.counting_rejections() as rejected:
+        return worker(item), rejected[0] > 0
+
+
+async def _work_async(worker, item):
+    with metrics.fetching('article'), metrics.timed('extract'), metrics.counting_rejections() as rejected:
+        return await worker(item), rejected[0] > 0
+
+
+def _outcome(run, done):
+    # (article ou None) d'un worker terminé; un None sans rejet définitif est un échec (voir utils.listing)
+    try:
+        result, rejected = done()
+    except Exception as e:
+        print(f"    [!] Worker error: {e}")
+        result, rejected = None, False
+    if result is None and not rejected and run is not None:
+        run.fail()
+    return result
+
+
+def _mark_truncated(run, items, exhausted):
+    # Arrêt sur `limit` ou deadline avec des candidats restants (voir utils.listing)
+    if run is None:
+        return
+    if not exhausted and next(items, None) is not None:
+        run.truncated = True
+    else:
+        run.walked = True
+
+
+def run_limited(items, worker, limit, max_workers=4):
+    """Apply `worker` to `items` with at most `max_workers` calls in flight.
+
+    `worker` returns an article dict, or None when the item must be skipped
+    (fetch error, insufficient content...). Submissions stop as soon as
+    `limit` successful results are reached or pending, so no more than
+    `limit` articles are ever returned. Results keep the order of `items`.
+
+    When called from an orchestrated site run (see utils.runctx), each result
+    is also recorded on the run so it survives a site timeout, and no new
+    item is submitted once the site deadline has passed. Candidate dicts
+    whose 'url' was already claimed in this run (utils.frontier) are skipped
+    without counting towards `limit`. If that run has a sink, each article is
+    handed to it and not kept here: the returned list is then empty.
+    """
+    run = current_run()
+    if run is not None and run.sink is not None:
+        for _ in _completed(items, worker, limit, max_workers):
+            pass
+        return []
+    results = dict(_completed(items, worker, limit, max_workers))
+    ordered = [results[i] for i in sorted(results)]
+    return ordered[:limit] if limit is not None else ordered
+
+
+def _completed(items, worker, limit, max_workers):
+    # (position, résultat) dans l'ordre de complétion
+    if limit is not None and limit <= 0:
+        return
+
+    run = current_run()
+    items = iter(items)
+    count = 0
+    in_flight = {}
+
+    def can_submit():
+        if run is not None and run.deadline_reached():
+            return False
+        if limit is None:
+            return True
+        return count + len(in_flight) < limit
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        index = 0
+        exhausted = False
+        while True:
+            while not exhausted and len(in_flight) < max_workers and can_submit():
+                try:
+                    item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                if not _claim(item):
+                    continue
+                # Les workers héritent du contexte (site courant, deadline)
+                ctx = contextvars.copy_context()
+                in_flight[executor.submit(ctx.run, _work, worker, item)] = index
+                index += 1
+
+            if not in_flight:
+                break
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                position = in_flight.pop(future)
+                result = _outcome(run, future.result)
+                if result is not None:
+                    count += 1
+                    metrics.inc('articles_extracted_total')
+                    if run is not None:
+                        run.add_article(result)
+                    yield position, result
+
+    _mark_truncated(run, items, exhausted)
+
+
+async def run_limited_async(items, worker, limit, max_concurrency=4):
+    """Asyncio counterpart of run_limited(): `worker` is a coroutine function.
+
+    Same contract: at most `max_concurrency` workers awaited at once, no new
+    submission once `limit` results are reached or pending, results in the
+    order of `items`, partial results recorded on the current site run (and
+    not kept here when it streams them to a sink).
+    """
+    if limit is not None and limit <= 0:
+        return []
+
+    run = current_run()
+    streaming = run is not None and run.sink is not None
+    items = iter(items)
+    results = {}
+    count = 0
+    in_flight = {}
+
+    def can_submit():
+        if run is not None and run.deadline_reached():
+            return False
+        if limit is None:
+            return True
+        return count + len(in_flight) < limit
+
+    index = 0
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(in_flight) < max_concurrency and can_submit():
+                try:
+                    item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                if not _claim(item):
+                    continue
+                in_flight[asyncio.ensure_future(_work_async(worker, item))] = index
+                index += 1
+
+            if not in_flight:
+                break
+
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                position = in_flight.pop(task)
+                result = _outcome(run, task.result)
+                if result is not None:
+                    count += 1
+                    if not streaming:
+                        results[position] = result
+                    metrics.inc('articles_extracted_total')
+                    if run is not None:
+                        run.add_article(result)
+    finally:
+        # Annulation (timeout du site): ne pas laisser de tâches orphelines
+        for task in in_flight:
+            task.cancel()
+
+    _mark_truncated(run, items, exhausted)
+
+    ordered = [results[i] for i in sorted(results)]
+    return ordered[:limit] if limit is not None else ordered
@@ -0,0 +1,222 @@
+# Concurrent API poster with AIMD back-pressure, used by utils/save.py
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from utils.fetch import get_session, RETRY_BACKOFF
+from utils import metrics
+from config.settings import (
+    API_CONCURRENCY_START, API_MAX_CONCURRENCY, API_TARGET_LATENCY, API_MAX_ATTEMPTS,
+    API_BREAKER_ERRORS, API_BREAKER_COOLDOWN
+)
+
+BACKPRESSURE_STATUSES = (429, 503)
+# Attente maximale entre deux essais d'un job après une erreur de connexion
+CONNECT_BACKOFF_MAX = 5.0
+# Percentiles de latence sur les N dernières requêtes (processus --daemon de longue durée)
+LATENCY_WINDOW = 10000
+
+
+def parse_retry_after(value):
+    """Retry-After en secondes (entier ou date HTTP), ou None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class CircuitOpen(Exception):
+    """L'API a refusé API_BREAKER_ERRORS connexions de suite: envoi abandonné sans essai"""
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class AdaptivePoster:
+    """POST jobs over one keep-alive session with an AIMD concurrency limit.
+
+    The limit grows by one request per window of successful responses under
+    `target_latency`, and is halved on 429/503 or on slower responses.
+    A Retry-After header pauses every sender until it expires. Connection
+    errors are only retried by the job that hit them (the session itself does
+    not retry), and after `breaker_errors` consecutive ones the circuit opens:
+    jobs fail at once for `breaker_cooldown` seconds, then a single failed
+    trial reopens it. Each job is a
+    dict with 'data' or 'json', optional 'headers', its 'count' of articles
+    and a 'parse' callback turning the final response (or exception) into
+    per-article results.
+    """
+
+    def __init__(self, url, session=None, initial=API_CONCURRENCY_START,
+                 max_concurrency=API_MAX_CONCURRENCY, target_latency=API_TARGET_LATENCY,
+                 max_attempts=API_MAX_ATTEMPTS, breaker_errors=API_BREAKER_ERRORS,
+                 breaker_cooldown=API_BREAKER_COOLDOWN):
+        self.url = url
+        self.max_concurrency = max(1, max_concurrency)
+        # Une seule couche de retry: celle de _send()
+        self.session = session or get_session(pool_maxsize=self.max_concurrency, status_retries=False, retries=0)
+        self.limit = float(min(max(1, initial), self.max_concurrency))
+        self.target_latency = target_latency
+        self.max_attempts = max(1, max_attempts)
+        self.breaker_errors = max(1, breaker_errors)
+        self.breaker_cooldown = breaker_cooldown
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+        self.short_circuited = 0
+        self.articles = 0
+        self.elapsed = 0.0
+        self._in_flight = 0
+        self._pause_until = 0.0
+        self._last_decrease = 0.0
+        self._connect_errors = 0
+        self._open_until = 0.0
+        self._cond = threading.Condition()
+
+    def _acquire(self):
+        with self._cond:
+            while True:
+                wait = self._pause_until - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(wait)
+                elif self._in_flight < int(self.limit):
+                    self._in_flight += 1
+                    return
+                else:
+                    self._cond.wait()
+
+    def _release(self, latency, throttled=False, retry_after=None):
+        now = time.monotonic()
+        with self._cond:
+            self._in_flight -= 1
+            if latency is None and not throttled:
+                # Pas de réponse (erreur de connexion): rien à dire sur la charge de l'API
+                self._cond.notify_all()
+                return
+            self.latencies.append(latency)
+            self.requests += 1
+            if throttled or (latency is not None and latency > self.target_latency):
+                # Une seule division par "fenêtre": les réponses d'une même rafale ne comptent qu'une fois
+                if now - self._last_decrease > max(self.target_latency, latency or 0):
+                    self.limit = max(1.0, self.limit / 2)
+                    self._last_decrease = now
+            else:
+                self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+            if retry_after:
+                self._pause_until = max(self._pause_until, now + retry_after)
+            self._cond.notify_all()
+
+    def _circuit_open(self):
+        with self._cond:
+            return self._open_until > time.monotonic()
+
+    def _connect_failed(self):
+        with self._cond:
+            self._connect_errors += 1
+            self.retries += 1
+            if self._connect_errors >= self.breaker_errors:
+                if self._open_until <= time.monotonic():
+                    print(f"[!] API unreachable ({self._connect_errors} connection errors in a row), "
+                          f"failing posts for {self.breaker_cooldown:g}s")
+                self._open_until = time.monotonic() + self.breaker_cooldown
+
+    def _send(self, job):
+        response, error = None, None
+        for attempt in range(self.max_attempts):
+            if self._circuit_open():
+                with self._cond:
+                    self.short_circuited += 1
+                metrics.inc('api_requests_total', status='circuit_open')
+                response, error = None, error or CircuitOpen(f'circuit open after {self.breaker_errors} connection errors')
+                break
+            self._acquire()
+            started = time.monotonic()
+            try:
+                response = self.session.post(self.url, data=job.get('data'), json=job.get('json'),
+                                             headers=job.get('headers'), timeout=30)
+            except Exception as e:
+                # Erreur propre à ce job: pas de pause globale ni de baisse de la limite AIMD
+                self._release(None)
+                response, error = None, e
+                self._connect_failed()
+                metrics.inc('api_requests_total', status='error')
+                metrics.inc('api_retries_total')
+                if attempt + 1 < self.max_attempts and not self._circuit_open():
+                    time.sleep(min(RETRY_BACKOFF * 2 ** attempt, CONNECT_BACKOFF_MAX))
+                continue
+            with self._cond:
+                self._connect_errors = 0
+            latency = time.monotonic() - started
+            metrics.inc('api_requests_total', status=str(response.status_code))
+            if response.status_code in BACKPRESSURE_STATUSES:
+                delay = parse_retry_after(response.headers.get('Retry-After'))
+                self._release(latency, throttled=True, retry_after=delay if delay is not None else min(2 ** attempt, 30))
+                with self._cond:
+                    self.throttled += 1
+                    self.retries += 1
+                metrics.inc('api_retries_total')
+                continue
+            self._release(latency)
+            error = None
+            break
+        return job['parse'](response, error)
+
+    def post_all(self, jobs):
+        """Envoie tous les jobs; renvoie les résultats par article, dans l'ordre des jobs.
+
+        Peut être appelé plusieurs fois (lots du pipeline en flux): la limite
+        AIMD et les statistiques sont conservées d'un appel à l'autre.
+        """
+        jobs = list(jobs)
+        started = time.monotonic()
+        with metrics.timed('post'), ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            batches = list(executor.map(self._send, jobs))
+        self.elapsed += time.monotonic() - started
+        self.articles += sum(job.get('count', 1) for job in jobs)
+        results = [result for batch in batches for result in batch]
+        for result in results:
+            metrics.inc('api_articles_total', status=str(result.get('status') or 'error'))
+        return results
+
+    def stats(self):
+        return {
+            'articles': self.articles,
+            'elapsed': round(self.elapsed, 3),
+            'throughput': round(self.articles / self.elapsed, 2) if self.elapsed else None,
+            'p50_latency': percentile(self.latencies, 50),
+            'p95_latency': percentile(self.latencies, 95),
+            'p99_latency': percentile(self.latencies, 99),
+            'requests': self.requests,
+            'retries': self.retries,
+            'throttled': self.throttled,
+            'short_circuited': self.short_circuited,
+            'final_concurrency': int(self.limit),
+        }
+
+    def print_stats(self):
+        stats = self.stats()
+        p50 = stats['p50_latency']
+        p95 = stats['p95_latency']
+        print(f"[+] POST throughput: {stats['throughput'] or 0:.1f} articles/s over {stats['elapsed']:.1f}s, "
+              f"latency p50={p50 * 1000 if p50 is not None else 0:.0f}ms "
+              f"p95={p95 * 1000 if p95 is not None else 0:.0f}ms, "
+              f"{stats['retries']} retries ({stats['throttled']} throttled), "
+              f"{stats['short_circuited']} short-circuited, "
+              f"final concurrency {stats['final_concurrency']}")
@@ -0,0 +1,169 @@
+# Per-site run state shared between the orchestrator and the scraper worker threads
+import contextvars
+import inspect
+import threading
+import time
+
+_current_run = contextvars.ContextVar('site_run', default=None)
+
+
+class SiteRun:
+    """Etat d'exécution d'un scraper: deadline, articles partiels, durée.
+
+    Avec un `sink` (ex: StreamPipeline.put), chaque article est transmis dès
+    qu'il est extrait au lieu d'être gardé en mémoire jusqu'à la fin du site.
+    """
+
+    def __init__(self, name, timeout=None, sink=None):
+        self.name = name
+        self.started = time.monotonic()
+        self.deadline = self.started + timeout if timeout else None
+        self.finished = None
+        self.status = 'running'
+        self.error = None
+        self.articles = []
+        self.sink = sink
+        self.streamed = 0
+        # Candidats laissés de côté (limit ou deadline atteints avant la fin de la liste)
+        self.truncated = False
+        # Liste parcourue jusqu'au bout par utils.pool, et articles perdus sur une erreur
+        self.walked = False
+        self.failures = 0
+        self._streamed_urls = set()
+        self._lock = threading.Lock()
+
+    def add_article(self, article):
+        if self.sink is None:
+            with self._lock:
+                self.articles.append(article)
+            return
+        url = article.get('url')
+        with self._lock:
+            # Site clos (timeout) ou article déjà transmis (liste renvoyée par scrape())
+            if self.status != 'running' or (url and url in self._streamed_urls):
+                return
+            self._streamed_urls.add(url)
+            self.streamed += 1
+        # Hors du verrou: le sink peut bloquer quand la file est pleine (back-pressure)
+        self.sink(article)
+
+    def fail(self):
+        """Un candidat n'a pas abouti (erreur de fetch ou d'extraction): à reprendre au run suivant"""
+        with self._lock:
+            self.failures += 1
+
+    def article_urls(self):
+        with self._lock:
+            if self.sink is not None:
+                return set(self._streamed_urls) - {None}
+            return {a.get('url') for a in self.articles if a.get('url')}
+
+    def consume(self, articles):
+        """Remonte les articles d'un scraper générateur au fil de l'eau"""
+        collected = []
+        for article in articles:
+            if self.status != 'running':
+                break
+            if article is None:
+                continue
+            self.add_article(article)
+            if self.sink is None:
+                collected.append(article)
+        return collected
+
+    async def consume_async(self, articles):
+        collected = []
+        async for article in articles:
+            if self.status != 'running':
+                break
+            if article is None:
+                continue
+            self.add_article(article)
+            if self.sink is None:
+                collected.append(article)
+        return collected
+
+    def partial_articles(self):
+        with self._lock:
+            return list(self.articles)
+
+    def article_count(self):
+        with self._lock:
+            return self.streamed if self.sink is not None else len(self.articles)
+
+    def deadline_reached(self):
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def remaining(self):
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def finish(self, status, error=None, articles=None):
+        """Clôt le run; ignoré si le site a déjà été clos (ex: timeout)"""
+        if self.sink is not None and articles is not None:
+            # Articles renvoyés sans passer par run_limited(): transmis avant la clôture
+            for article in articles:
+                self.add_article(article)
+            articles = None
+        with self._lock:
+            if self.status != 'running':
+                return False
+            self.finished = time.monotonic()
+            self.status = status
+            self.error = error
+            if articles is not None:
+                self.articles = list(articles)
+            return True
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.monotonic()) - self.started
+
+
+def current_run():
+    """SiteRun du scraper en cours dans ce contexte, ou None"""
+    return _current_run.get()
+
+
+def produced(articles):
+    """Nombre d'articles extraits par le site en cours: ceux transmis au sink
+    en flux (run_limited() renvoie alors une liste vide), sinon len(articles)
+    """
+    run = current_run()
+    if run is not None and run.sink is not None:
+        return run.article_count()
+    return len(articles)
+
+
+def run_in_site(run, fn, *args, **kwargs):
+    """Appelle fn avec `run` comme SiteRun courant.
+
+    Si fn est un générateur, ses articles sont consommés dans ce contexte et
+    remontés un par un au run.
+    """
+    token = _current_run.set(run)
+    try:
+        result = fn(*args, **kwargs)
+        if inspect.isgenerator(result):
+            result = run.consume(result)
+        return result
+    finally:
+        _current_run.reset(token)
+
+
+async def run_in_site_async(run, fn, *args, **kwargs):
+    """Attend la coroutine fn avec `run` comme SiteRun courant.
+
+    La variable est posée dans la tâche en cours: chaque tâche asyncio ayant
+    sa propre copie du contexte, les autres sites ne sont pas affectés.
+    Un générateur asynchrone est consommé comme dans run_in_site().
+    """
+    token = _current_run.set(run)
+    try:
+        result = fn(*args, **kwargs)
+        if inspect.isasyncgen(result):
+            return await run.consume_async(result)
+        return await result
+    finally:
+        _current_run.reset(token)
@@ -1,34 +1,179 @@
-import os, time, json, sys
-import requests
-from config.settings import API_URL
+import os, json, sys, gzip
+from utils.poster import AdaptivePoster
+from config.settings import (
+    API_URL, API_BULK, API_BULK_URL, API_BULK_MAX_ITEMS, API_BULK_MAX_BYTES, API_GZIP
+)
 
-def save_to_api(articles):
+def build_payload(art):
+    # Adapter le payload aux champs attendus par Symfony
+    payload = {
+        'title': art.get('title'),
+        'url': art.get('url'),
+        'content': art.get('content'),
+        'image': art.get('image_url'),  # Symfony attend 'image', pas 'image_url'
+        'source': art.get('source'),
+        'publishedAt': art.get('published_at', 'now'),  # Symfony attend 'publishedAt'
+        'duplicateOf': art.get('duplicate_of'),  # NEARDUP_MODE=tag: URL de l'article quasi identique
+    }
+    
+    # Nettoyer les valeurs None
+    return {k: v for k, v in payload.items() if v is not None}
+
+def save_to_api(articles, bulk=None):
+    """Envoie les articles à l'API; renvoie {'saved', 'failed', 'results', 'stats'}.
+
+    Les POST partent en parallèle sur une session keep-alive, la concurrence
+    s'adaptant à la latence et aux 429/503 du backend (utils.poster).
+    `bulk` (défaut: API_BULK) active l'envoi groupé vers API_BULK_URL.
+    """
     if not articles:
         print('[*] No articles to save.')
-        return
+        return {'saved': 0, 'existing': 0, 'failed': 0, 'results': []}
+    if bulk is None:
+        bulk = API_BULK
+    if bulk:
+        return save_bulk(articles)
+
     print(f"[*] Sending {len(articles)} articles to API: {API_URL}")
-    for art in articles:
-        # Adapter le payload aux champs attendus par Symfony
-        payload = {
-            'title': art.get('title'),
-            'url': art.get('url'),
-            'content': art.get('content'),
-            'image': art.get('image_url'),  # Symfony attend 'image', pas 'image_url'
-            'source': art.get('source'),
-            'publishedAt': art.get('published_at', 'now')  # Symfony attend 'publishedAt'
-        }
-        
-        # Nettoyer les valeurs None
-        payload = {k: v for k, v in payload.items() if v is not None}
-        
-        try:
-            print(f"[->] Sending: {payload.get('title', '')[:60]}...")
-            r = requests.post(API_URL, json=payload, timeout=10)
-            if r.status_code in (200, 201):
-                print(f"[+] ✅ Saved: {payload.get('title', '')[:60]}")
-            else:
-                print(f"[!] ❌ API responded {r.status_code}: {r.text}")
-                print(f"[!] Payload was: {json.dumps(payload, indent=2)}")
-        except Exception as e:
-            print(f"[!] ❌ Error posting article: {e}")
-        time.sleep(0.2)  # small delay to avoid overwhelming API
+    poster = AdaptivePoster(API_URL)
+    results = poster.post_all(single_job(build_payload(art)) for art in articles)
+    poster.print_stats()
+    summary = summarize(results)
+    summary['stats'] = poster.stats()
+    return summary
+
+def single_job(payload):
+    """Job AdaptivePoster pour un article au format Symfony"""
+    def parse(r, error):
+        if error is not None or r is None:
+            print(f"[!] ❌ Error posting article: {error}")
+            return [{'url': payload.get('url'), 'status': None, 'error': str(error)}]
+        if r.status_code in (200, 201):
+            print(f"[+] ✅ Saved: {payload.get('title', '')[:60]}")
+        elif r.status_code == 409:
+            print(f"[*] Already stored: {payload.get('url')}")
+        else:
+            print(f"[!] ❌ API responded {r.status_code}: {r.text}")
+            print(f"[!] Payload was: {json.dumps(payload, indent=2)}")
+        return [{'url': payload.get('url'), 'status': r.status_code}]
+    return {'json': payload, 'count': 1, 'parse': parse}
+
+def summarize(results):
+    # 409: déjà présent côté backend, compté comme accepté (voir seen.mark_ingested)
+    saved = sum(1 for r in results if r.get('status') in (200, 201))
+    existing = sum(1 for r in results if r.get('status') == 409)
+    return {'saved': saved, 'existing': existing, 'failed': len(results) - saved - existing, 'results': results}
+
+def iter_chunks(payloads, max_items=API_BULK_MAX_ITEMS, max_bytes=API_BULK_MAX_BYTES):
+    """Groupe les payloads en chunks bornés par nombre et par taille JSON.
+
+    Renvoie des tuples (payloads, body) où body est le JSON encodé
+    `{"articles": [...]}`. Un article plus gros que max_bytes part seul.
+    """
+    head, sep, tail = b'{"articles":[', b',', b']}'
+    chunk, parts, size = [], [], len(head) + len(tail)
+    for payload in payloads:
+        encoded = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        extra = len(encoded) + (len(sep) if parts else 0)
+        if parts and (len(chunk) >= max_items or size + extra > max_bytes):
+            yield chunk, head + sep.join(parts) + tail
+            chunk, parts, size = [], [], len(head) + len(tail)
+            extra = len(encoded)
+        chunk.append(payload)
+        parts.append(encoded)
+        size += extra
+    if parts:
+        yield chunk, head + sep.join(parts) + tail
+
+def parse_bulk_response(chunk, response):
+    """Statut par article d'une réponse bulk.
+
+    Le backend répond `{"results": [{"url": ..., "status": 201, "error": ...}]}`
+    (ou directement la liste), dans l'ordre du chunk. Sans détail exploitable,
+    le statut HTTP global s'applique à chaque article.
+    """
+    try:
+        data = response.json()
+    except ValueError:
+        data = None
+    items = data.get('results') if isinstance(data, dict) else data
+    if isinstance(items, list) and len(items) == len(chunk):
+        results = []
+        for payload, item in zip(chunk, items):
+            item = item if isinstance(item, dict) else {'status': item}
+            result = {'url': item.get('url') or payload.get('url'), 'status': item.get('status')}
+            if item.get('error'):
+                result['error'] = item['error']
+            results.append(result)
+        return results
+    # 2xx sans détail: tout le chunk est accepté; sinon tout le chunk a échoué
+    status = response.status_code
+    if status in (200, 201):
+        status = 201
+    return [{'url': p.get('url'), 'status': status} for p in chunk]
+
+def bulk_job(chunk, body, use_gzip=API_GZIP):
+    """Job AdaptivePoster pour un chunk de l'ingestion groupée"""
+    headers = {'Content-Type': 'application/json'}
+    raw_size = len(body)
+    if use_gzip:
+        body = gzip.compress(body, compresslevel=6)
+        headers['Content-Encoding'] = 'gzip'
+    print(f"[->] Chunk of {len(chunk)} articles, {raw_size} -> {len(body)} bytes")
+
+    def parse(r, error):
+        if error is not None or r is None:
+            print(f"[!] ❌ Error posting chunk: {error}")
+            return [{'url': p.get('url'), 'status': None, 'error': str(error)} for p in chunk]
+        results = parse_bulk_response(chunk, r)
+        for result in results:
+            if result.get('status') not in (200, 201, 409):
+                print(f"[!] ❌ Rejected {result.get('url')}: {result.get('status')} {result.get('error', '')}")
+        return results
+    return {'data': body, 'headers': headers, 'count': len(chunk), 'parse': parse}
+
+def save_bulk(articles, session=None, use_gzip=API_GZIP):
+    payloads = [build_payload(art) for art in articles]
+    print(f"[*] Sending {len(payloads)} articles in bulk to API: {API_BULK_URL}"
+          f"{' (gzip)' if use_gzip else ''}")
+    poster = AdaptivePoster(API_BULK_URL, session=session)
+    results = poster.post_all(bulk_job(chunk, body, use_gzip) for chunk, body in iter_chunks(payloads))
+    poster.print_stats()
+    summary = summarize(results)
+    summary['stats'] = poster.stats()
+    print(f"[+] Bulk ingest: {summary['saved']} saved, {summary['existing']} already stored, "
+          f"{summary['failed']} failed")
+    return summary
+
+class StreamSaver:
+    """Envoi des lots du pipeline en flux sur un seul AdaptivePoster (session et limite AIMD partagées)"""
+
+    def __init__(self, bulk=None, use_gzip=API_GZIP):
+        self.bulk = API_BULK if bulk is None else bulk
+        self.use_gzip = use_gzip
+        url = API_BULK_URL if self.bulk else API_URL
+        self.poster = AdaptivePoster(url)
+        self.saved = 0
+        self.existing = 0
+        self.failed = 0
+        print(f"[*] Streaming articles to API: {url}{' (gzip)' if self.bulk and use_gzip else ''}")
+
+    def save(self, articles):
+        """Envoie un lot; renvoie les résultats par article"""
+        payloads = [build_payload(art) for art in articles]
+        if self.bulk:
+            jobs = (bulk_job(chunk, body, self.use_gzip) for chunk, body in iter_chunks(payloads))
+        else:
+            jobs = (single_job(payload) for payload in payloads)
+        results = self.poster.post_all(jobs)
+        # Compteurs seulement: en mode --daemon le saver vit aussi longtemps que le processus
+        counts = summarize(results)
+        self.saved += counts['saved']
+        self.existing += counts['existing']
+        self.failed += counts['failed']
+        return results
+
+    def summary(self):
+        self.poster.print_stats()
+        return {'saved': self.saved, 'existing': self.existing, 'failed': self.failed,
+                'stats': self.poster.stats()}
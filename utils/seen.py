@@ -0,0 +1,159 @@
+# Persistent index of article URLs already accepted by the API
+import os
+import sqlite3
+import threading
+import time
+from config.settings import SEEN_DB_PATH, SEEN_TTL_DAYS, SEEN_MAX_ENTRIES
+from utils import metrics
+
+
+class SeenStore:
+    """Index SQLite des URLs ingérées, avec expiration (TTL) et taille max.
+
+    Une URL plus ancienne que `ttl_days` est oubliée et peut être re-scrapée;
+    au-delà de `max_entries` les plus anciennes sont évincées.
+    """
+
+    def __init__(self, path=SEEN_DB_PATH, ttl_days=SEEN_TTL_DAYS, max_entries=SEEN_MAX_ENTRIES):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.ttl = ttl_days * 86400
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS seen ('
+            ' url TEXT PRIMARY KEY, source TEXT, seen_at REAL NOT NULL)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS seen_at_idx ON seen (seen_at)')
+        self.evict()
+
+    def evict(self):
+        with self._lock, self._db:
+            if self.ttl > 0:
+                self._db.execute('DELETE FROM seen WHERE seen_at < ?', (time.time() - self.ttl,))
+            if self.max_entries > 0:
+                self._db.execute(
+                    'DELETE FROM seen WHERE url IN ('
+                    ' SELECT url FROM seen ORDER BY seen_at DESC LIMIT -1 OFFSET ?)',
+                    (self.max_entries,)
+                )
+
+    def known(self, urls):
+        """Sous-ensemble de `urls` déjà présent dans l'index"""
+        urls = list(urls)
+        found = set()
+        with self._lock:
+            for i in range(0, len(urls), 500):
+                batch = urls[i:i + 500]
+                marks = ','.join('?' * len(batch))
+                rows = self._db.execute(
+                    f'SELECT url FROM seen WHERE url IN ({marks}) AND seen_at >= ?',
+                    (*batch, time.time() - self.ttl if self.ttl > 0 else 0)
+                )
+                found.update(row[0] for row in rows)
+        return found
+
+    def add(self, urls, source=None):
+        now = time.time()
+        with self._lock, self._db:
+            self._db.executemany(
+                'INSERT OR REPLACE INTO seen (url, source, seen_at) VALUES (?, ?, ?)',
+                [(url, source, now) for url in urls if url]
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM seen').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+_refetch = False
+# URL -> statut de l'API (ou 'near_duplicate') des articles traités pendant ce run
+_outcomes = {}
+_outcomes_lock = threading.Lock()
+# Articles qu'il est inutile de retenter
+SETTLED = (200, 201, 409, 'near_duplicate')
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SeenStore()
+        return _store
+
+
+def set_refetch(refetch):
+    """--refetch: ne pas filtrer les URLs connues (elles restent enregistrées)"""
+    global _refetch
+    _refetch = bool(refetch)
+
+
+def refetching():
+    return _refetch
+
+
+def filter_unseen(candidates, key='url'):
+    """Retire des candidats (dicts) ceux dont l'URL a déjà été ingérée"""
+    if _refetch or not candidates:
+        return candidates
+    known = get_store().known(c[key] for c in candidates)
+    if known:
+        print(f"    -> Skipping {len(known)} already ingested articles")
+        metrics.reject('seen', len(known))
+    return [c for c in candidates if c[key] not in known]
+
+
+def mark_ingested(results, articles=()):
+    """Enregistre les URLs acceptées par l'API (résultats de save_to_api)"""
+    with _outcomes_lock:
+        _outcomes.update((r['url'], r.get('status')) for r in results if r.get('url'))
+    sources = {a.get('url'): a.get('source') for a in articles}
+    # 409: l'article existe déjà côté backend, inutile de le retenter
+    accepted = [r['url'] for r in results if r.get('url') and r.get('status') in (200, 201, 409)]
+    by_source = {}
+    for url in accepted:
+        by_source.setdefault(sources.get(url), []).append(url)
+    store = get_store()
+    for source, urls in by_source.items():
+        store.add(urls, source)
+    return len(accepted)
+
+
+def mark_near_duplicates(articles, kept):
+    """Enregistre les URLs retirées par neardup.filter_near_duplicates() (source
+    'near_duplicate'): elles ne sont pas re-téléchargées au run suivant"""
+    kept_ids = {id(a) for a in kept}
+    dropped = [a.get('url') for a in articles if id(a) not in kept_ids and a.get('url')]
+    with _outcomes_lock:
+        _outcomes.update((url, 'near_duplicate') for url in dropped)
+    if dropped:
+        get_store().add(dropped, 'near_duplicate')
+    return len(dropped)
+
+
+def outcomes(urls):
+    """Statut de chaque URL de `urls` dans ce run (None: pas encore traitée par l'API)"""
+    with _outcomes_lock:
+        return {url: _outcomes.get(url) for url in urls}
+
+
+def forget_outcomes(urls):
+    """Oublie le statut de ces URLs (passage précédent d'un site en --daemon)"""
+    with _outcomes_lock:
+        for url in urls:
+            _outcomes.pop(url, None)
+
+
+def reset_outcomes():
+    """Nouveau run: oublie les statuts des articles traités"""
+    with _outcomes_lock:
+        _outcomes.clear()
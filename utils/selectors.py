@@ -0,0 +1,85 @@
+# Minimal CSS selector matching on single tags, for one-pass walks (metadata, links)
+import re
+
+_COMPOUND = re.compile(
+    r'(?P<tag>[a-zA-Z][a-zA-Z0-9-]*|\*)?'
+    r'(?P<rest>(?:\.[\w-]+|\[[^\]]+\])*)$'
+)
+_PART = re.compile(r'\.([\w-]+)|\[\s*([\w:-]+)\s*(?:([*^$]?=)\s*"?([^"\]]*)"?)?\s*\]')
+
+
+class _Compound:
+    """Sélecteur simple: tag, classes et attributs ([a], [a="v"], [a*="v"]...)"""
+
+    def __init__(self, text):
+        m = _COMPOUND.match(text)
+        if not m:
+            raise ValueError(f"unsupported selector {text!r}")
+        tag = m.group('tag')
+        self.tag = None if tag in (None, '*') else tag.lower()
+        self.classes = []
+        self.attrs = []
+        for cls, name, op, value in _PART.findall(m.group('rest')):
+            if cls:
+                self.classes.append(cls)
+            else:
+                self.attrs.append((name, op, value))
+
+    def matches(self, tag):
+        if self.tag and tag.name != self.tag:
+            return False
+        if self.classes:
+            have = tag.get('class') or []
+            if any(c not in have for c in self.classes):
+                return False
+        for name, op, value in self.attrs:
+            actual = tag.get(name)
+            if actual is None:
+                return False
+            if isinstance(actual, list):
+                actual = ' '.join(actual)
+            if op == '=' and actual != value:
+                return False
+            if op == '*=' and value not in actual:
+                return False
+            if op == '^=' and not actual.startswith(value):
+                return False
+            if op == '$=' and not actual.endswith(value):
+                return False
+        return True
+
+
+class Selector:
+    """Sélecteur CSS sans virgule: sélecteurs simples et combinateur descendant.
+
+    `matches(tag)` teste un seul élément (et ses ancêtres si besoin), sans
+    parcourir le document: c'est ce qui permet de tester plusieurs
+    sélecteurs pendant un unique parcours de l'arbre.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.chain = [_Compound(part) for part in text.split()]
+        if not self.chain:
+            raise ValueError("empty selector")
+
+    @property
+    def tag(self):
+        """Nom du tag visé, ou None pour n'importe quel tag"""
+        return self.chain[-1].tag
+
+    def matches(self, tag):
+        if not self.chain[-1].matches(tag):
+            return False
+        remaining = len(self.chain) - 2
+        parent = tag.parent
+        while remaining >= 0 and parent is not None:
+            if getattr(parent, 'name', None) and self.chain[remaining].matches(parent):
+                remaining -= 1
+            parent = parent.parent
+        return remaining < 0
+
+
+def compile_selectors(selectors):
+    """Liste de sélecteurs (éventuellement avec virgules) -> liste de Selector"""
+    return [Selector(part.strip()) for text in selectors for part in text.split(',') if part.strip()]